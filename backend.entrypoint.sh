@@ -37,5 +37,6 @@ else:
 EOF
 
 celery -A videoflix worker -l INFO &
+celery -A videoflix beat -l INFO &
 
 exec gunicorn videoflix.wsgi:application --bind 0.0.0.0:8000
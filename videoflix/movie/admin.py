@@ -1,7 +1,8 @@
 from django.contrib import admin
+from django.core.files.storage import default_storage
 from django.utils.html import format_html
 from .forms import MovieAdminForm
-from .models import Movie, MovieConvertables, ConnectionTestFile, MovieProgress
+from .models import Movie, MovieConvertables, ConnectionTestFile, MediaInfo, MovieProgress, TranscodeCacheEntry, TranscodeJob, Upload
 
 admin.site.register(ConnectionTestFile)
 admin.site.register(MovieProgress)
@@ -16,19 +17,23 @@ class MovieAdmin(admin.ModelAdmin):
 
     Key features:
     - Uses a custom form (MovieAdminForm) for validation and field customization.
-    - Displays specific fields in the list view: ID, title, genre, rating, ranking, and a thumbnail preview.
-    - Marks some fields as read-only in the detail view: thumbnail preview, image file, and duration.
+    - Displays specific fields in the list view: ID, title, genre, rating, ranking, processing status and a thumbnail preview.
+    - Allows filtering by processing status, e.g. to find failed videos.
+    - Marks some fields as read-only in the detail view: thumbnail preview, image file and variants, duration, HLS playlist,
+    trickplay index and processing status.
     - Implements a custom method `thumbnail_preview` to show a 100px-tall image preview
     (if an image is available) using inline HTML in both the list and detail views.
 
     Attributes:
     - form: Specifies the custom form used for the model.
     - list_display: Fields shown in the changelist (overview) view.
+    - list_filter: Filters shown in the changelist view.
     - readonly_fields: Fields disabled for editing in the detail view.
 
     Methods:
-    - thumbnail_preview(obj): Returns a formatted HTML image element if an image exists;
-    otherwise, returns a dash ("-"). Used both as a column in the list view and a read-only field.
+    - thumbnail_preview(obj): Returns a formatted HTML image element if an image exists, using the
+    smallest generated WebP variant when available; otherwise, returns a dash ("-").
+    Used both as a column in the list view and a read-only field.
 
     Note:
     - The thumbnail is styled with a fixed height and object-fit: cover to ensure uniform appearance.
@@ -36,10 +41,17 @@ class MovieAdmin(admin.ModelAdmin):
     """
 
     form = MovieAdminForm
-    list_display = ('id', 'title', 'genre', 'rating', 'ranking', 'thumbnail_preview')
-    readonly_fields = ('thumbnail_preview', 'image_file', 'duration')
+    list_display = ('id', 'title', 'genre', 'rating', 'ranking', 'status', 'thumbnail_preview')
+    list_filter = ('status',)
+    readonly_fields = ('thumbnail_preview', 'image_file', 'image_variants', 'duration', 'hls_playlist', 'trickplay_vtt', 'status')
 
     def thumbnail_preview(self, obj):
+        variants = (obj.image_variants or {}).get('webp')
+        if variants:
+            return format_html(
+                '<img src="{}" style="height:100px; object-fit: cover;" />',
+                default_storage.url(variants[0]['file'])
+            )
         if obj.image_file:
             return format_html(
                 '<img src="{}" style="height:100px; object-fit: cover;" />',
@@ -64,3 +76,55 @@ class MovieConvertableAdmin(admin.ModelAdmin):
     - list_display: Defines the fields shown in the admin list view for each MovieConvertables entry.
     """
     list_display = ('id', 'movie')
+
+@admin.register(TranscodeCacheEntry)
+class TranscodeCacheEntryAdmin(admin.ModelAdmin):
+    """
+    Customize admin view for model TranscodeCacheEntry in the Django admin interface.
+
+    Attributes:
+    - list_display: Shows the resolution, the source hash, the cached file and the creation time.
+    - search_fields: Allows looking up entries by source hash.
+    """
+    list_display = ('id', 'rendition', 'source_hash', 'file', 'created_at')
+    search_fields = ('source_hash',)
+
+@admin.register(TranscodeJob)
+class TranscodeJobAdmin(admin.ModelAdmin):
+    """
+    Customize admin view for model TranscodeJob in the Django admin interface.
+
+    Attributes:
+    - list_display: Shows movie, resolution, status, progress, speed, CPU time and timestamps.
+    - list_filter: Allows filtering by status and resolution, e.g. to find failed or slow conversions.
+    """
+    list_display = ('id', 'movie', 'rendition', 'status', 'progress', 'speed', 'cpu_seconds', 'started_at', 'finished_at')
+    list_filter = ('status', 'rendition')
+
+@admin.register(MediaInfo)
+class MediaInfoAdmin(admin.ModelAdmin):
+    """
+    Customize admin view for model MediaInfo in the Django admin interface.
+
+    Attributes:
+    - list_display: Shows movie, rendition, size, frame rate, codecs, bitrate, audio layout and file size.
+    - list_filter: Allows filtering by rendition and codecs.
+    - readonly_fields: All probed values, they are written by the video pipeline only.
+    """
+    list_display = ('id', 'movie', 'rendition', 'width', 'height', 'fps', 'video_codec', 'audio_codec', 'bitrate', 'audio_layout', 'size')
+    list_filter = ('rendition', 'video_codec', 'audio_codec')
+    readonly_fields = ('container', 'video_codec', 'audio_codec', 'width', 'height', 'fps', 'bitrate',
+                       'audio_channels', 'audio_layout', 'size', 'duration', 'probed_at')
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    """
+    Customize admin view for model Upload in the Django admin interface.
+
+    Attributes:
+    - list_display: Shows movie, file name, received and total bytes, creator and timestamps.
+    - readonly_fields: The upload state is written by the upload API only.
+    """
+    list_display = ('id', 'movie', 'filename', 'offset', 'length', 'created_by', 'created_at', 'completed_at')
+    readonly_fields = ('offset', 'completed_at')
+
@@ -0,0 +1,165 @@
+"""
+Keyset (cursor) pagination of the movie catalog.
+
+An offset (`LIMIT 24 OFFSET 48000`) makes the database read and discard every row before
+the page, so deep pages get slower as the catalog grows. A cursor stores the sort values
+of the last row of a page instead, and the next page continues right after them:
+
+    WHERE created_at < :created_at OR (created_at = :created_at AND id < :id)
+    ORDER BY created_at DESC, id DESC LIMIT 25
+
+With the composite indexes of `Movie` this is an index range scan of one page, whatever
+the position in the catalog. The id is part of every ordering, so movies with the same
+creation time (or ranking) are neither skipped nor repeated. DRF's `CursorPagination`
+only keys on the first ordering field and skips ties with an offset, which degrades
+(and stops at 1000 ties) for e.g. the many movies with the same ranking.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+MOVIE_ORDERINGS = {
+    '-created_at': ('-created_at', '-id'),
+    'created_at': ('created_at', 'id'),
+    '-ranking': ('-ranking', '-created_at', '-id'),
+    'ranking': ('ranking', 'created_at', 'id'),
+}
+
+def encode_value(value):
+    """
+    Converts a sort value to JSON (timestamps as ISO 8601, decimals as string).
+    """
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+def keyset_filter(fields, position):
+    """
+    Returns the Q object selecting the rows after `position` in the ordering `fields`.
+
+    Parameters:
+        fields (tuple): Ordering fields, '-' prefixed for descending (e.g. ('-created_at', '-id')).
+        position (list): Sort values of the last row of the previous page, one per field.
+
+    Example:
+        ('-created_at', '-id'), [t, 7] -> created_at < t OR (created_at = t AND id < 7)
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(fields, position):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+class MovieCursorPagination(BasePagination):
+    """
+    Cursor pagination of the movie list, see the module documentation.
+
+    Query parameters:
+    - cursor: Opaque position from the `next` or `previous` link of a page.
+    - ordering: One of MOVIE_ORDERINGS, default '-created_at' (newest first).
+    - page_size: Movies per page, default `settings.MOVIE_PAGE_SIZE`, at most `max_page_size`.
+
+    Response:
+        {'next': url or None, 'previous': url or None, 'results': [...]}
+    """
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    page_size_query_param = 'page_size'
+    default_ordering = '-created_at'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.MOVIE_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: ['A positive integer is required.']})
+        if page_size < 1:
+            raise ValidationError({self.page_size_query_param: ['A positive integer is required.']})
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        if ordering not in MOVIE_ORDERINGS:
+            raise ValidationError({self.ordering_query_param: [f"Must be one of: {', '.join(MOVIE_ORDERINGS)}."]})
+        return MOVIE_ORDERINGS[ordering]
+
+    def decode_cursor(self, request):
+        """
+        Returns (position, reverse) of the cursor parameter, (None, False) without cursor.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound('Invalid cursor.')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor.')
+        return position, reverse
+
+    def encode_cursor(self, instance, reverse):
+        position = [encode_value(getattr(instance, field.lstrip('-'))) for field in self.ordering]
+        encoded = base64.urlsafe_b64encode(json.dumps({'p': position, 'r': reverse}).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the page of `queryset` at the cursor of the request.
+
+        A `previous` cursor (reverse) reads the rows before its position in the opposite
+        order and flips them back, so both directions are index range scans.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request)
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        fields = self.ordering
+        if reverse:
+            fields = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in fields)
+        if position is not None:
+            try:
+                queryset = queryset.filter(keyset_filter(fields, position))
+            except (DjangoValidationError, ValueError, TypeError, decimal.InvalidOperation):
+                raise NotFound('Invalid cursor.')
+        results = list(queryset.order_by(*fields)[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else position is not None
+        self.next_link = self.encode_cursor(results[-1], False) if results and has_next else None
+        self.previous_link = self.encode_cursor(results[0], True) if results and has_previous else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_link, 'previous': self.previous_link, 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
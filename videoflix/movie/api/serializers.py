@@ -1,27 +1,59 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from movie.models import ConnectionTestFile, Movie, MovieConvertables, MovieProgress
+from movie.storage import manifest_url
+from movie.models import ConnectionTestFile, MediaInfo, Movie, MovieConvertables, MovieProgress, TranscodeJob, Upload
 
 class MovieSerializer(serializers.ModelSerializer):
     """
     Serializer for Movie model.
 
     Provides all fields except 'video_file'.
+    The 'hls_playlist' field holds the absolute URL of the HLS master playlist,
+    which can be handed to an adaptive player, or None before packaging.
+    The 'trickplay_vtt' field holds the absolute URL of the WebVTT index of the
+    seek preview sprite sheets. Both are always delivered by the media view, which
+    signs the referenced segments and sprites if the media storage is remote.
 
     Adds a read-only 'image_file' field which returns
     the absolute URL of the movie's image file,
     constructed using the current request context if available.
+
+    Adds a read-only 'image_srcset' field with one `srcset` string per image format
+    (e.g. {'avif': '<url> 160w, <url> 320w, ...', 'webp': ...}), so a client can let the
+    browser pick the thumbnail size for its screen (`<picture>` / `<img srcset>`).
     """
     image_file = serializers.SerializerMethodField(method_name='get_image_file')   
-    
+    image_srcset = serializers.SerializerMethodField()
+    hls_playlist = serializers.SerializerMethodField()
+    trickplay_vtt = serializers.SerializerMethodField()
+
     class Meta:
         model = Movie
-        exclude = ['video_file']
-                
-    def get_image_file(self, obj):
+        exclude = ['video_file', 'image_variants']
+
+    def build_url(self, url):
         request = self.context.get('request')
         if request:
-            return request.build_absolute_uri(obj.image_file.url)
-        return obj.image_file.url
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_image_file(self, obj):
+        return self.build_url(obj.image_file.url)
+
+    def get_hls_playlist(self, obj):
+        url = manifest_url(obj.hls_playlist.name)
+        return self.build_url(url) if url else None
+
+    def get_trickplay_vtt(self, obj):
+        url = manifest_url(obj.trickplay_vtt.name)
+        return self.build_url(url) if url else None
+
+    def get_image_srcset(self, obj):
+        return {
+            image_format: ', '.join(f"{self.build_url(default_storage.url(variant['file']))} {variant['width']}w" for variant in variants)
+            for image_format, variants in (obj.image_variants or {}).items()
+        }
         
 class MovieDetailSerializer(serializers.ModelSerializer):
     """
@@ -33,12 +65,29 @@ class MovieDetailSerializer(serializers.ModelSerializer):
         model = Movie
         fields = '__all__'
 
+class MediaInfoSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the MediaInfo model.
+
+    Provides the probed properties (container, codecs, size, frame rate, bitrate,
+    audio layout, file size and duration) of the source or of one resolution.
+    """
+    class Meta:
+        model = MediaInfo
+        exclude = ['id', 'movie']
+
 class MovieConvertablesSerializer(serializers.ModelSerializer):
     """
     Serializer for detailed representation of the MovieConvertables model.
 
-    Includes all fields of the MovieConvertables model.
+    Includes all fields of the MovieConvertables model, the read-only
+    'available_renditions' list with the names of the converted resolutions and
+    the read-only 'media_info' list with the probed properties of the source and
+    every resolution (e.g. to select a resolution by its bitrate).
     """
+    available_renditions = serializers.ListField(child=serializers.CharField(), read_only=True)
+    media_info = MediaInfoSerializer(source='movie.media_info', many=True, read_only=True)
+
     class Meta:
         model = MovieConvertables
         fields = '__all__'
@@ -61,4 +110,48 @@ class MovieProgressSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = MovieProgress
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class TranscodeJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for detailed representation of the TranscodeJob model.
+
+    Includes all fields of the TranscodeJob model.
+    """
+    class Meta:
+        model = TranscodeJob
+        fields = '__all__'
+
+class UploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Upload model.
+
+    'movie', 'filename' and 'length' (total size in bytes) are set when the upload is created,
+    all other fields are read-only. The length must be positive and at most
+    settings.VIDEO_UPLOAD_MAX_SIZE.
+    """
+    class Meta:
+        model = Upload
+        fields = ['id', 'movie', 'filename', 'length', 'offset', 'created_at', 'completed_at']
+        read_only_fields = ['id', 'offset', 'created_at', 'completed_at']
+
+    def validate_length(self, value):
+        if value <= 0 or value > settings.VIDEO_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'Length must be between 1 and {settings.VIDEO_UPLOAD_MAX_SIZE} bytes.')
+        return value
+
+class HomeMovieSerializer(MovieSerializer):
+    """
+    Serializer of a movie for the home screen (`HomeView`).
+
+    Extends MovieSerializer with the nested 'movie_convertables' (see MovieConvertablesSerializer)
+    and the requesting user's 'progress' (see MovieProgressSerializer, None if the user has not
+    watched the movie). Expects the movies to be loaded by `HomeView`, which prefetches the
+    convertables, the media info and the user's progress (as `user_progress`).
+    """
+    movie_convertables = MovieConvertablesSerializer(many=True, read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    def get_progress(self, obj):
+        progress = obj.user_progress[0] if obj.user_progress else None
+        return MovieProgressSerializer(progress).data if progress else None
@@ -1,4 +1,7 @@
+import os
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,38 +9,132 @@ from django.views.decorators.cache import cache_page, cache_control
 from django.utils.decorators import method_decorator
 from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.conf import settings
-from movie.models import ConnectionTestFile, Movie, MovieConvertables, MovieProgress
-from movie.api.serializers import MovieSerializer, MovieConvertablesSerializer, TestFileSerializer, MovieProgressSerializer
+from movie.models import ConnectionTestFile, Movie, MovieConvertables, MovieProgress, TranscodeJob, Upload
+from movie.catalog_cache import cached_catalog_response, catalog_condition
+from movie.api.pagination import MovieCursorPagination
+from movie.snapshot import catalog_snapshot_response
+from movie.api.serializers import HomeMovieSerializer, MovieSerializer, MovieConvertablesSerializer, TestFileSerializer, MovieProgressSerializer, TranscodeJobSerializer, UploadSerializer
+from movie.uploads import UploadConflict, append_chunk, create_part_file, finalize_upload
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 
 
 
 CACHE_TTL = getattr(settings, 'CACHE_TTL', DEFAULT_TIMEOUT)
 
+def filter_movies(movies, query_params):
+    """
+    Applies the catalog filters of the query parameters to a movie queryset.
+
+    Query parameters:
+    - genre: Genre key, or several separated by commas (e.g. 'ACTION,DRAMA').
+    - rating: Age rating (FSK), or several separated by commas (e.g. '0,6,12').
+
+    Returns:
+        tuple: (filtered queryset, None) or (None, error message) for an unknown value.
+    """
+    genres = [genre for genre in query_params.get('genre', '').split(',') if genre]
+    if genres:
+        unknown = [genre for genre in genres if genre not in Movie.GENRE_CHOICES]
+        if unknown:
+            return None, f"Unknown genre: {', '.join(unknown)}."
+        movies = movies.filter(genre__in=genres)
+
+    ratings = [rating for rating in query_params.get('rating', '').split(',') if rating]
+    if ratings:
+        valid = {str(value) for value, label in Movie.RATING_CHOICES}
+        unknown = [rating for rating in ratings if rating not in valid]
+        if unknown:
+            return None, f"Unknown rating: {', '.join(unknown)}."
+        movies = movies.filter(rating__in=[int(rating) for rating in ratings])
+    return movies, None
+
 class MovieView(APIView):
     """
-    API view to retrieve a list of all movies.
+    API view to retrieve the movie catalog page by page.
 
     Requires token authentication and user to be authenticated.
 
     GET:
-        Returns a list of movies ordered by creation date descending.
+        Returns one page of movies, newest first by default, as
+        {'next': url, 'previous': url, 'results': [...]}. The pages are keyed on the sort
+        values of their last movie (see `movie.api.pagination`), so every page costs the same
+        however large the catalog is.
+        Query parameters: `genre`, `rating` (see `filter_movies`), `ordering`
+        ('-created_at', 'created_at', '-ranking', 'ranking'), `page_size` and `cursor`.
         Serialized using MovieSerializer with request context for full URLs.
+        Unknown filter values or orderings return 400 Bad Request.
+        The serialized pages are cached per URL until the catalog changes (see `movie.catalog_cache`).
+        Responses carry the catalog version as ETag and the time of the last change as
+        Last-Modified (`Cache-Control: private, no-cache`); a request with a matching
+        If-None-Match (or If-Modified-Since) gets 304 Not Modified without a body.
+        The plain request (no query parameters) is answered with the pre-rendered, pre-compressed
+        catalog snapshot if it is current (see `movie.snapshot`).
     """
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = MovieCursorPagination
 
-#   @method_decorator(cache_page(CACHE_TTL))
-    def get(self, request):        
-        movies = Movie.objects.all()
-        movies = movies.order_by('-created_at')
-        serializer = MovieSerializer(movies, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    @catalog_condition
+    @method_decorator(cache_control(private=True, no_cache=True))
+    def get(self, request):
+        snapshot = catalog_snapshot_response(request)
+        if snapshot is not None:
+            return snapshot
+        movies, error = filter_movies(Movie.objects.all(), request.query_params)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build():
+            paginator = self.pagination_class()
+            page = paginator.paginate_queryset(movies, request, view=self)
+            serializer = MovieSerializer(page, many=True, context={'request': request})
+            return paginator.get_paginated_response(serializer.data).data
+
+        return Response(cached_catalog_response(request, 'movies', build), status=status.HTTP_200_OK)
       
+class HomeView(APIView):
+    """
+    API view with everything the home screen needs in one response.
+
+    Requires token authentication and user to be authenticated.
+
+    GET:
+        Returns one page of movies like MovieView (same `genre`, `rating`, `ordering`,
+        `page_size` and `cursor` parameters), every movie with its nested
+        'movie_convertables' (resolutions and media info) and the requesting user's
+        'progress' (None if not watched), serialized with HomeMovieSerializer.
+        Replaces the separate requests to the movie, convertables and progress lists.
+
+        The related rows are loaded with `prefetch_related`: one query per relation for the
+        whole page, the user's progress through a filtered Prefetch. A page therefore
+        takes the same number of queries whatever the size of the catalog.
+        The response is per user and not cached.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = MovieCursorPagination
+
+    def get(self, request):
+        movies, error = filter_movies(Movie.objects.all(), request.query_params)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        movies = movies.prefetch_related(
+            'media_info',
+            'movie_convertables',
+            Prefetch('movie_progress', queryset=MovieProgress.objects.filter(user=request.user).order_by('-updated_at'), to_attr='user_progress'),
+        )
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(movies, request, view=self)
+        serializer = HomeMovieSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
 class MovieConvertablesView(APIView):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+
+    @catalog_condition
+    @method_decorator(cache_control(private=True, no_cache=True))
     def get(self, request):
         """
         Returns a list of all available movie convertables.
@@ -45,6 +142,11 @@ class MovieConvertablesView(APIView):
         This endpoint retrieves all entries from the MovieConvertables model and returns them as serialized data.
         Each convertable represents a video that has been uploaded and processed using ffmpeg.
         During processing, the original video is converted and stored in multiple resolutions: 120p, 360p, 720p, and 1080p.
+        The probed properties of the source and every resolution are nested as 'media_info'
+        (loaded with one additional query for all convertables).
+        The response is cached until a movie or convertable changes (see `movie.catalog_cache`).
+        It carries the catalog version as ETag and the time of the last change as Last-Modified;
+        a request with a matching If-None-Match (or If-Modified-Since) gets 304 Not Modified.
 
         Args:
             request (Request): Authenticated GET request with valid token.
@@ -53,6 +155,8 @@ class MovieConvertablesView(APIView):
             Response (JSON):
                 - 200 OK:
                     A list of movie convertables, each represented as serialized JSON data.
+                - 304 Not Modified:
+                    If the client's copy (If-None-Match / If-Modified-Since) is still current.
 
         Authentication:
             Required - Token-based authentication
@@ -60,9 +164,11 @@ class MovieConvertablesView(APIView):
         Permissions:
             Only authenticated users (IsAuthenticated)
         """
-        convertables = MovieConvertables.objects.all()
-        serializer = MovieConvertablesSerializer(convertables, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        def build():
+            convertables = MovieConvertables.objects.prefetch_related('movie__media_info')
+            return MovieConvertablesSerializer(convertables, many=True, context={'request': request}).data
+
+        return Response(cached_catalog_response(request, 'convertables', build), status=status.HTTP_200_OK)
     
 
 class SingleMovieConvertablesView(APIView):
@@ -234,6 +340,162 @@ class MovieProgressSingleView(APIView):
         progress.save()
 
         return Response(status=status.HTTP_201_CREATED)
-        
-       
-            
\ No newline at end of file
+
+class MovieTranscodeJobsView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    def get(self, request, pk):
+        """
+        Retrieves the conversion jobs of a movie.
+
+        Every converted resolution of a movie is tracked as a transcode job with its status,
+        percentage done, encode speed (multiple of real time), start and end time and the
+        CPU seconds used by FFmpeg. The data can be used to follow a running conversion or
+        to plan worker capacity.
+
+        Args:
+            request (Request): Authenticated GET request with valid token.
+            pk (int): Primary key (ID) of the movie.
+
+        Returns:
+            Response (JSON):
+                - 200 OK:
+                    A list of transcode jobs of the movie, oldest first.
+                - 404 Not Found:
+                    If no movie with the given ID exists.
+
+        Authentication:
+            Required - Token-based authentication
+
+        Permissions:
+            Only authenticated users (IsAuthenticated)
+        """
+        movie = get_object_or_404(Movie, pk=pk)
+        jobs = TranscodeJob.objects.filter(movie=movie)
+        serializer = TranscodeJobSerializer(jobs, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+UPLOAD_CONTENT_TYPE = 'application/offset+octet-stream'
+
+def upload_headers(upload):
+    return {
+        'Upload-Offset': str(upload.offset),
+        'Upload-Length': str(upload.length),
+        'Cache-Control': 'no-store',
+    }
+
+class UploadCreateView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+    def post(self, request):
+        """
+        Starts a resumable upload of the source video of a movie.
+
+        Args:
+            request (Request): Authenticated POST request with JSON body:
+                - movie (int): Primary key of the movie that receives the video.
+                - filename (str): Name of the video file.
+                - length (int): Total size of the video in bytes.
+
+        Returns:
+            Response (JSON):
+                - 201 Created:
+                    The upload with its id. The `Location` header holds the URL to send the chunks to.
+                - 400 Bad Request:
+                    If a field is missing or invalid.
+
+        Authentication:
+            Required - Token-based authentication
+
+        Permissions:
+            Only staff users (IsAdminUser)
+        """
+        serializer = UploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(created_by=request.user)
+        create_part_file(upload)
+        headers = upload_headers(upload)
+        headers['Location'] = reverse('upload', kwargs={'pk': upload.pk})
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+class UploadView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAdminUser]
+    def get(self, request, pk):
+        """
+        Retrieves the state of an upload as JSON (offset, length, completion time).
+
+        Returns:
+            Response (JSON):
+                - 200 OK: The upload, with the `Upload-Offset` and `Upload-Length` headers.
+                - 404 Not Found: If no upload with the given ID exists.
+        """
+        upload = get_object_or_404(Upload, pk=pk)
+        return Response(UploadSerializer(upload).data, status=status.HTTP_200_OK, headers=upload_headers(upload))
+
+    def head(self, request, pk):
+        """
+        Returns the current offset of an upload in the `Upload-Offset` header (no body).
+        A client resumes an interrupted upload by sending the rest of the file from this offset.
+        """
+        upload = get_object_or_404(Upload, pk=pk)
+        return Response(status=status.HTTP_200_OK, headers=upload_headers(upload))
+
+    def patch(self, request, pk):
+        """
+        Appends a chunk to an upload.
+
+        The request body is the raw chunk (`Content-Type: application/offset+octet-stream`)
+        and the `Upload-Offset` header must match the current offset of the upload. The body is
+        streamed to disk, it is never held in memory as a whole, and no database lock is held
+        while it arrives. When the last byte has been received, the video is attached to the movie
+        and the ingest pipeline is queued. If that failed, an empty PATCH at the final offset
+        attaches the video again.
+
+        Args:
+            request (Request): Authenticated PATCH request with the chunk as body.
+            pk (uuid): ID of the upload.
+
+        Returns:
+            Response:
+                - 204 No Content: The chunk was stored, `Upload-Offset` holds the new offset.
+                - 400 Bad Request: If the Upload-Offset header is missing or invalid.
+                - 404 Not Found: If no upload with the given ID exists.
+                - 409 Conflict: If the offset does not match, the upload is already complete or another
+                  request is still sending a chunk.
+                - 410 Gone: If the upload has expired and its data was removed by the media cleanup.
+                - 413 Request Entity Too Large: If the chunk exceeds the announced length.
+                - 415 Unsupported Media Type: If the content type is not application/offset+octet-stream.
+
+        Authentication:
+            Required - Token-based authentication
+
+        Permissions:
+            Only staff users (IsAdminUser)
+        """
+        if request.content_type != UPLOAD_CONTENT_TYPE:
+            return Response({'error': f'Content-Type must be {UPLOAD_CONTENT_TYPE}.'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            content_length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({'error': 'Upload-Offset header is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = get_object_or_404(Upload.objects.select_related('movie'), pk=pk)
+        if upload.completed_at or offset != upload.offset:
+            return Response({'error': 'Offset does not match.'}, status=status.HTTP_409_CONFLICT, headers=upload_headers(upload))
+        if offset + content_length > upload.length:
+            return Response({'error': 'Chunk exceeds the upload length.'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, headers=upload_headers(upload))
+        if not os.path.exists(upload.part_path):
+            return Response({'error': 'Upload has expired.'}, status=status.HTTP_410_GONE, headers=upload_headers(upload))
+        if content_length:
+            try:
+                append_chunk(upload, request.stream, content_length)
+            except UploadConflict:
+                upload.refresh_from_db(fields=['offset', 'completed_at'])
+                return Response({'error': 'Offset does not match.'}, status=status.HTTP_409_CONFLICT, headers=upload_headers(upload))
+
+        if upload.offset == upload.length:
+            finalize_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=upload_headers(upload))
+
@@ -0,0 +1,154 @@
+"""
+Versioned cache of the catalog responses (`/api/movies/`, `/api/movies-convert/`).
+
+Every cached response is stored under a key that contains the current catalog version,
+a counter in the cache itself. Any change of a movie, its convertables or their probed
+media info bumps the version, so all cached responses are outdated at once, without
+tracking or deleting individual keys; they expire on their own.
+
+The version is bumped by the `post_save`/`post_delete` receivers in `movie.signals` and
+by `movie.signals.update_movie` for the queryset updates of the pipeline tasks, which
+bypass the model signals. A bump happens right away and again when the transaction commits,
+so a response cached by a concurrent request between the change and the commit is
+dropped as well.
+
+The version and the time of the last change also validate the clients' copies: the views
+send them as ETag and Last-Modified and answer a matching conditional request with
+304 Not Modified, without reading the cached response (see `catalog_condition`). With a
+remote media storage the responses contain signed URLs that expire, so the validators also
+change with the signing epoch (half the lifetime of the URLs, see `signing_epoch`) and a
+client revalidating an old copy gets fresh URLs.
+"""
+import datetime
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from .storage import is_remote_storage
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_MODIFIED_KEY = 'catalog:modified'
+
+def catalog_state():
+    """
+    Returns the current catalog version and the timestamp of the last change, read with one cache call.
+
+    A missing version (first use, evicted key) starts at the current time in milliseconds,
+    so it never repeats a version of which cached responses may still exist.
+    """
+    state = cache.get_many([CATALOG_VERSION_KEY, CATALOG_MODIFIED_KEY])
+    if len(state) < 2:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000000, timeout=None)
+        cache.add(CATALOG_MODIFIED_KEY, time.time(), timeout=None)
+        state = cache.get_many([CATALOG_VERSION_KEY, CATALOG_MODIFIED_KEY])
+    return state[CATALOG_VERSION_KEY], state[CATALOG_MODIFIED_KEY]
+
+def catalog_version():
+    """
+    Returns the current catalog version.
+    """
+    return catalog_state()[0]
+
+def bump_catalog_version():
+    """
+    Increments the catalog version atomically, records the time of the change and returns the new version.
+    """
+    try:
+        version = cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return catalog_version()
+    cache.set(CATALOG_MODIFIED_KEY, time.time(), timeout=None)
+    return version
+
+def request_catalog_state(request):
+    """
+    Returns `catalog_state()`, read once per request, so the validators and the cached
+    response of one request agree on the version.
+    """
+    state = getattr(request, '_catalog_state', None)
+    if state is None:
+        state = request._catalog_state = catalog_state()
+    return state
+
+def signing_epoch_length():
+    """
+    Returns the length of a signing epoch in seconds: half the lifetime of the signed media URLs
+    (`settings.MEDIA_URL_EXPIRE`), so a URL handed out in an epoch is valid for at least one more.
+    """
+    return max(settings.MEDIA_URL_EXPIRE // 2, 1)
+
+def signing_epoch():
+    """
+    Returns the number of the current signing epoch, None with a local media storage (its URLs do not expire).
+    """
+    if not is_remote_storage():
+        return None
+    return int(time.time()) // signing_epoch_length()
+
+def catalog_etag(request, *args, **kwargs):
+    """
+    Returns the strong ETag of a catalog response: the catalog version, with a remote media storage
+    followed by the signing epoch. The URL (filters, cursor) is not part of it, because an ETag
+    only validates the response of its own URL.
+    """
+    version = request_catalog_state(request)[0]
+    epoch = signing_epoch()
+    if epoch is None:
+        return f'"catalog-{version}"'
+    return f'"catalog-{version}-{epoch}"'
+
+def catalog_last_modified(request, *args, **kwargs):
+    """
+    Returns the time of the last catalog change, for the Last-Modified header. With a remote
+    media storage it is at least the start of the signing epoch, so a copy with expiring URLs
+    is not confirmed by If-Modified-Since either.
+    """
+    modified = request_catalog_state(request)[1]
+    epoch = signing_epoch()
+    if epoch is not None:
+        modified = max(modified, epoch * signing_epoch_length())
+    return datetime.datetime.fromtimestamp(modified, tz=datetime.timezone.utc)
+
+catalog_condition = method_decorator(condition(etag_func=catalog_etag, last_modified_func=catalog_last_modified))
+
+def invalidate_catalog():
+    """
+    Outdates all cached catalog responses, now and once the current transaction commits.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+def catalog_cache_timeout():
+    """
+    Returns the lifetime of a cached response: `settings.CACHE_TTL`, with a remote media storage
+    at most half the lifetime of the signed URLs in the responses (`settings.MEDIA_URL_EXPIRE`).
+    """
+    if is_remote_storage():
+        return min(settings.CACHE_TTL, settings.MEDIA_URL_EXPIRE // 2)
+    return settings.CACHE_TTL
+
+def cached_catalog_response(request, name, build):
+    """
+    Returns the response data of a catalog view from the cache, or builds and caches it.
+
+    Parameters:
+        request (Request): The request. Its absolute URL (host and query string) is part
+            of the key, because the responses contain absolute media URLs and depend on
+            the filters, ordering and cursor.
+        name (str): Name of the response (e.g. 'movies').
+        build (callable): Returns the serialized response data on a cache miss. Errors
+            it raises (e.g. an invalid cursor) are not cached.
+
+    Returns:
+        The response data.
+    """
+    url_hash = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+    key = f'catalog:{request_catalog_state(request)[0]}:{name}:{url_hash}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, catalog_cache_timeout())
+    return data
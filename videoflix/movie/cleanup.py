@@ -0,0 +1,183 @@
+"""
+Finds and removes media files that no movie refers to anymore.
+
+Replacing the video of a movie leaves the old source, its resolutions and the derived
+thumbnails, HLS segments and seek previews on disk, and deleting a movie only removes
+its database rows. The garbage collector compares the media directories with the database:
+
+- Files referenced by a movie or a convertable are kept, as well as the directories of the
+  HLS master playlist, the seek preview index and the thumbnails.
+- The partial file of a resumable upload is kept while the upload is unfinished and younger than
+  VIDEO_UPLOAD_EXPIRE_HOURS; abandoned and leftover partial files are collected. Partial files are
+  always on the local disk of the web node, also with a remote media storage.
+- The transcode cache does not keep files alive: its entries point to the outputs of a movie,
+  which are collected with the movie. Entries of deleted files are removed with them.
+- Everything belonging to a movie that is still pending or processing is kept, because
+  its outputs are not stored in the database until the conversion is done.
+- Files changed within the grace period are kept, so uploads and conversions whose
+  transaction has not been committed yet are never touched.
+
+With a remote media storage (S3, MinIO) the bucket is scanned instead of MEDIA_ROOT.
+"""
+import os
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.timezone import now
+from .models import Movie, MovieConvertables, TranscodeCacheEntry, Upload
+from .storage import is_remote_storage
+from .transcode import RENDITIONS
+
+MEDIA_GC_ROOTS = (
+    'uploads/videos',
+    'uploads/thumbnails',
+    'uploads/hls',
+    'uploads/trickplay',
+    'uploads/chunks',
+    'uploads/partial',
+)
+LOCAL_GC_ROOTS = ('uploads/partial',)
+
+def referenced_media():
+    """
+    Collects the media referenced by the database.
+
+    Returns:
+        tuple: (files, directories, prefixes) as paths relative to MEDIA_ROOT. Everything
+        below one of the directories is referenced, as well as every file in `uploads/videos`
+        whose name starts with one of the prefixes (outputs of movies still being processed).
+    """
+    files = set()
+    directories = set()
+    prefixes = set()
+
+    movies = Movie.objects.values_list('video_file', 'image_file', 'hls_playlist', 'trickplay_vtt', 'image_variants', 'status')
+    for video_file, image_file, hls_playlist, trickplay_vtt, image_variants, status in movies:
+        files.update(name for name in (video_file, image_file, hls_playlist, trickplay_vtt) if name)
+        for variants in (image_variants or {}).values():
+            files.update(variant['file'] for variant in variants)
+        directories.update(os.path.dirname(name) for name in (hls_playlist, trickplay_vtt) if name)
+        if image_file and os.path.dirname(image_file) != 'uploads/thumbnails':
+            directories.add(os.path.dirname(image_file))
+        if video_file and status in (Movie.PENDING, Movie.PROCESSING):
+            base = os.path.splitext(os.path.basename(video_file))[0]
+            prefixes.add(f'{base}_')
+            directories.update(f'uploads/{kind}/{base}' for kind in ('thumbnails', 'hls', 'trickplay', 'chunks'))
+
+    fields = [rendition['field'] for rendition in RENDITIONS]
+    for names in MovieConvertables.objects.values_list(*fields):
+        files.update(name for name in names if name)
+
+    expired = now() - timedelta(hours=settings.VIDEO_UPLOAD_EXPIRE_HOURS)
+    for upload in Upload.objects.filter(completed_at__isnull=True, created_at__gte=expired).only('id'):
+        files.add(os.path.relpath(upload.part_path, settings.MEDIA_ROOT).replace(os.sep, '/'))
+    return files, directories, prefixes
+
+def is_referenced(path, files, directories, prefixes):
+    """
+    Returns True if the media file (relative to MEDIA_ROOT) is referenced, see `referenced_media`.
+    """
+    if path in files:
+        return True
+    parent = os.path.dirname(path)
+    while parent and parent != 'uploads':
+        if parent in directories:
+            return True
+        parent = os.path.dirname(parent)
+    return path.startswith('uploads/videos/') and os.path.basename(path).startswith(tuple(prefixes))
+
+def iter_media_files(root):
+    """
+    Yields (path relative to MEDIA_ROOT, size, modification timestamp) of every media file below a directory.
+    Directories in LOCAL_GC_ROOTS are read from the local disk, the others from the media storage.
+    """
+    if is_remote_storage() and root not in LOCAL_GC_ROOTS:
+        try:
+            directories, filenames = default_storage.listdir(root)
+        except FileNotFoundError:
+            return
+        for filename in filenames:
+            name = f'{root}/{filename}'
+            yield name, default_storage.size(name), default_storage.get_modified_time(name).timestamp()
+        for directory in directories:
+            yield from iter_media_files(f'{root}/{directory}')
+        return
+    for directory, _, filenames in os.walk(os.path.join(settings.MEDIA_ROOT, root)):
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            yield os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/'), stat.st_size, stat.st_mtime
+
+def find_orphaned_media(grace_seconds=None):
+    """
+    Scans the media directories in MEDIA_GC_ROOTS for files without a reference.
+
+    Parameters:
+        grace_seconds (int): Files changed more recently are kept. Defaults to
+            `settings.MEDIA_GC_GRACE_HOURS`.
+
+    Returns:
+        dict: Per media directory the bytes `used` on disk, the `reclaimable` bytes and
+        the orphaned `files` as list of (path relative to MEDIA_ROOT, size) tuples.
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.MEDIA_GC_GRACE_HOURS * 3600
+    cutoff = time.time() - grace_seconds
+    files, directories, prefixes = referenced_media()
+
+    report = {}
+    for root in MEDIA_GC_ROOTS:
+        usage = {'used': 0, 'reclaimable': 0, 'files': []}
+        for path, size, mtime in iter_media_files(root):
+            usage['used'] += size
+            if mtime > cutoff or is_referenced(path, files, directories, prefixes):
+                continue
+            usage['reclaimable'] += size
+            usage['files'].append((path, size))
+        report[root] = usage
+    return report
+
+def delete_orphaned_media(report):
+    """
+    Deletes the orphaned files of a report from `find_orphaned_media`. Directories emptied
+    by the deletion (e.g. the HLS segments of a removed movie) are removed as well, and so
+    are the transcode cache entries of the deleted files.
+
+    Returns:
+        int: Number of bytes freed.
+    """
+    freed = 0
+    for root, usage in report.items():
+        remote = is_remote_storage() and root not in LOCAL_GC_ROOTS
+        root_dir = os.path.join(settings.MEDIA_ROOT, root)
+        TranscodeCacheEntry.objects.filter(file__in=[path for path, _ in usage['files']]).delete()
+        for path, size in usage['files']:
+            if remote:
+                default_storage.delete(path)
+                freed += size
+                continue
+            full_path = os.path.join(settings.MEDIA_ROOT, path)
+            try:
+                os.remove(full_path)
+            except FileNotFoundError:
+                continue
+            freed += size
+            directory = os.path.dirname(full_path)
+            while directory != root_dir and os.path.isdir(directory) and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
+    return freed
+
+def format_bytes(size):
+    """
+    Formats a number of bytes for humans, e.g. 1536 -> '1.5 KB'.
+    """
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}' if unit != 'B' else f'{size} B'
+        size /= 1024
+    return f'{size:.1f} TB'
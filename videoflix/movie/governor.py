@@ -0,0 +1,85 @@
+"""
+Limits the number of FFmpeg processes per host and the threads each of them uses.
+
+Without a limit, every conversion task starts FFmpeg with one thread per core, so a
+worker running several tasks at once oversubscribes the CPU and all of them slow down.
+FFmpeg processes therefore take one of `settings.FFMPEG_MAX_CONCURRENT` slots first.
+A slot is an exclusive `flock` on a lock file in `settings.FFMPEG_LOCK_DIR`, so the limit
+holds across all worker processes of the host, and the kernel releases the slot when a
+worker dies. Every process gets an explicit thread budget (`settings.FFMPEG_THREADS`).
+
+Short jobs (audio, thumbnail, poster analysis, split, concat, HLS remux) take a slot of a
+separate pool (`settings.FFMPEG_SHORT_MAX_CONCURRENT`) and run with a small thread count
+(`settings.FFMPEG_SHORT_THREADS`), so they never queue behind long encodes, and the few
+cores they use on top of the encode budget are bounded.
+"""
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+SLOT_POLL_INTERVAL = 0.5
+
+@contextmanager
+def ffmpeg_slot(short=False):
+    """
+    Context manager that waits for a free FFmpeg slot of the host and holds it until the block ends.
+
+    Parameters:
+        short (bool): Take a slot of the pool reserved for short jobs instead of the encode pool.
+
+    Yields:
+        int: Index of the acquired slot.
+    """
+    os.makedirs(settings.FFMPEG_LOCK_DIR, exist_ok=True)
+    count, prefix = (settings.FFMPEG_SHORT_MAX_CONCURRENT, 'short-slot') if short else (settings.FFMPEG_MAX_CONCURRENT, 'slot')
+    while True:
+        for index in range(count):
+            lock = open(os.path.join(settings.FFMPEG_LOCK_DIR, f'{prefix}-{index}.lock'), 'a')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                continue
+            try:
+                yield index
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                lock.close()
+            return
+        time.sleep(SLOT_POLL_INTERVAL)
+
+def process_threads():
+    """
+    Returns the thread budget of one FFmpeg process (used for decoding and filtering).
+    """
+    return settings.FFMPEG_THREADS
+
+def short_job_threads():
+    """
+    Returns the thread count of a short FFmpeg job (see the module documentation).
+    """
+    return settings.FFMPEG_SHORT_THREADS
+
+def rendition_threads(renditions):
+    """
+    Returns the encoder threads per resolution of one FFmpeg process.
+
+    Resolutions configured in `settings.FFMPEG_RENDITION_THREADS` use that value. The others
+    share the process budget by their pixel count, so in a single pass over all resolutions
+    1080p gets most threads and 120p one.
+
+    Parameters:
+        renditions (list): Ladder entries encoded by the process.
+
+    Returns:
+        dict: Number of threads per resolution name, at least 1.
+    """
+    total_pixels = sum(rendition['width'] * rendition['height'] for rendition in renditions) or 1
+    threads = {}
+    for rendition in renditions:
+        configured = settings.FFMPEG_RENDITION_THREADS.get(rendition['name'])
+        share = round(process_threads() * rendition['width'] * rendition['height'] / total_pixels)
+        threads[rendition['name']] = max(int(configured or share), 1)
+    return threads
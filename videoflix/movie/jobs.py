@@ -0,0 +1,138 @@
+"""
+Runs FFmpeg conversions while tracking them as TranscodeJob rows.
+
+FFmpeg is started with `-progress pipe:1`, which writes machine readable
+`key=value` blocks to stdout. Every block updates the percentage done and the
+encode speed of the jobs, the CPU time of the FFmpeg child process is recorded
+when it exits.
+"""
+import resource
+import subprocess
+import tempfile
+import time
+from django.utils.timezone import now
+from .governor import ffmpeg_slot
+from .models import TranscodeJob
+
+PROGRESS_UPDATE_INTERVAL = 1.0
+
+def parse_speed(value):
+    """
+    Converts an FFmpeg speed value like '2.35x' into a float, None if unknown ('N/A').
+    """
+    try:
+        return float(value.strip().rstrip('x'))
+    except (AttributeError, ValueError):
+        return None
+
+def progress_percent(block, duration):
+    """
+    Returns the percentage done of a progress block (0.0 - 100.0) based on the
+    encoded timestamp and the source duration in seconds.
+    """
+    if not duration:
+        return 0.0
+    try:
+        encoded = int(block.get('out_time_us') or block.get('out_time_ms') or 0) / 1000000
+    except ValueError:
+        return 0.0
+    return max(0.0, min(encoded / duration * 100, 100.0))
+
+def children_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def start_jobs(movie_id, rendition_names):
+    """
+    Creates one running TranscodeJob per resolution and returns their primary keys.
+    """
+    started_at = now()
+    return [
+        TranscodeJob.objects.create(movie_id=movie_id, rendition=name, status=TranscodeJob.RUNNING, started_at=started_at).pk
+        for name in rendition_names
+    ]
+
+def mark_cached(movie_id, rendition_name):
+    """
+    Records a resolution that was taken from the transcode cache without running FFmpeg.
+    """
+    finished_at = now()
+    TranscodeJob.objects.create(
+        movie_id=movie_id, rendition=rendition_name, status=TranscodeJob.CACHED,
+        progress=100.0, started_at=finished_at, finished_at=finished_at,
+    )
+
+def run_ffmpeg(command, duration=0.0, job_ids=(), short=False):
+    """
+    Runs an FFmpeg command and reports its progress to the given TranscodeJob rows.
+
+    Parameters:
+        command (list): FFmpeg command as argument list, starting with 'ffmpeg'.
+        duration (float): Duration of the source in seconds, used for the percentage.
+        job_ids (iterable): Primary keys of the TranscodeJob rows fed by this process.
+            With several outputs in one process (single pass), every job gets the same
+            progress and an equal share of the CPU time.
+        short (bool): Run in the slot pool of short jobs (audio, split, concat), see `movie.governor`.
+
+    Behavior:
+        - Progress and speed are written at most once per PROGRESS_UPDATE_INTERVAL seconds.
+        - On exit the jobs are marked finished (progress 100) or failed, with the last reported
+          speed, end time and CPU seconds (user + system time of the FFmpeg child).
+        - FFmpeg's log output is buffered in a temporary file and printed on failure.
+        - FFmpeg only starts once a slot of the host is free (see `movie.governor`), the start
+          time of the jobs is reset then, so waiting for a slot does not count as encode time.
+
+    Returns:
+        int: The exit code of FFmpeg.
+    """
+    job_ids = list(job_ids)
+    jobs = TranscodeJob.objects.filter(pk__in=job_ids)
+    command = [command[0], '-progress', 'pipe:1', '-nostats', *command[1:]]
+    cpu_before = children_cpu_seconds()
+
+    with ffmpeg_slot(short), tempfile.TemporaryFile() as log:
+        if job_ids:
+            jobs.update(started_at=now())
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=log, text=True)
+        block = {}
+        speed = None
+        last_update = 0.0
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            block[key] = value
+            if key != 'progress':
+                continue
+            speed = parse_speed(block.get('speed'))
+            if job_ids and time.monotonic() - last_update >= PROGRESS_UPDATE_INTERVAL:
+                jobs.update(progress=progress_percent(block, duration), speed=speed)
+                last_update = time.monotonic()
+            block = {}
+        returncode = process.wait()
+        if returncode != 0:
+            log.seek(0)
+            print('FFmpeg error:', log.read()[-2000:].decode(errors='replace'))
+
+    if job_ids:
+        finish_jobs(job_ids, returncode == 0, (children_cpu_seconds() - cpu_before) / len(job_ids), speed)
+    return returncode
+
+def fail_jobs(job_ids):
+    """
+    Marks TranscodeJob rows failed whose FFmpeg process succeeded but whose output was rejected
+    (see `movie.outputs`), keeping the recorded times and CPU seconds.
+    """
+    TranscodeJob.objects.filter(pk__in=list(job_ids)).update(status=TranscodeJob.FAILED)
+
+def finish_jobs(job_ids, success, cpu_seconds, speed=None):
+    """
+    Marks TranscodeJob rows as finished (progress 100) or failed and records the end time,
+    the CPU seconds per job and, if known, the last encode speed.
+    """
+    jobs = TranscodeJob.objects.filter(pk__in=list(job_ids))
+    fields = {'finished_at': now(), 'cpu_seconds': cpu_seconds}
+    if speed is not None:
+        fields['speed'] = speed
+    if success:
+        jobs.update(status=TranscodeJob.FINISHED, progress=100.0, **fields)
+    else:
+        jobs.update(status=TranscodeJob.FAILED, **fields)
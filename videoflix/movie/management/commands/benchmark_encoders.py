@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from movie.governor import process_threads, rendition_threads
+from movie.transcode import RENDITIONS, get_rendition, rendition_video_args
+
+class Command(BaseCommand):
+    """
+    Benchmarks encoder presets and CRF values for every resolution of the ladder.
+
+    For every resolution a synthetic test clip is generated with FFmpeg's lavfi sources
+    (`testsrc2` video, `sine` audio), so no external media is needed. The clip is stored
+    losslessly, then encoded once per preset/CRF combination with the configured codec, using
+    the options of the pipeline (aligned keyframes, thread budget of `movie.governor`) so the
+    measured speed and size match a real conversion of the resolution.
+
+    Reported per run:
+    - fps: encoded frames per second of wall time
+    - bitrate: average bitrate of the output in kbit/s
+    - size: size of the output in bytes
+
+    The results are printed as table and can be written as JSON (`--json`). Apply the
+    chosen values with the VIDEO_ENCODER / VIDEO_RENDITION_ENCODERS settings.
+
+    Example:
+        python manage.py benchmark_encoders --presets veryfast,medium --crf 20,23,26 --json results.json
+    """
+    help = 'Benchmarks encoder presets and CRF values on synthetic clips for every resolution.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=int, default=10, help='Length of the test clips in seconds.')
+        parser.add_argument('--fps', type=int, default=30, help='Frame rate of the test clips.')
+        parser.add_argument('--presets', default='ultrafast,veryfast,fast,medium,slow', help='Comma separated encoder presets.')
+        parser.add_argument('--crf', default='18,23,28', help='Comma separated CRF values.')
+        parser.add_argument('--renditions', default=','.join(rendition['name'] for rendition in RENDITIONS),
+                            help='Comma separated resolutions of the ladder.')
+        parser.add_argument('--codec', default=settings.VIDEO_ENCODER['codec'], help='Video encoder to benchmark.')
+        parser.add_argument('--json', dest='json_path', help="Write the results as JSON to this file ('-' for stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            renditions = [get_rendition(name) for name in options['renditions'].split(',')]
+        except KeyError as error:
+            raise CommandError(f'Unknown resolution {error}')
+        presets = options['presets'].split(',')
+        crf_values = [int(value) for value in options['crf'].split(',')]
+
+        results = []
+        with tempfile.TemporaryDirectory() as work_dir:
+            for rendition in renditions:
+                clip = self.generate_clip(work_dir, rendition, options['duration'], options['fps'])
+                for preset in presets:
+                    for crf in crf_values:
+                        encoder = {'codec': options['codec'], 'preset': preset, 'crf': crf}
+                        results.append(self.encode(work_dir, clip, rendition, encoder, options['duration'], options['fps']))
+
+        self.write_table(results)
+        if options['json_path'] == '-':
+            self.stdout.write(json.dumps(results, indent=2))
+        elif options['json_path']:
+            with open(options['json_path'], 'w') as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+
+    def generate_clip(self, work_dir, rendition, duration, fps):
+        """
+        Generates a lossless synthetic clip in the size of the resolution.
+        """
+        clip = os.path.join(work_dir, f"source_{rendition['name']}.mkv")
+        size = f"{rendition['width']}x{rendition['height']}"
+        command = [
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={fps}:duration={duration}',
+            '-f', 'lavfi', '-i', f'sine=frequency=1000:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-qp', '0',
+            '-c:a', 'pcm_s16le',
+            clip,
+        ]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            raise CommandError(f"Could not generate test clip: {result.stderr.decode(errors='replace')}")
+        return clip
+
+    def encode(self, work_dir, clip, rendition, encoder, duration, fps):
+        """
+        Encodes the clip (video only) with the encoder settings and measures the run. The thread
+        counts are those of a conversion of the resolution on its own (see `movie.governor`).
+        """
+        output = os.path.join(work_dir, 'output.mp4')
+        threads = rendition_threads([rendition])[rendition['name']]
+        command = [
+            'ffmpeg', '-y', '-v', 'error', '-threads', str(process_threads()), '-i', clip, '-an',
+            *rendition_video_args(rendition, threads, encoder), output,
+        ]
+        started = time.perf_counter()
+        result = subprocess.run(command, capture_output=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f"Encoding failed: {result.stderr.decode(errors='replace')}")
+
+        size = os.path.getsize(output)
+        return {
+            'rendition': rendition['name'],
+            'codec': encoder['codec'],
+            'preset': encoder['preset'],
+            'crf': encoder['crf'],
+            'seconds': round(elapsed, 3),
+            'fps': round(duration * fps / elapsed, 1) if elapsed else 0.0,
+            'bitrate_kbps': round(size * 8 / duration / 1000, 1),
+            'size_bytes': size,
+        }
+
+    def write_table(self, results):
+        header = f"{'rendition':<10}{'preset':<11}{'crf':>4}{'fps':>10}{'kbit/s':>11}{'size':>12}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for result in results:
+            self.stdout.write(
+                f"{result['rendition']:<10}{result['preset']:<11}{result['crf']:>4}"
+                f"{result['fps']:>10}{result['bitrate_kbps']:>11}{result['size_bytes']:>12}"
+            )
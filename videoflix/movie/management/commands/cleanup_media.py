@@ -0,0 +1,44 @@
+import json
+from django.core.management.base import BaseCommand
+from movie.cleanup import delete_orphaned_media, find_orphaned_media, format_bytes
+
+class Command(BaseCommand):
+    """
+    Reports and removes media files that no movie refers to anymore (see `movie.cleanup`).
+
+    Without `--delete` the command is a dry run: it prints per media directory the bytes
+    used on disk and the bytes that can be reclaimed. With `--verbosity 2` every orphaned
+    file is listed.
+
+    Example:
+        python manage.py cleanup_media
+        python manage.py cleanup_media --delete --grace-hours 48
+    """
+    help = 'Reports (dry run) or deletes media files that are not referenced by the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Delete the orphaned files instead of only reporting them.')
+        parser.add_argument('--grace-hours', type=float, help='Keep files changed within this many hours (default: MEDIA_GC_GRACE_HOURS).')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        grace_seconds = options['grace_hours'] * 3600 if options['grace_hours'] is not None else None
+        report = find_orphaned_media(grace_seconds)
+        freed = delete_orphaned_media(report) if options['delete'] else 0
+
+        if options['json']:
+            self.stdout.write(json.dumps({'deleted': options['delete'], 'freed': freed, 'directories': report}, indent=2))
+            return
+
+        for root, usage in report.items():
+            self.stdout.write(f"{root:<22} used {format_bytes(usage['used']):>10}   "
+                              f"reclaimable {format_bytes(usage['reclaimable']):>10} ({len(usage['files'])} files)")
+            if options['verbosity'] > 1:
+                for path, size in usage['files']:
+                    self.stdout.write(f'  {path} ({format_bytes(size)})')
+
+        reclaimable = sum(usage['reclaimable'] for usage in report.values())
+        if options['delete']:
+            self.stdout.write(self.style.SUCCESS(f'Deleted orphaned media, {format_bytes(freed)} freed.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'Dry run: {format_bytes(reclaimable)} reclaimable, use --delete to remove the files.'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0003_alter_movie_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='hls_playlist',
+            field=models.FileField(blank=True, null=True, upload_to='uploads/hls/'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0004_movie_hls_playlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscodeCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('source_hash', models.CharField(db_index=True, max_length=64)),
+                ('rendition', models.CharField(max_length=10)),
+                ('file', models.FileField(max_length=255, upload_to='uploads/videos/')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0006_transcodejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='trickplay_vtt',
+            field=models.FileField(blank=True, null=True, upload_to='uploads/trickplay/'),
+        ),
+    ]
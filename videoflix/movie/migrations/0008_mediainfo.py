@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0007_movie_trickplay_vtt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaInfo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rendition', models.CharField(max_length=10)),
+                ('container', models.CharField(blank=True, max_length=100)),
+                ('video_codec', models.CharField(blank=True, max_length=50)),
+                ('audio_codec', models.CharField(blank=True, max_length=50)),
+                ('width', models.PositiveIntegerField(default=0)),
+                ('height', models.PositiveIntegerField(default=0)),
+                ('fps', models.FloatField(default=0.0)),
+                ('bitrate', models.PositiveBigIntegerField(default=0)),
+                ('audio_channels', models.PositiveSmallIntegerField(default=0)),
+                ('audio_layout', models.CharField(blank=True, max_length=50)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('duration', models.FloatField(default=0.0)),
+                ('probed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_info', to='movie.movie')),
+            ],
+            options={
+                'ordering': ['movie', 'height', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'rendition'), name='unique_media_info_per_rendition')],
+            },
+        ),
+    ]
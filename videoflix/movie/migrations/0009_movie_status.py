@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:47
+
+from django.db import migrations, models
+
+
+def mark_existing_movies_ready(apps, schema_editor):
+    Movie = apps.get_model('movie', 'Movie')
+    Movie.objects.exclude(video_file='').exclude(video_file__isnull=True).update(status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0008_mediainfo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_movies_ready, migrations.RunPython.noop),
+    ]
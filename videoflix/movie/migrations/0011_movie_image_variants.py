@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0010_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0011_movie_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['created_at', 'id'], name='movie_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre', 'created_at', 'id'], name='movie_genre_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['rating', 'created_at', 'id'], name='movie_rating_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['ranking', 'created_at', 'id'], name='movie_ranking_created_idx'),
+        ),
+    ]
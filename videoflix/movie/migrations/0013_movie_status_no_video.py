@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 05:40
+
+from django.db import migrations, models
+
+
+def mark_movies_without_video(apps, schema_editor):
+    Movie = apps.get_model('movie', 'Movie')
+    Movie.objects.filter(models.Q(video_file='') | models.Q(video_file__isnull=True)).update(status='no_video')
+
+
+def mark_movies_without_video_pending(apps, schema_editor):
+    Movie = apps.get_model('movie', 'Movie')
+    Movie.objects.filter(status='no_video').update(status='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0012_movie_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movie',
+            name='status',
+            field=models.CharField(choices=[('no_video', 'No video'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='no_video', max_length=10),
+        ),
+        migrations.RunPython(mark_movies_without_video, mark_movies_without_video_pending),
+    ]
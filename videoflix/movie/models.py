@@ -1,8 +1,12 @@
+import os
+import uuid
+from django.conf import settings
 from django.db import models
 from django.utils.timezone import now
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 from userprofile.models import CustomUser
+from .transcode import RENDITIONS
 
 class Movie(models.Model):
     """
@@ -25,9 +29,19 @@ class Movie(models.Model):
     - ranking (DecimalField): A user-defined ranking between 0.0 and 5.0 (1 decimal place).
     - duration (FloatField): Duration of the movie in minutes (default: 0.0).
     - image_file (FileField): Optional file field for the movies thumbnail image.
+    - image_variants (JSONField): Generated thumbnail sizes per image format,
+    e.g. {'webp': [{'width': 160, 'file': 'uploads/thumbnails/...'}, ...], 'avif': [...]}.
     - video_file (FileField): Optional file field for the movies video content.
+    - hls_playlist (FileField): HLS master playlist of all converted resolutions, set by the packaging task.
+    - trickplay_vtt (FileField): WebVTT index of the seek preview sprite sheets, set by the trickplay task.
+    - status (CharField): Processing state of the video: no_video (default, nothing to process), pending
+    (queued), processing (ingest running), ready (converted and packaged) or failed.
     - created_at (DateTimeField): Timestamp automatically set at creation time.
 
+    Indexes:
+    - (created_at, id), alone or after genre, rating or ranking: the keyset pagination of the
+    catalog (`movie.api.pagination`) reads every page, filtered or not, as one index range.
+
     Methods:
     - __str__(): Returns a readable string representation of the movie using its ID and title.
     """
@@ -46,6 +60,20 @@ class Movie(models.Model):
     (18, "18"),
 ]
 
+    NO_VIDEO = 'no_video'
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    READY = 'ready'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = {
+        NO_VIDEO: "No video",
+        PENDING: "Pending",
+        PROCESSING: "Processing",
+        READY: "Ready",
+        FAILED: "Failed",
+    }
+
     title = models.CharField(max_length=30)
     description = models.TextField(max_length=500)
     genre = models.CharField(max_length=30, choices=GENRE_CHOICES, default="NEW")
@@ -53,9 +81,21 @@ class Movie(models.Model):
     ranking = models.DecimalField(decimal_places=1, max_digits=2,validators=[MinValueValidator(0.0), MaxValueValidator(5.0)], default=0.0)
     duration = models.FloatField(default=0.0)
     image_file = models.FileField(upload_to='uploads/thumbnails/', null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True)
     video_file = models.FileField(upload_to='uploads/videos/', null=True, blank=True)
+    hls_playlist = models.FileField(upload_to='uploads/hls/', null=True, blank=True)
+    trickplay_vtt = models.FileField(upload_to='uploads/trickplay/', null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=NO_VIDEO)
     created_at = models.DateTimeField(default=now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='movie_created_idx'),
+            models.Index(fields=['genre', 'created_at', 'id'], name='movie_genre_created_idx'),
+            models.Index(fields=['rating', 'created_at', 'id'], name='movie_rating_created_idx'),
+            models.Index(fields=['ranking', 'created_at', 'id'], name='movie_ranking_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.id} {self.title}"
     
@@ -77,6 +117,10 @@ class MovieConvertables(models.Model):
     - video_720p (FileField): Optional file field for the 720p resolution video version.
     - video_1080p (FileField): Optional file field for the 1080p resolution video version.
 
+    Properties:
+    - available_renditions: Names of the converted resolutions. Resolutions above the source
+    resolution are never created, so clients should only request the listed ones.
+
     Notes:
     - All video fields are optional (`null=True, blank=True`) to support partial conversions.
     - Files are stored in the 'uploads/videos/' directory.
@@ -87,6 +131,13 @@ class MovieConvertables(models.Model):
     video_720p = models.FileField(upload_to='uploads/videos/', null=True, blank=True)
     video_1080p = models.FileField(upload_to='uploads/videos/', null=True, blank=True)
 
+    @property
+    def available_renditions(self):
+        """
+        Names of the resolutions that have been converted, ordered from low to high (e.g. ['120p', '360p']).
+        """
+        return [rendition['name'] for rendition in RENDITIONS if getattr(self, rendition['field'])]
+
 class MovieProgress(models.Model):
     """
     Defines the MovieProgress model, which tracks a user's viewing progress on a specific movie.
@@ -133,4 +184,165 @@ class ConnectionTestFile(models.Model):
     Files are saved in the 'uploads/testfile/' directory.
     The field allows null values and can be left blank.
     """
-    file = models.FileField(upload_to='uploads/testfile/', null=True, blank=True)
\ No newline at end of file
+    file = models.FileField(upload_to='uploads/testfile/', null=True, blank=True)
+
+class TranscodeCacheEntry(models.Model):
+    """
+    Defines the TranscodeCacheEntry model, which remembers a converted resolution
+    by the content of its source video.
+
+    Fields:
+    - cache_key (CharField): SHA-256 of the source hash and the encode parameters of the resolution. Unique.
+    - source_hash (CharField): SHA-256 of the source video content.
+    - rendition (CharField): Name of the resolution (e.g. '720p').
+    - file (FileField): The converted file, relative to MEDIA_ROOT.
+    - created_at (DateTimeField): Timestamp automatically set at creation time.
+
+    Notes:
+    - Used by the conversion tasks to link an existing output instead of running FFmpeg
+      when the same video is uploaded again.
+    """
+    cache_key = models.CharField(max_length=64, unique=True)
+    source_hash = models.CharField(max_length=64, db_index=True)
+    rendition = models.CharField(max_length=10)
+    file = models.FileField(upload_to='uploads/videos/', max_length=255)
+    created_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return f"{self.rendition} {self.source_hash[:12]}"
+
+class TranscodeJob(models.Model):
+    """
+    Defines the TranscodeJob model, which tracks the conversion of one resolution of a movie.
+
+    The conversion tasks create one job per resolution and update it from FFmpeg's
+    machine readable progress output, so conversion status, speed and cost are visible
+    in the admin and through the API.
+
+    Fields:
+    - movie (ForeignKey): The converted Movie. The `related_name='transcode_jobs'` allows reverse access.
+    - rendition (CharField): Name of the resolution (e.g. '720p').
+    - status (CharField): One of pending, running, finished, failed or cached (taken from the transcode cache).
+    - progress (FloatField): Percentage done (0.0 - 100.0).
+    - speed (FloatField): Encode speed as multiple of real time (e.g. 2.5 for '2.5x'). Nullable.
+    - started_at / finished_at (DateTimeField): Start and end of the FFmpeg process. Nullable.
+    - cpu_seconds (FloatField): User + system CPU time of the FFmpeg process. With several
+    resolutions in one process, every job gets an equal share.
+    - created_at (DateTimeField): Timestamp automatically set at creation time.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+    CACHED = 'cached'
+
+    STATUS_CHOICES = {
+        PENDING: "Pending",
+        RUNNING: "Running",
+        FINISHED: "Finished",
+        FAILED: "Failed",
+        CACHED: "Cached",
+    }
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='transcode_jobs')
+    rendition = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.FloatField(default=0.0)
+    speed = models.FloatField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    cpu_seconds = models.FloatField(default=0.0)
+    created_at = models.DateTimeField(default=now)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+
+    def __str__(self):
+        return f"{self.movie_id} {self.rendition} {self.status}"
+
+class MediaInfo(models.Model):
+    """
+    Defines the MediaInfo model, which stores the probed properties of the source video
+    or of one converted resolution of a movie.
+
+    The source is probed once at ingest and every resolution once after its conversion,
+    so codec, bitrate and resolution can be read from the database instead of running
+    ffprobe again.
+
+    Fields:
+    - movie (ForeignKey): The probed Movie. The `related_name='media_info'` allows reverse access.
+    - rendition (CharField): 'source' for the uploaded video, otherwise the name of the resolution (e.g. '720p').
+    - container (CharField): Container format as reported by ffprobe (e.g. 'mov,mp4,m4a,3gp,3g2,mj2').
+    - video_codec / audio_codec (CharField): Codec names (e.g. 'h264', 'aac'). Empty without audio.
+    - width / height (PositiveIntegerField): Frame size in pixels.
+    - fps (FloatField): Average frame rate.
+    - bitrate (PositiveBigIntegerField): Overall bitrate in bits per second.
+    - audio_channels (PositiveSmallIntegerField): Number of audio channels.
+    - audio_layout (CharField): Audio channel layout (e.g. 'stereo').
+    - size (PositiveBigIntegerField): File size in bytes.
+    - duration (FloatField): Duration in seconds.
+    - probed_at (DateTimeField): Time of the probe.
+
+    Notes:
+    - One entry per movie and rendition; a new probe replaces the old values.
+    """
+    SOURCE = 'source'
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='media_info')
+    rendition = models.CharField(max_length=10)
+    container = models.CharField(max_length=100, blank=True)
+    video_codec = models.CharField(max_length=50, blank=True)
+    audio_codec = models.CharField(max_length=50, blank=True)
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    fps = models.FloatField(default=0.0)
+    bitrate = models.PositiveBigIntegerField(default=0)
+    audio_channels = models.PositiveSmallIntegerField(default=0)
+    audio_layout = models.CharField(max_length=50, blank=True)
+    size = models.PositiveBigIntegerField(default=0)
+    duration = models.FloatField(default=0.0)
+    probed_at = models.DateTimeField(default=now)
+
+    class Meta:
+        ordering = ['movie', 'height', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'rendition'], name='unique_media_info_per_rendition'),
+        ]
+
+    def __str__(self):
+        return f"{self.movie_id} {self.rendition} {self.width}x{self.height}"
+
+class Upload(models.Model):
+    """
+    Defines the Upload model, a resumable upload of the source video of a movie.
+
+    The video is sent in chunks (see `movie.uploads`). Received bytes are appended to a
+    partial file below `settings.VIDEO_UPLOAD_TEMP_DIR`, so an interrupted upload continues
+    at `offset` instead of starting again.
+
+    Fields:
+    - id (UUIDField): Primary key, part of the upload URL.
+    - movie (ForeignKey): The Movie that receives the video. The `related_name='uploads'` allows reverse access.
+    - filename (CharField): Original file name of the video.
+    - length (PositiveBigIntegerField): Total size of the video in bytes.
+    - offset (PositiveBigIntegerField): Number of bytes received so far.
+    - created_by (ForeignKey): The user who started the upload. Nullable.
+    - created_at (DateTimeField): Timestamp automatically set at creation time.
+    - completed_at (DateTimeField): Time the video was attached to the movie. Nullable.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.VIDEO_UPLOAD_TEMP_DIR, f'{self.id}.part')
+
+    def __str__(self):
+        return f"{self.movie_id} {self.filename} {self.offset}/{self.length}"
+
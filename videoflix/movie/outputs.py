@@ -0,0 +1,97 @@
+"""
+Atomic, validated writes of FFmpeg outputs.
+
+FFmpeg writes every output to a temporary name next to its final path (see
+`movie.transcode.partial_path`). Only when FFmpeg succeeded and a quick probe of the
+file looks right (streams present, duration close to the source) is it renamed into
+place with `os.replace`, which is atomic on the same filesystem. A killed FFmpeg or a
+crashed worker therefore never leaves a truncated file under the final name, where it
+would be served, cached or mistaken for a finished conversion.
+"""
+import json
+import os
+import subprocess
+from .transcode import parse_probe, partial_path
+
+DURATION_TOLERANCE = 0.02
+MIN_DURATION_TOLERANCE = 1.0
+
+class InvalidOutputError(ValueError):
+    """
+    Raised when an FFmpeg output is missing, unreadable or does not match the source.
+    """
+
+def probe_file(path):
+    """
+    Probes a local media file with ffprobe and returns the raw JSON output as dict.
+
+    Raises:
+        subprocess.CalledProcessError: If ffprobe fails to execute.
+        json.JSONDecodeError: If the ffprobe output is not valid JSON.
+    """
+    command = ['ffprobe', '-v', 'quiet', '-show_streams', '-show_format', '-of', 'json', path]
+    return json.loads(subprocess.check_output(command).decode())
+
+def validate_output(path, duration=None, audio=False, video=True):
+    """
+    Checks an FFmpeg output with a quick probe.
+
+    Parameters:
+        path (str): Local path of the output.
+        duration (float, optional): Expected duration in seconds. The output may differ by
+            DURATION_TOLERANCE of it (at least MIN_DURATION_TOLERANCE seconds).
+        audio (bool): Whether the output must contain an audio stream.
+        video (bool): Whether the output must contain a video stream.
+
+    Returns:
+        dict: The probed properties (see `movie.transcode.parse_probe` for video outputs).
+
+    Raises:
+        InvalidOutputError: If the file cannot be probed or a check fails.
+    """
+    if not os.path.exists(path):
+        raise InvalidOutputError(f'{path} was not written')
+    try:
+        data = probe_file(path)
+        if video:
+            info = parse_probe(data)
+        else:
+            streams = data.get('streams', [])
+            info = {
+                'duration': float(data.get('format', {}).get('duration', 0.0)),
+                'has_audio': any(stream.get('codec_type') == 'audio' for stream in streams),
+            }
+    except (OSError, KeyError, ValueError, subprocess.CalledProcessError) as error:
+        raise InvalidOutputError(f'{path} cannot be probed: {error}')
+
+    if audio and not info['has_audio']:
+        raise InvalidOutputError(f'{path} has no audio stream')
+    if duration:
+        tolerance = max(duration * DURATION_TOLERANCE, MIN_DURATION_TOLERANCE)
+        if abs(info['duration'] - duration) > tolerance:
+            raise InvalidOutputError(f"{path} is {info['duration']:.2f}s long, expected {duration:.2f}s")
+    return info
+
+def commit_output(path, duration=None, audio=False, video=True):
+    """
+    Validates the temporary output of `path` (see `validate_output`) and renames it into place.
+    An invalid temporary file is removed.
+
+    Parameters:
+        path (str): Final path of the output, FFmpeg wrote to `partial_path(path)`.
+
+    Returns:
+        dict: The probed properties of the output.
+
+    Raises:
+        InvalidOutputError: If the output is missing or invalid.
+    """
+    partial = partial_path(path)
+    try:
+        info = validate_output(partial, duration, audio, video)
+    except InvalidOutputError:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.replace(partial, path)
+    return info
@@ -0,0 +1,107 @@
+"""
+Selects the poster frame (thumbnail) of a video.
+
+Instead of always taking the frame at one second, which is often a black fade-in
+or a studio logo, a set of candidate frames from the first minutes is analysed:
+FFmpeg decodes only the keyframes of that range (`-skip_frame nokey`), keeps one keyframe
+per step of the range (so the candidates are spread over all of it, not bunched at its
+start), scales them down to small grayscale images and pipes them as raw video in a
+single process.
+The frames are scored with NumPy as one array, the position of the best frame is
+then used for the thumbnail.
+"""
+import re
+import subprocess
+import numpy as np
+from .governor import ffmpeg_slot, short_job_threads
+
+POSTER_WINDOW_SECONDS = 180
+POSTER_MAX_CANDIDATES = 32
+POSTER_FRAME_WIDTH = 160
+POSTER_FRAME_HEIGHT = 90
+DEFAULT_POSTER_POSITION = 1.0
+
+PTS_TIME_RE = re.compile(r'pts_time:\s*(-?[0-9.]+)')
+
+def build_candidates_command(file_path, window=POSTER_WINDOW_SECONDS, max_candidates=POSTER_MAX_CANDIDATES):
+    """
+    Builds an FFmpeg command that decodes the keyframes of the first `window` seconds,
+    keeps the first keyframe of every `window / max_candidates` seconds (`select` on the time
+    since the last kept frame), scales them to POSTER_FRAME_WIDTH x POSTER_FRAME_HEIGHT grayscale
+    and writes them as raw video to stdout. The `showinfo` filter logs the timestamp of every
+    frame to stderr.
+    """
+    step = window / max_candidates
+    return [
+        'ffmpeg',
+        '-threads', str(short_job_threads()),
+        '-skip_frame', 'nokey',
+        '-t', str(window),
+        '-i', file_path,
+        '-an',
+        '-vf', f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{step:g})',scale={POSTER_FRAME_WIDTH}:{POSTER_FRAME_HEIGHT},format=gray,showinfo",
+        '-fps_mode', 'vfr',
+        '-frames:v', str(max_candidates),
+        '-f', 'rawvideo',
+        'pipe:1',
+    ]
+
+def parse_frame_times(log):
+    """
+    Returns the timestamps (seconds) of the frames logged by the `showinfo` filter, in order.
+    """
+    return [float(value) for value in PTS_TIME_RE.findall(log)]
+
+def score_frames(frames):
+    """
+    Scores grayscale frames as poster candidates.
+
+    Parameters:
+        frames (numpy.ndarray): uint8 array of shape (count, height, width).
+
+    Returns:
+        numpy.ndarray: One score per frame, higher is better. The score combines
+        - brightness: closeness of the mean to mid gray (dark and washed out frames lose),
+        - contrast: standard deviation of the pixel values,
+        - sharpness: mean absolute difference of neighbouring pixels (edges and detail),
+        and is weighted by the share of non-black pixels, so fades and letterboxed
+        logos on black rank last.
+    """
+    pixels = frames.astype(np.float32)
+    flat = pixels.reshape(len(pixels), -1)
+    brightness = 1.0 - np.abs(flat.mean(axis=1) - 128.0) / 128.0
+    contrast = np.clip(flat.std(axis=1) / 64.0, 0.0, 1.0)
+    sharpness = np.clip(
+        (np.abs(np.diff(pixels, axis=1)).mean(axis=(1, 2)) + np.abs(np.diff(pixels, axis=2)).mean(axis=(1, 2))) / 32.0,
+        0.0, 1.0,
+    )
+    non_black = (flat > 24).mean(axis=1)
+    return non_black * (0.3 * brightness + 0.3 * contrast + 0.4 * sharpness)
+
+def select_poster_position(file_path, duration=0.0):
+    """
+    Returns the position (seconds) of the best poster frame in the first minutes of a video.
+
+    Parameters:
+        file_path (str): Absolute path to the source video.
+        duration (float): Duration of the video in seconds, limits the analysed range.
+
+    Returns:
+        float: Timestamp of the best scored candidate, DEFAULT_POSTER_POSITION (or 0 for
+        videos shorter than that) if FFmpeg fails or returns no frames.
+    """
+    fallback = DEFAULT_POSTER_POSITION if not duration or duration > DEFAULT_POSTER_POSITION else 0.0
+    window = min(duration, POSTER_WINDOW_SECONDS) if duration else POSTER_WINDOW_SECONDS
+    with ffmpeg_slot(short=True):
+        result = subprocess.run(build_candidates_command(file_path, window), capture_output=True)
+    if result.returncode != 0:
+        print('FFmpeg error:', result.stderr.decode(errors='replace')[-2000:])
+        return fallback
+
+    frame_size = POSTER_FRAME_WIDTH * POSTER_FRAME_HEIGHT
+    times = parse_frame_times(result.stderr.decode(errors='replace'))
+    count = min(len(result.stdout) // frame_size, len(times))
+    if count == 0:
+        return fallback
+    frames = np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8).reshape(count, POSTER_FRAME_HEIGHT, POSTER_FRAME_WIDTH)
+    return max(times[int(np.argmax(score_frames(frames)))], 0.0)
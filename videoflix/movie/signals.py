@@ -1,14 +1,52 @@
-import json
-from .models import Movie, MovieConvertables
+from .models import MediaInfo, Movie, MovieConvertables
 from django.dispatch import receiver
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
+import glob
+import shutil
 import subprocess
 import os
-from celery import shared_task
-from django.core.files.base import ContentFile
+from celery import chord, group, shared_task
+from celery.utils.time import get_exponential_backoff_interval
 from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from videoflix.celery import PRIORITY_HIGHEST
+from .transcode import (
+    RENDITIONS, THUMBNAIL_FORMATS, audio_path, build_audio_command, build_concat_command, build_hls_command,
+    build_ladder, build_master_playlist, build_multi_output_command, build_split_command, build_thumbnail_command,
+    build_trickplay_command, build_trickplay_vtt, chunk_directory, get_rendition, hls_directory, parse_probe,
+    partial_path, rendition_path, thumbnail_directory, thumbnail_path, thumbnail_widths, trickplay_directory,
+)
+from .outputs import InvalidOutputError, commit_output, probe_file
+from .transcode_cache import hash_file, is_cached, restore_from_cache, store_in_cache
+from .poster import DEFAULT_POSTER_POSITION, select_poster_position
+from .governor import ffmpeg_slot
+from .storage import delete_tree, fetch, list_media, local_path, media_exists, publish, publish_tree, release, storage_name
+from .catalog_cache import invalidate_catalog
+from .tasks import schedule_catalog_snapshot
+from .jobs import children_cpu_seconds, fail_jobs, finish_jobs, mark_cached, run_ffmpeg, start_jobs
+
+RENDITION_MAX_RETRIES = 3
+RETRY_BACKOFF = 30
+RETRY_BACKOFF_MAX = 600
+
+
+
+@receiver(pre_save, sender=Movie)
+def movie_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Signal handler triggered before a Movie instance is saved.
 
-
+    Remembers on the instance (`_video_file_changed`) whether the save stores a new video file,
+    by comparing the file with the value that is still in the database. Saves with `update_fields`
+    that do not contain `video_file` (e.g. the pipeline tasks) are skipped without a query.
+    """
+    if update_fields is not None and 'video_file' not in update_fields:
+        instance._video_file_changed = False
+        return
+    previous = Movie.objects.filter(pk=instance.pk).values_list('video_file', flat=True).first() if instance.pk else None
+    video_file = instance.video_file
+    instance._video_file_changed = bool(video_file) and (not video_file._committed or video_file.name != previous)
 
 @receiver(post_save, sender=Movie)
 def movie_post_save(sender, instance, created, **kwargs):
@@ -16,9 +54,12 @@ def movie_post_save(sender, instance, created, **kwargs):
     Signal handler triggered after a Movie instance is saved.
 
     Behavior:
-    - If a new Movie instance is created and has a video file, triggers the `process_video` function.
-    - If an existing Movie instance is updated and its `video_file` has changed to a new file,
-      also triggers the `process_video` function.
+    - If a new Movie instance is created with a video file, or the `video_file` of an existing
+      instance changed (see `movie_pre_save`), the movie is marked pending and the ingest pipeline
+      (`ingest_movie`) is queued.
+    - A movie without video file has nothing to process and is marked no_video (the default).
+    - The task is queued with `transaction.on_commit`, so it is only sent once the saved row is
+      visible to the workers and never for a rolled back save.
     - Prevents re-processing if the video file remains unchanged.
 
     Parameters:
@@ -29,51 +70,155 @@ def movie_post_save(sender, instance, created, **kwargs):
 
     Use case:
     This ensures that video processing (conversion, thumbnail generation) happens automatically
-    on creation or whenever the video file is changed.
-    """    
-    if created and instance.video_file:
-        process_video(instance)
+    on creation or whenever the video file is changed, without running ffprobe or FFmpeg in the
+    request that saves the movie (e.g. the admin).
+    """
+    if not instance.video_file:
+        if instance.status != Movie.NO_VIDEO:
+            instance.status = Movie.NO_VIDEO
+            update_movie(instance.pk, status=Movie.NO_VIDEO)
+        return
+    if not getattr(instance, '_video_file_changed', False):
+        return
+    instance._video_file_changed = False
+    if instance.status != Movie.PENDING:
+        instance.status = Movie.PENDING
+        update_movie(instance.pk, status=Movie.PENDING)
+    movie_id = instance.pk
+    transaction.on_commit(lambda: ingest_movie.apply_async((movie_id,), priority=PRIORITY_HIGHEST))
+
+@receiver([post_save, post_delete], sender=Movie)
+@receiver([post_save, post_delete], sender=MovieConvertables)
+@receiver([post_save, post_delete], sender=MediaInfo)
+def catalog_changed(sender, **kwargs):
+    """
+    Signal handler triggered after a Movie, MovieConvertables or MediaInfo instance is saved or deleted.
+    Outdates the cached catalog responses (see `movie.catalog_cache`) and queues a new catalog
+    snapshot (see `movie.snapshot`).
+    """
+    invalidate_catalog()
+    schedule_catalog_snapshot()
 
-    elif not created:
-        try:
-            previous = Movie.objects.get(pk=instance.pk)
-        except Movie.DoesNotExist:
-            previous = None
+def update_movie(movie_id, **fields):
+    """
+    Updates fields of a movie with a single query (no model signals, no full save) and outdates
+    the cached catalog responses and the catalog snapshot, which the queryset update would
+    otherwise leave untouched.
+    """
+    Movie.objects.filter(pk=movie_id).update(**fields)
+    invalidate_catalog()
+    schedule_catalog_snapshot()
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def ingest_movie(movie_id):
+    """
+    First step of the ingest pipeline: probes the video of a movie and queues its processing.
 
-        if previous and previous.video_file != instance.video_file and instance.video_file:
-            process_video(instance)
+    Marks the movie as processing and runs `process_video`. If the source cannot be probed
+    (missing file, no video stream, ffprobe error) the movie is marked failed.
+
+    Parameters:
+        movie_id (int): Primary key of the Movie instance to process.
+    """
+    movie = Movie.objects.filter(pk=movie_id).first()
+    if movie is None or not movie.video_file:
+        return
+    update_movie(movie_id, status=Movie.PROCESSING)
+    try:
+        process_video(movie)
+    except (OSError, ValueError, subprocess.CalledProcessError) as error:
+        print(f'probe of movie {movie_id} failed: {error}')
+        update_movie(movie_id, status=Movie.FAILED)
+    finally:
+        release(local_path(movie.video_file.name))
 
 def process_video(instance: Movie):
     """
-    Processes a Movie instance by extracting video metadata and queuing multiple
-    asynchronous tasks to convert the video into various resolutions and generate a thumbnail.
+    Processes a Movie instance by extracting video metadata and queuing the conversion into
+    various resolutions, the thumbnail and the seek previews as one Celery chord.
 
     Workflow:
-    - Retrieves the video's duration using the `get_duration` function and updates the Movie instance.
+    - Probes the source (duration, width, height, bitrate, fps, codecs, ...) with `probe_video`, updates the
+      duration of the Movie instance and stores the probe as MediaInfo of the source.
     - Ensures that a related MovieConvertables object exists for storing converted video file paths.
-    - Dispatches Celery tasks to convert the video into multiple resolutions (120p, 360p, 720p, 1080p).
-    - Dispatches a Celery task to generate a WebP thumbnail from the video.
+    - Builds the resolution ladder from the probe: resolutions above the source height are skipped,
+      so a video is never upscaled (see `movie.transcode.build_ladder`).
+    - Builds the conversion into the remaining resolutions (120p, 360p, 720p, 1080p). Depending on
+      `settings.VIDEO_TRANSCODE_MODE` this is either one single pass task ('single_pass') that decodes
+      the source once, one Celery task per resolution ('per_rendition') or a split/encode/concat
+      transcode whose chunks are encoded in parallel by all workers ('chunked'). Videos shorter than
+      `settings.VIDEO_CHUNKED_MIN_DURATION` fall back from 'chunked' to 'single_pass'.
+    - Gives the conversion tasks ascending priority from the lowest to the highest resolution, so a new
+      movie becomes playable quickly. With `settings.VIDEO_FAST_START` the single pass mode converts
+      the lowest resolution in a separate high priority task next to the pass for the other resolutions.
+    - Adds the WebP thumbnail and the seek preview sprites (trickplay) of the video.
+    - Queues all of these tasks in parallel as header of a chord whose callback (`finalize_ingest`)
+      packages the resolutions as HLS and marks the movie ready.
+    - Hashes the source once for the transcode cache and passes the hash to the conversion tasks,
+      which therefore never read the whole source just to look up cached resolutions.
+    - If the source has audio, the conversions are queued by `encode_audio` (highest priority) once it
+      has encoded the audio; every resolution copies this track instead of encoding the audio again.
+      The thumbnail and the seek previews do not wait for it. If the transcode cache holds every
+      resolution of the ladder, no audio is encoded: the conversions only restore cached files.
 
     Parameters:
         instance (Movie): The Movie model instance representing the uploaded video.
 
     Notes:
-        - All conversion and thumbnail generation tasks are executed asynchronously using Celery.
+        - Called by the `ingest_movie` task, never in the request that saved the movie.
         - The function updates the `duration` field directly in the database to avoid unnecessary model reload.
+        - The duration is stored before the chord is queued, so every task of the chord can read it.
 
-    Example usage:
-        process_video(movie_instance)
+    Raises:
+        subprocess.CalledProcessError / OSError / ValueError: If the source cannot be probed.
     """
-    duration = get_duration(instance.video_file)
-    Movie.objects.filter(pk=instance.pk).update(duration=duration)
+    source = probe_video(instance.video_file)
+    update_movie(instance.pk, duration=source['duration'])
+    store_media_info(instance.pk, MediaInfo.SOURCE, source)
 
     convertables, _ = MovieConvertables.objects.get_or_create(movie=instance)
+    ladder = [rendition['name'] for rendition in build_ladder(source)]
+
+    file_path = local_path(instance.video_file.name)
+    mode = settings.VIDEO_TRANSCODE_MODE
+    if mode == 'chunked' and source['duration'] < settings.VIDEO_CHUNKED_MIN_DURATION:
+        mode = 'single_pass'
+
+    source_hash = hash_file(fetch(file_path))
+    conversions = []
+    if mode == 'chunked':
+        conversions.append(transcode_chunked.si(file_path, convertables.id, ladder, source_hash=source_hash).set(priority=rendition_priority(ladder[0])))
+    elif mode == 'single_pass':
+        if settings.VIDEO_FAST_START and len(ladder) > 1:
+            conversions.append(convert_all_renditions.si(file_path, convertables.id, ladder[:1], source_hash=source_hash).set(priority=rendition_priority(ladder[0])))
+        remaining = ladder[len(conversions):]
+        conversions.append(convert_all_renditions.si(file_path, convertables.id, remaining, source_hash=source_hash).set(priority=rendition_priority(remaining[0])))
+    else:
+        tasks = {'120p': convert120p, '360p': convert360p, '720p': convert720p, '1080p': convert1080p}
+        for name in ladder:
+            conversions.append(tasks[name].si(file_path, convertables.id, source_hash=source_hash).set(priority=rendition_priority(name)))
+
+    header = conversions
+    if source['has_audio'] and not ladder_is_cached(source_hash, ladder):
+        header = [encode_audio.si(file_path, conversions).set(priority=PRIORITY_HIGHEST)]
+    header = header + [generate_thumbnail.si(file_path, instance.pk), generate_trickplay.si(file_path, instance.pk)]
+
+    callback = finalize_ingest.si(instance.pk, convertables.id).on_error(ingest_failed.si(instance.pk))
+    chord(header, callback).apply_async()
 
-    convert120p.delay(instance.video_file.path, convertables.id)
-    convert360p.delay(instance.video_file.path, convertables.id)
-    convert720p.delay(instance.video_file.path, convertables.id)
-    convert1080p.delay(instance.video_file.path, convertables.id)
-    generate_thumbnail.delay(instance.video_file.path, instance.pk)
+def ladder_is_cached(source_hash, ladder):
+    """
+    Returns whether the transcode cache holds every resolution of the ladder for the content hash of the source.
+    """
+    return all(is_cached(source_hash, get_rendition(name)) for name in ladder)
+
+def rendition_priority(name):
+    """
+    Returns the Celery priority of a conversion task by its (lowest) resolution:
+    120p -> 1, 360p -> 3, 720p -> 5, 1080p -> 7 (Redis: lower runs first). The thumbnail
+    and the emails use the highest priority 0, see `videoflix.celery`.
+    """
+    return PRIORITY_HIGHEST + 1 + 2 * RENDITIONS.index(get_rendition(name))
 
      
 def check_convert_status(status, file):
@@ -88,230 +233,770 @@ def check_convert_status(status, file):
             print(f'error convert and create file {file}')
             return None
     
-def get_duration(input_video):
+def probe_video(input_video):
     """
-    Retrieves the duration of a video file using ffprobe.
-    This function executes ffprobe to extract metadata about the first video stream
-    of the given video file and returns the duration in seconds as a string.
+    Probes a video file with ffprobe and returns the properties of the source.
 
     Parameters:
-        input_video: A Django FileField or any object with a `.path` attribute pointing to the video file.
+        input_video: A Django FieldFile of the media storage (downloaded first if the storage is remote).
 
     Returns:
-        duration (str): The duration of the video in seconds, as reported by ffprobe.
+        dict: duration (seconds), width, height, bitrate (bits per second), fps, has_audio, container,
+        codecs, audio layout and file size, see `movie.transcode.parse_probe`.
 
     Raises:
         subprocess.CalledProcessError: If ffprobe fails to execute.
-        KeyError / IndexError: If the expected data is not found in the ffprobe output.
+        ValueError: If the file has no video stream.
         json.JSONDecodeError: If the ffprobe output is not valid JSON.
+    """
+    return parse_probe(probe_file(fetch(local_path(input_video.name))))
 
+def store_media_info(movie_id, rendition_name, info):
     """
-    result = subprocess.check_output(f'ffprobe -v quiet -show_streams -select_streams v:0 -of json "{input_video.path}"', shell=True).decode()
-    fields = json.loads(result)['streams'][0]
-    duration = fields['duration']
-    return duration
+    Creates or replaces the MediaInfo entry of a movie for the source ('source') or a resolution
+    from the properties returned by `probe_video`.
+    """
+    fields = ['container', 'video_codec', 'audio_codec', 'width', 'height', 'fps', 'bitrate',
+              'audio_channels', 'audio_layout', 'size', 'duration']
+    defaults = {field: info[field] for field in fields if field in info}
+    defaults['probed_at'] = now()
+    MediaInfo.objects.update_or_create(movie_id=movie_id, rendition=rendition_name, defaults=defaults)
 
-@shared_task
-def convert120p(file_path, convertables_id):
+def get_duration(input_video):
+    """
+    Retrieves the duration of a video file in seconds using `probe_video`.
+    """
+    return probe_video(input_video)['duration']
+
+def transcode_renditions(file_path, convertables_id, renditions, task=None, source_hash=None):
+    """
+    Converts a video file into the given resolutions and stores the results on the
+    MovieConvertables instance. Shared by the per-resolution tasks and the single pass task.
+
+    Workflow:
+    - Uses the content hash of the source passed by the ingest, or hashes the source (streamed in chunks).
+    - Links every resolution that is found in the transcode cache for this hash and
+      these encode parameters into place, without running FFmpeg.
+    - Converts all remaining resolutions with one FFmpeg process (the source is decoded once).
+      FFmpeg writes temporary files, which are probed and only renamed into place if they are
+      valid (see `movie.outputs`). Valid outputs are registered in the transcode cache.
+    - Tracks every resolution as TranscodeJob (progress, speed, CPU time, see `movie.jobs`).
+    - Writes the created resolution fields with a single targeted save.
+    - With a remote media storage, downloads the source and the shared audio first, uploads
+      the created resolutions and removes the scratch copies (see `movie.storage`).
+
+    - If a resolution failed, the calling task is retried with backoff (`retry_failed`). The valid
+      resolutions are stored and cached before, so the retry only converts the failed ones.
+
+    Parameters:
+        file_path (str): Absolute path to the original video file.
+        convertables_id (int): Primary key of the MovieConvertables instance to update.
+        renditions (list): Ladder entries (see `movie.transcode.RENDITIONS`) to produce.
+        task (Task, optional): The bound Celery task to retry if a resolution failed.
+        source_hash (str, optional): Content hash of the source for the transcode cache, computed once
+            by `process_video`. The source is hashed again if it is missing.
+
+    Returns:
+        list: Names of the updated MovieConvertables fields. Empty if the instance does not exist
+        or nothing could be created.
+    """
+    try:
+        convertable = MovieConvertables.objects.select_related('movie').get(pk=convertables_id)
+    except MovieConvertables.DoesNotExist:
+        return []
+    movie = convertable.movie
+
+    source_hash = source_hash or hash_file(fetch(file_path))
+    pending = restore_cached_renditions(movie.pk, source_hash, file_path, renditions)
+    audio_file = shared_audio_file(file_path)
+
+    failed = []
+    probed = {}
+    if pending:
+        fetch(file_path)
+        job_ids = start_jobs(movie.pk, [rendition['name'] for rendition in pending])
+        command = build_multi_output_command(file_path, pending, audio_file=audio_file)
+        returncode = run_ffmpeg(command, float(movie.duration), job_ids)
+        duration, audio = expected_output(movie)
+        failed = commit_renditions(file_path, pending, check_convert_status(returncode, file_path) is not None, duration, audio, probed)
+        for rendition, job_id in zip(pending, job_ids):
+            if rendition['name'] in failed:
+                fail_jobs([job_id])
+                continue
+            output = rendition_path(file_path, rendition['name'])
+            publish(output)
+            store_in_cache(source_hash, rendition, output)
+        renditions = [rendition for rendition in renditions if rendition['name'] not in failed]
+
+    update_fields = save_renditions(convertable, file_path, renditions, probed)
+    release(file_path, audio_file, *(rendition_path(file_path, rendition['name']) for rendition in renditions))
+    retry_failed(task, failed)
+    return update_fields
+
+def expected_output(movie):
+    """
+    Returns what every resolution of a movie must match: the duration of the source
+    (None if unknown) and whether it has audio, from the MediaInfo of the source.
+    """
+    audio_codec = MediaInfo.objects.filter(movie_id=movie.pk, rendition=MediaInfo.SOURCE).values_list('audio_codec', flat=True).first()
+    return float(movie.duration) or None, bool(audio_codec)
+
+def commit_renditions(file_path, renditions, success, duration=None, audio=False, probed=None):
+    """
+    Renames the validated temporary outputs of a conversion into place (see `movie.outputs.commit_output`)
+    and removes the others.
+
+    Parameters:
+        file_path (str): Absolute path to the source the outputs are named after.
+        renditions (list): Ladder entries written by the FFmpeg process.
+        success (bool): Whether FFmpeg exited successfully. Otherwise all outputs are discarded.
+        duration (float, optional): Expected duration of the outputs.
+        audio (bool): Whether the outputs must contain audio.
+        probed (dict, optional): Filled with the probed properties of every committed output,
+            by resolution name, so `save_renditions` does not probe it again.
+
+    Returns:
+        list: Names of the resolutions that failed.
+    """
+    failed = []
+    for rendition in renditions:
+        output = rendition_path(file_path, rendition['name'])
+        if not success:
+            if os.path.exists(partial_path(output)):
+                os.remove(partial_path(output))
+            failed.append(rendition['name'])
+            continue
+        try:
+            info = commit_output(output, duration, audio)
+        except InvalidOutputError as error:
+            print(f"invalid {rendition['name']} output: {error}")
+            failed.append(rendition['name'])
+            continue
+        if probed is not None:
+            probed[rendition['name']] = info
+    return failed
+
+def retry_failed(task, failed):
+    """
+    Retries a conversion task if some of its outputs failed and attempts are left
+    (RENDITION_MAX_RETRIES). The delay grows exponentially from RETRY_BACKOFF up to
+    RETRY_BACKOFF_MAX seconds, with jitter so that the retries of a crashed node do not
+    hit the workers at the same moment. Returns without retrying otherwise, e.g. for the
+    last attempt, which keeps the resolutions that succeeded.
+
+    Raises:
+        celery.exceptions.Retry: When the task is retried.
+    """
+    if task is None or not failed or task.request.called_directly or task.request.retries >= task.max_retries:
+        return
+    countdown = get_exponential_backoff_interval(RETRY_BACKOFF, task.request.retries, RETRY_BACKOFF_MAX, full_jitter=True)
+    raise task.retry(countdown=countdown, exc=InvalidOutputError(f"conversion failed: {', '.join(failed)}"))
+
+def shared_audio_file(file_path):
+    """
+    Returns the (local) path of the shared audio track of a source (written by `encode_audio`),
+    or None if there is none and the audio has to be encoded from the source.
+    """
+    path = audio_path(file_path)
+    return fetch(path) if media_exists(path) else None
+
+def restore_cached_renditions(movie_id, source_hash, file_path, renditions):
+    """
+    Links every resolution found in the transcode cache into place (and uploads it to a remote
+    storage) and records it as cached TranscodeJob. Returns the ladder entries that still have
+    to be converted.
+    """
+    pending = []
+    for rendition in renditions:
+        output = rendition_path(file_path, rendition['name'])
+        if restore_from_cache(source_hash, rendition, output):
+            publish(output)
+            mark_cached(movie_id, rendition['name'])
+        else:
+            pending.append(rendition)
+    return pending
+
+def save_renditions(convertable, file_path, renditions, probed=None):
+    """
+    Writes the output paths of the given resolutions to the MovieConvertables instance
+    with a single targeted save and returns the names of the updated fields.
+
+    Every written resolution is stored as MediaInfo. The properties probed when the output was
+    committed (`probed`, by resolution name, see `commit_renditions`) are reused; only the other
+    resolutions (e.g. restored from the transcode cache) are probed here. A failing probe is
+    only reported, the resolution stays available.
+    """
+    update_fields = []
+    for rendition in renditions:
+        new_file_name = rendition_path(file_path, rendition['name'])
+        setattr(convertable, rendition['field'], storage_name(new_file_name))
+        update_fields.append(rendition['field'])
+    if update_fields:
+        convertable.save(update_fields=update_fields)
+    for rendition in renditions:
+        info = (probed or {}).get(rendition['name'])
+        if info is not None:
+            store_media_info(convertable.movie_id, rendition['name'], info)
+            continue
+        try:
+            info = probe_video(getattr(convertable, rendition['field']))
+        except (OSError, ValueError, subprocess.CalledProcessError) as error:
+            print(f"probe of {rendition['name']} failed: {error}")
+            continue
+        store_media_info(convertable.movie_id, rendition['name'], info)
+    return update_fields
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def encode_audio(self, file_path, conversions=()):
+    """
+    Encodes the audio of a source video once to AAC ('<source name>_audio.m4a' next to the source).
+
+    The conversion tasks copy this track into every resolution (`-c:a copy`) instead of
+    encoding the same audio for 120p, 360p, 720p and 1080p again, so the audio is encoded
+    once per video and is byte-identical in all resolutions (no audible change on a bitrate switch).
+
+    Parameters:
+        file_path (str): Absolute path to the original video file.
+        conversions (list, optional): Signatures of the conversion tasks that use the track. The task
+            is replaced by them (in parallel) once the track is written or has failed, so within the
+            ingest chord they run after the audio, while the other tasks of the chord do not wait.
+
+    Returns:
+        str | None: Path of the audio track, or None if FFmpeg failed or the track is invalid.
+        The conversion tasks then encode the audio from the source themselves.
+    """
+    output = audio_path(file_path)
+    returncode = run_ffmpeg(build_audio_command(fetch(file_path), partial_path(output)), short=True)
+    try:
+        if check_convert_status(returncode, output) is None:
+            raise InvalidOutputError(f'FFmpeg exited with {returncode}')
+        movie = Movie.objects.filter(video_file=storage_name(file_path)).first()
+        commit_output(output, float(movie.duration) if movie else None, audio=True, video=False)
+    except InvalidOutputError as error:
+        print(f'shared audio of {file_path} failed: {error}')
+        if os.path.exists(partial_path(output)):
+            os.remove(partial_path(output))
+        release(file_path)
+        output = None
+    else:
+        publish(output)
+        release(file_path, output)
+    if conversions:
+        raise self.replace(group(conversions))
+    return output
+
+@shared_task(bind=True, max_retries=RENDITION_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def convert120p(self, file_path, convertables_id, source_hash=None):
     """
     Converts a given video file to a low-resolution 120p MP4 format using FFmpeg,
     saves the converted file locally, and updates the corresponding MovieConvertables instance.
 
     The conversion parameters:
-    - Resolution: 128x96 pixels
-    - Video codec: libx264
-    - Audio codec: aac
-    - CRF (quality): 23 (default, reasonable quality)
+    - Resolution: short side 96 pixels (128x96 for a 4:3 source), see `scale_filter`
+    - Video codec: settings.VIDEO_ENCODER (default libx264, preset medium)
+    - Audio: the shared AAC track of the source (`encode_audio`), copied without re-encoding
+    - CRF (quality): settings.VIDEO_ENCODER (default 23), overridable per resolution
+      in settings.VIDEO_RENDITION_ENCODERS
+    - Keyframes: forced every HLS segment (4 seconds), aligned across all resolutions
     - Output format: MP4
 
-    If the output file already exists, the conversion is skipped.
+    If the same source content was already converted with these parameters, the cached
+    output is linked instead of running FFmpeg (see `movie.transcode_cache`).
 
     Parameters:
         file_path (str): Absolute path to the original video file.
         convertables_id (int): Primary key of the MovieConvertables instance to update.
+        source_hash (str, optional): Content hash of the source for the transcode cache, computed once
+            by `process_video`. The source is hashed again if it is missing.
 
     Behavior:
         - Generates a new filename by appending '_120p.mp4' before the original file extension.
-        - Runs FFmpeg as a subprocess with the specified encoding options.
+        - Runs FFmpeg as a subprocess with the specified encoding options (on a cache miss).
         - Updates the 'video_120p' field of the MovieConvertables model with the new file path.
         - If the MovieConvertables instance does not exist, the function fails silently.
     """
-    new_file_name = (file_path).split('.')
-    new_file_name = new_file_name[0] + '_120p.mp4'
+    transcode_renditions(file_path, convertables_id, [get_rendition('120p')], task=self, source_hash=source_hash)
 
-    if not os.path.exists(new_file_name):
-        cmd = 'ffmpeg -i "{}" -s 128x96 -c:v libx264 -crf 23 -c:a aac -strict -2 "{}"'.format(file_path, new_file_name)
-        subprocess.run(cmd, capture_output=True, shell=True)
-    try:
-        convertable = MovieConvertables.objects.get(pk=convertables_id)
-        relative_path = os.path.relpath(new_file_name, settings.MEDIA_ROOT)
-        convertable.video_120p = relative_path
-        convertable.save()
-    except MovieConvertables.DoesNotExist:
-        pass
-  
-@shared_task
-def convert360p(file_path, convertables_id):
+@shared_task(bind=True, max_retries=RENDITION_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def convert360p(self, file_path, convertables_id, source_hash=None):
     """
     Converts a given video file to a mid-resolution 360p MP4 format using FFmpeg,
     saves the converted file locally, and updates the corresponding MovieConvertables instance.
 
     The conversion parameters:
-    - Resolution: 640x360 pixels
-    - Video codec: libx264
-    - Audio codec: aac
-    - CRF (quality): 23 (default, reasonable quality)
+    - Resolution: short side 360 pixels (640x360 for a 16:9 source), see `scale_filter`
+    - Video codec: settings.VIDEO_ENCODER (default libx264, preset medium)
+    - Audio: the shared AAC track of the source (`encode_audio`), copied without re-encoding
+    - CRF (quality): settings.VIDEO_ENCODER (default 23), overridable per resolution
+      in settings.VIDEO_RENDITION_ENCODERS
+    - Keyframes: forced every HLS segment (4 seconds), aligned across all resolutions
     - Output format: MP4
 
-    If the output file already exists, the conversion is skipped.
+    If the same source content was already converted with these parameters, the cached
+    output is linked instead of running FFmpeg (see `movie.transcode_cache`).
 
     Parameters:
         file_path (str): Absolute path to the original video file.
         convertables_id (int): Primary key of the MovieConvertables instance to update.
+        source_hash (str, optional): Content hash of the source for the transcode cache, computed once
+            by `process_video`. The source is hashed again if it is missing.
 
     Behavior:
         - Generates a new filename by appending '_360p.mp4' before the original file extension.
-        - Runs FFmpeg as a subprocess with the specified encoding options.
+        - Runs FFmpeg as a subprocess with the specified encoding options (on a cache miss).
         - Updates the 'video_360p' field of the MovieConvertables model with the new file path.
         - If the MovieConvertables instance does not exist, the function fails silently.
     """
-    new_file_name = (file_path).split('.')
-    new_file_name = new_file_name[0] + '_360p.mp4'
-
-    if not os.path.exists(new_file_name):
-        cmd = 'ffmpeg -i "{}" -s 640x360 -c:v libx264 -crf 23 -c:a aac -strict -2 "{}"'.format(file_path, new_file_name)
-
-        subprocess.run(cmd, capture_output=True, shell=True)
-    try:
-        convertable = MovieConvertables.objects.get(pk=convertables_id)
-        relative_path = os.path.relpath(new_file_name, settings.MEDIA_ROOT)
-        convertable.video_360p = relative_path
-        convertable.save()
-    except MovieConvertables.DoesNotExist:
-        pass
+    transcode_renditions(file_path, convertables_id, [get_rendition('360p')], task=self, source_hash=source_hash)
 
-@shared_task
-def convert720p(file_path, convertables_id):
+@shared_task(bind=True, max_retries=RENDITION_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def convert720p(self, file_path, convertables_id, source_hash=None):
     """
     Converts the given video file to 720p HD MP4 format using FFmpeg, saves the output,
     and updates the corresponding MovieConvertables instance with the new file path.
 
     Conversion details:
-    - Resolution: 1280x720 (hd720)
-    - Video codec: libx264
-    - Audio codec: aac
-    - CRF (quality): 23 (balanced quality)
+    - Resolution: short side 720 pixels (1280x720 for a 16:9 source), see `scale_filter`
+    - Video codec: settings.VIDEO_ENCODER (default libx264, preset medium)
+    - Audio: the shared AAC track of the source (`encode_audio`), copied without re-encoding
+    - CRF (quality): settings.VIDEO_ENCODER (default 23), overridable per resolution
+      in settings.VIDEO_RENDITION_ENCODERS
+    - Keyframes: forced every HLS segment (4 seconds), aligned across all resolutions
     - Output format: MP4
 
-    The function checks if the converted file already exists; if so, conversion is skipped.
+    If the same source content was already converted with these parameters, the cached
+    output is linked instead of running FFmpeg (see `movie.transcode_cache`).
 
     Parameters:
         file_path (str): Absolute path to the source video file.
         convertables_id (int): Primary key of the MovieConvertables object to update.
+        source_hash (str, optional): Content hash of the source for the transcode cache, computed once
+            by `process_video`. The source is hashed again if it is missing.
 
     Behavior:
         - Constructs the output filename by appending '_720p.mp4' before the file extension.
-        - Executes FFmpeg command as a shell subprocess.
+        - Runs FFmpeg as a subprocess with the specified encoding options (on a cache miss).
         - Updates the 'video_720p' field of the MovieConvertables model instance.
         - Silently ignores if the MovieConvertables instance does not exist.
     """
-    new_file_name = (file_path).split('.')
-    new_file_name = new_file_name[0] + '_720p.mp4'
+    transcode_renditions(file_path, convertables_id, [get_rendition('720p')], task=self, source_hash=source_hash)
 
-    if not os.path.exists(new_file_name):
-        cmd = 'ffmpeg -i "{}" -s hd720 -c:v libx264 -crf 23 -c:a aac -strict -2 "{}"'.format(file_path, new_file_name)
-        subprocess.run(cmd, capture_output=True, shell=True)
-    try:
-        convertable = MovieConvertables.objects.get(pk=convertables_id)
-        relative_path = os.path.relpath(new_file_name, settings.MEDIA_ROOT)
-        convertable.video_720p = relative_path
-        convertable.save()
-    except MovieConvertables.DoesNotExist:
-        pass
-
-@shared_task
-def convert1080p(file_path, convertables_id):
+@shared_task(bind=True, max_retries=RENDITION_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def convert1080p(self, file_path, convertables_id, source_hash=None):
     """
     Converts the given video file to 1080p Full HD MP4 format using FFmpeg, saves the resulting file,
     and updates the associated MovieConvertables instance with the new file path.
 
     Conversion details:
-    - Resolution: 1920x1080 (hd1080)
-    - Video codec: libx264
-    - Audio codec: aac
-    - CRF (quality): 23 (balanced quality)
+    - Resolution: short side 1080 pixels (1920x1080 for a 16:9 source), see `scale_filter`
+    - Video codec: settings.VIDEO_ENCODER (default libx264, preset medium)
+    - Audio: the shared AAC track of the source (`encode_audio`), copied without re-encoding
+    - CRF (quality): settings.VIDEO_ENCODER (default 23), overridable per resolution
+      in settings.VIDEO_RENDITION_ENCODERS
+    - Keyframes: forced every HLS segment (4 seconds), aligned across all resolutions
     - Output format: MP4
 
-    If the output file already exists, the conversion process is skipped.
+    If the same source content was already converted with these parameters, the cached
+    output is linked instead of running FFmpeg (see `movie.transcode_cache`).
 
     Parameters:
         file_path (str): Absolute path to the original video file.
         convertables_id (int): Primary key of the MovieConvertables object to update.
+        source_hash (str, optional): Content hash of the source for the transcode cache, computed once
+            by `process_video`. The source is hashed again if it is missing.
 
     Behavior:
         - Constructs the new filename by appending '_1080p.mp4' before the file extension.
-        - Executes FFmpeg as a shell subprocess to perform the conversion.
+        - Runs FFmpeg as a subprocess with the specified encoding options (on a cache miss).
         - Updates the 'video_1080p' field of the MovieConvertables model.
         - Silently ignores the operation if the MovieConvertables instance does not exist.
     """
-    new_file_name = (file_path).split('.')
-    new_file_name = new_file_name[0] + '_1080p.mp4'
+    transcode_renditions(file_path, convertables_id, [get_rendition('1080p')], task=self, source_hash=source_hash)
+
+@shared_task(bind=True, max_retries=RENDITION_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def convert_all_renditions(self, file_path, convertables_id, rendition_names=None, source_hash=None):
+    """
+    Converts a given video file into the resolutions of its ladder (120p, 360p, 720p, 1080p)
+    with a single FFmpeg process and updates the corresponding MovieConvertables instance.
+
+    The source is decoded only once. The decoded frames are fanned out with a `split`
+    filter graph and every branch is scaled and encoded into its own MP4 output, which
+    saves the repeated decoding of the per-resolution tasks.
+
+    The conversion parameters per output are the same as in the single resolution tasks:
+    - Video codec: settings.VIDEO_ENCODER (default libx264, preset medium)
+    - Audio: the shared AAC track of the source (`encode_audio`), copied without re-encoding
+    - CRF (quality): settings.VIDEO_ENCODER (default 23), overridable per resolution
+      in settings.VIDEO_RENDITION_ENCODERS
+    - Keyframes: forced every HLS segment (4 seconds), aligned across all resolutions
+    - Output format: MP4
+
+    Resolutions found in the transcode cache (same source content and encode parameters)
+    are linked into place and left out of the FFmpeg command.
+
+    Parameters:
+        file_path (str): Absolute path to the original video file.
+        convertables_id (int): Primary key of the MovieConvertables instance to update.
+        rendition_names (list, optional): Names of the resolutions to create (e.g. ['120p', '360p']).
+            Defaults to the full ladder.
+        source_hash (str, optional): Content hash of the source for the transcode cache, computed once
+            by `process_video`. The source is hashed again if it is missing.
+
+    Behavior:
+        - Runs FFmpeg once for all missing resolutions.
+        - Updates every successfully created resolution field of the MovieConvertables model
+          with a single targeted save.
+        - Retries with backoff if a resolution failed (see `transcode_renditions`), converting
+          only the failed resolutions again.
+        - If the MovieConvertables instance does not exist, the function fails silently.
+    """
+    renditions = [get_rendition(name) for name in rendition_names] if rendition_names else RENDITIONS
+    transcode_renditions(file_path, convertables_id, renditions, task=self, source_hash=source_hash)
+
+@shared_task(bind=True, max_retries=RENDITION_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def transcode_chunked(self, file_path, convertables_id, rendition_names, source_hash=None):
+    """
+    Converts a long video in parallel: the source is cut into chunks, every chunk is encoded
+    by its own Celery task (on any worker of any node) and the encoded chunks are joined.
+
+    Workflow:
+    - Links cached resolutions into place (see `movie.transcode_cache`), only the rest is converted.
+    - Cuts the video stream at keyframes into chunks of about `settings.VIDEO_CHUNK_SECONDS`
+      without re-encoding (`movie.transcode.build_split_command`). The chunks are written to
+      MEDIA_ROOT/uploads/chunks/<source name>/ on the shared media volume (uploaded to a remote
+      storage, from which every chunk task downloads its chunk).
+    - Replaces itself with a Celery chord of one `encode_chunk` task per chunk. Every chunk task
+      encodes all missing resolutions of its chunk in a single pass (without audio).
+    - `concat_chunks` runs when all chunks are done and joins them into the final resolutions.
+      Because the task is replaced (not just followed) by the chord, the ingest chord this task
+      belongs to only completes after the join.
+
+    If the source cannot be cut, the resolutions are converted by this task in a single pass instead.
+
+    Parameters:
+        file_path (str): Absolute path to the original video file.
+        convertables_id (int): Primary key of the MovieConvertables instance to update.
+        rendition_names (list): Names of the resolutions to create (e.g. ['120p', '360p']).
+        source_hash (str, optional): Content hash of the source for the transcode cache, computed once
+            by `process_video`. The source is hashed again if it is missing.
+    """
+    try:
+        convertable = MovieConvertables.objects.select_related('movie').get(pk=convertables_id)
+    except MovieConvertables.DoesNotExist:
+        return
+    movie = convertable.movie
+    renditions = [get_rendition(name) for name in rendition_names]
+
+    source_hash = source_hash or hash_file(fetch(file_path))
+    pending = restore_cached_renditions(movie.pk, source_hash, file_path, renditions)
+    if not pending:
+        save_renditions(convertable, file_path, renditions)
+        release(file_path, *(rendition_path(file_path, rendition['name']) for rendition in renditions))
+        return
+
+    fetch(file_path)
+    work_dir = chunk_directory(file_path)
+    delete_tree(work_dir)
+    os.makedirs(work_dir)
+    returncode = run_ffmpeg(build_split_command(file_path, os.path.join(work_dir, 'chunk_%05d.mkv'), settings.VIDEO_CHUNK_SECONDS), short=True)
+    chunks = sorted(glob.glob(os.path.join(work_dir, 'chunk_*.mkv')))
+
+    if check_convert_status(returncode, work_dir) is None or not chunks:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        transcode_renditions(file_path, convertables_id, renditions, task=self, source_hash=source_hash)
+        return
+    publish_tree(work_dir)
+    release(work_dir, file_path, *(rendition_path(file_path, rendition['name']) for rendition in renditions))
+
+    pending_names = [rendition['name'] for rendition in pending]
+    job_ids = start_jobs(movie.pk, pending_names)
+    priority = rendition_priority(pending_names[0])
+    header = [encode_chunk.si(chunk, pending_names).set(priority=priority) for chunk in chunks]
+    callback = concat_chunks.s(file_path, convertables_id, rendition_names, pending_names, source_hash, job_ids).set(priority=priority)
+    raise self.replace(chord(header, callback))
+
+@shared_task(bind=True, max_retries=RENDITION_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def encode_chunk(self, chunk_path, rendition_names):
+    """
+    Encodes one chunk of a chunked transcode into the given resolutions with a single
+    FFmpeg pass. The outputs are written next to the chunk ('<chunk>_<resolution>.mp4'),
+    validated (see `movie.outputs`) and uploaded if the media storage is remote. A failed
+    chunk is retried with backoff, so a crash only costs this chunk.
+
+    Parameters:
+        chunk_path (str): Absolute path to the chunk.
+        rendition_names (list): Names of the resolutions to create.
+
+    Returns:
+        dict: 'returncode' of FFmpeg and the 'cpu_seconds' it used, collected by `concat_chunks`.
+    """
+    renditions = [get_rendition(name) for name in rendition_names]
+    outputs = [rendition_path(chunk_path, name) for name in rendition_names]
+    cpu_before = children_cpu_seconds()
+    returncode = run_ffmpeg(build_multi_output_command(fetch(chunk_path), renditions, audio=False))
+    cpu_seconds = children_cpu_seconds() - cpu_before
+    failed = commit_renditions(chunk_path, renditions, returncode == 0)
+    if not failed:
+        for output in outputs:
+            publish(output)
+    release(chunk_path, *outputs)
+    retry_failed(self, failed)
+    return {'returncode': returncode or int(bool(failed)), 'cpu_seconds': cpu_seconds}
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def concat_chunks(results, file_path, convertables_id, rendition_names, pending_names, source_hash, job_ids):
+    """
+    Chord callback of `transcode_chunked`: joins the encoded chunks of every resolution
+    losslessly, adds the audio of the source and stores the resolutions.
+
+    Parameters:
+        results (list): Return values of the `encode_chunk` tasks.
+        file_path (str): Absolute path to the original video file.
+        convertables_id (int): Primary key of the MovieConvertables instance to update.
+        rendition_names (list): All resolutions of the movie (including cached ones).
+        pending_names (list): Resolutions that were encoded in chunks.
+        source_hash (str): Content hash of the source for the transcode cache.
+        job_ids (list): TranscodeJob primary keys, in the order of `pending_names`.
+
+    Behavior:
+        - The joined resolutions are written to a temporary name and validated before they are
+          renamed into place (see `movie.outputs`).
+        - Resolutions that failed in any chunk or while joining are not stored and their jobs are marked failed.
+        - The CPU seconds of all chunk tasks are split evenly across the jobs.
+        - Removes the chunk working directory (and its copy in a remote storage).
+    """
+    work_dir = chunk_directory(file_path)
+    chunks = list_media(work_dir, 'chunk_*.mkv')
+    chunks_ok = all(result['returncode'] == 0 for result in results)
+    audio_file = shared_audio_file(file_path)
+    cpu_seconds = sum(result['cpu_seconds'] for result in results) / max(len(pending_names), 1)
+    convertable = MovieConvertables.objects.select_related('movie').filter(pk=convertables_id).first()
+    duration, audio = expected_output(convertable.movie) if convertable is not None else (None, False)
+
+    failed = set()
+    probed = {}
+    for name, job_id in zip(pending_names, job_ids):
+        output = rendition_path(file_path, name)
+        success = False
+        if chunks_ok:
+            os.makedirs(work_dir, exist_ok=True)
+            list_path = os.path.join(work_dir, f'{name}.txt')
+            with open(list_path, 'w') as concat_list:
+                for chunk in chunks:
+                    escaped = fetch(rendition_path(chunk, name)).replace("'", "'\\''")
+                    concat_list.write(f"file '{escaped}'\n")
+            command = build_concat_command(list_path, fetch(file_path), partial_path(output), audio_file)
+            success = not commit_renditions(file_path, [get_rendition(name)], check_convert_status(run_ffmpeg(command, short=True), output) is not None, duration, audio, probed)
+        if success:
+            publish(output)
+            store_in_cache(source_hash, get_rendition(name), output)
+        else:
+            failed.add(name)
+        finish_jobs([job_id], success, cpu_seconds)
+    delete_tree(work_dir)
+
+    renditions = [get_rendition(name) for name in rendition_names if name not in failed]
+    if convertable is not None:
+        save_renditions(convertable, file_path, renditions, probed)
+    release(file_path, audio_file, *(rendition_path(file_path, rendition['name']) for rendition in renditions))
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def finalize_ingest(movie_id, convertables_id):
+    """
+    Chord callback of the ingest pipeline, runs when all conversions, the thumbnail and
+    the seek previews of a movie are done.
+
+    Behavior:
+        - Packages the converted resolutions as HLS (`package_hls`).
+        - Marks the movie ready, or failed if no resolution could be converted.
+    """
+    convertable = MovieConvertables.objects.filter(pk=convertables_id).first()
+    if convertable is None or not convertable.available_renditions:
+        update_movie(movie_id, status=Movie.FAILED)
+        return
+    package_hls(convertables_id)
+    update_movie(movie_id, status=Movie.READY)
+
+@shared_task
+def ingest_failed(movie_id):
+    """
+    Error callback of the ingest chord: marks the movie failed if a task of the pipeline raised.
+    """
+    update_movie(movie_id, status=Movie.FAILED)
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def package_hls(convertables_id):
+    """
+    Packages the converted resolutions of a movie as HLS and stores the master playlist
+    in the `hls_playlist` field of the Movie.
+
+    For every resolution available on the MovieConvertables instance, the MP4 file is
+    remuxed (without re-encoding) into a VOD playlist with 4 second MPEG-TS segments.
+    Because all resolutions are encoded with aligned keyframes, the segments line up
+    and an adaptive player can switch the bitrate at every segment boundary.
+
+    With a remote media storage the resolutions are downloaded first and the packaging is uploaded.
 
-    if not os.path.exists(new_file_name):
-        cmd = 'ffmpeg -i "{}" -s hd1080 -c:v libx264 -crf 23 -c:a aac -strict -2 "{}"'.format(file_path, new_file_name)
-        subprocess.run(cmd, capture_output=True, shell=True)
+    Output layout (below MEDIA_ROOT):
+        uploads/hls/<source name>/master.m3u8
+        uploads/hls/<source name>/<resolution>/index.m3u8
+        uploads/hls/<source name>/<resolution>/seg_00000.ts, ...
+
+    Parameters:
+        convertables_id (int): Primary key of the MovieConvertables instance to package.
+
+    Behavior:
+        - Resolutions that fail to package are left out of the master playlist.
+        - The BANDWIDTH of a variant is derived from its file size and the movie duration.
+        - The RESOLUTION of a variant is its probed size (MediaInfo), which follows the aspect ratio
+          of the source; the nominal size of the resolution if it was not probed.
+        - If the MovieConvertables instance does not exist, the function fails silently.
+    """
     try:
-        convertable = MovieConvertables.objects.get(pk=convertables_id)
-        relative_path = os.path.relpath(new_file_name, settings.MEDIA_ROOT)
-        convertable.video_1080p = relative_path
-        convertable.save()
+        convertable = MovieConvertables.objects.select_related('movie').get(pk=convertables_id)
     except MovieConvertables.DoesNotExist:
-        pass
+        return
+
+    movie = convertable.movie
+    output_root = hls_directory(movie.video_file.name)
+    variants = []
+    sizes = {rendition: (width, height) for rendition, width, height in MediaInfo.objects.filter(movie_id=movie.pk).values_list('rendition', 'width', 'height') if width and height}
+
+    for rendition in RENDITIONS:
+        field = getattr(convertable, rendition['field'])
+        if not field:
+            continue
+        output_dir = os.path.join(output_root, rendition['name'])
+        os.makedirs(output_dir, exist_ok=True)
+        rendition_file = fetch(local_path(field.name))
+        with ffmpeg_slot(short=True):
+            result = subprocess.run(build_hls_command(rendition_file, output_dir), capture_output=True)
+        duration = float(movie.duration) or 1.0
+        bandwidth = int(os.path.getsize(rendition_file) * 8 / duration)
+        release(rendition_file)
+        if check_convert_status(result.returncode, os.path.join(output_dir, 'index.m3u8')) is None:
+            continue
+        width, height = sizes.get(rendition['name'], (rendition['width'], rendition['height']))
+        variants.append({
+            'uri': f"{rendition['name']}/index.m3u8",
+            'bandwidth': bandwidth,
+            'width': width,
+            'height': height,
+        })
+
+    if not variants:
+        release(output_root)
+        return
+
+    master_path = os.path.join(output_root, 'master.m3u8')
+    with open(master_path, 'w') as master:
+        master.write(build_master_playlist(variants))
+    publish_tree(output_root)
+    release(output_root)
+    update_movie(movie.pk, hls_playlist=storage_name(master_path))
 
 @shared_task
 def generate_thumbnail(video_path, instance_id):
     """
-    Generates a WebP thumbnail from a video file using FFmpeg and saves it to the `image_file`
-    field of the corresponding Movie model instance.
+    Generates responsive thumbnails from a video file using FFmpeg and stores them on the
+    corresponding Movie model instance.
 
     This task performs the following steps:
-    - Extracts a single frame from the video at the 1-second mark.
-    - Converts the frame to the WebP image format using FFmpeg.
-    - Passes the generated image directly to Django's FileField via an in-memory ContentFile.
-    - Ensures the thumbnail is stored using the path defined in the model's `upload_to` attribute.
+    - Chooses the frame: with `settings.THUMBNAIL_MODE = 'smart'` the keyframes of the first minutes are
+      scored for brightness, contrast, sharpness and non-black content and the best one is used
+      (see `movie.poster`), with 'fixed' the frame at the 1-second mark.
+    - Decodes that single frame.
+    - Scales the frame to every width of `movie.transcode.THUMBNAIL_WIDTHS` (160, 320, 640, 1280;
+      widths above the source are skipped) and encodes each size as WebP and AVIF, all in one FFmpeg process.
+    - Writes the variants to MEDIA_ROOT/uploads/thumbnails/<video name>/thumb_<width>.<format>.
+    - Stores the variants in `image_variants` ({'webp': [{'width': 160, 'file': ...}, ...], 'avif': [...]})
+      and the largest WebP in `image_file`, with a targeted update.
+    - Downloads the video first and uploads the variants if the media storage is remote.
 
     Parameters:
         video_path (str): Absolute filesystem path to the input video file.
         instance_id (int): Primary key of the Movie instance to update.
 
     Notes:
-        - This function avoids manually writing the image to disk to prevent duplicate storage.
-        - The image is written directly to memory and saved via Djangos storage system.
-
-    Exceptions:
-        - subprocess.CalledProcessError: Raised if FFmpeg fails to generate the thumbnail.
-        - Movie.DoesNotExist: Raised if the Movie instance no longer exists.
-    """
-    instance = Movie.objects.get(pk=instance_id)
-    filename_base = os.path.splitext(os.path.basename(video_path))[0]
-    thumb_filename = f"{filename_base}_thumb.webp"
-
-    command = [
-        'ffmpeg',
-        '-i', video_path,
-        '-ss', '00:00:01.000',
-        '-vframes', '1',
-        '-frames:v', '1',
-        '-f', 'image2',
-        '-vcodec', 'libwebp',
-        'pipe:1'
-    ]
+        - If FFmpeg cannot encode AVIF (e.g. built without libaom), only WebP variants are created.
+        - If FFmpeg fails or the Movie no longer exists, nothing is stored.
+    """
+    movie = Movie.objects.filter(pk=instance_id).first()
+    if movie is None:
+        return
+    fetch(video_path)
+    position = DEFAULT_POSTER_POSITION
+    if settings.THUMBNAIL_MODE == 'smart':
+        position = select_poster_position(video_path, float(movie.duration))
+    source = MediaInfo.objects.filter(movie_id=instance_id, rendition=MediaInfo.SOURCE).first()
+    widths = thumbnail_widths(source.width if source else 0)
+    output_dir = thumbnail_directory(video_path)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+
+    for formats in (list(THUMBNAIL_FORMATS), ['webp']):
+        with ffmpeg_slot(short=True):
+            result = subprocess.run(build_thumbnail_command(video_path, output_dir, widths, formats, position), capture_output=True)
+        if result.returncode == 0:
+            break
+        print("FFmpeg error:", result.stderr.decode(errors='replace')[-2000:])
+    else:
+        release(video_path, output_dir)
+        return
+
+    publish_tree(output_dir)
+    release(video_path, output_dir)
+    variants = {
+        image_format: [
+            {'width': width, 'file': storage_name(thumbnail_path(output_dir, width, image_format))}
+            for width in widths
+        ]
+        for image_format in formats
+    }
+    update_movie(instance_id, image_file=variants['webp'][-1]['file'], image_variants=variants)
+
+@shared_task
+def generate_trickplay(video_path, instance_id):
+    """
+    Generates seek previews (trickplay) for a video and saves the WebVTT index to the
+    `trickplay_vtt` field of the corresponding Movie.
+
+    This task performs the following steps:
+    - Extracts one frame every 10 seconds in a single FFmpeg decode, scales it to 160x90 and
+      tiles the frames into 10x10 JPEG sprite sheets.
+    - Writes a WebVTT file that maps every 10 second range to its tile (`sprite_001.jpg#xywh=x,y,w,h`).
+    - Stores sprites and index in MEDIA_ROOT/uploads/trickplay/<video name>/ (uploaded if the
+      media storage is remote).
+
+    A player can show previews while scrubbing by loading the index and a few small sprite
+    sheets instead of range-reading the video.
+
+    Parameters:
+        video_path (str): Absolute filesystem path to the input video file.
+        instance_id (int): Primary key of the Movie instance to update.
 
+    Notes:
+        - The duration is read from the Movie instance (set by `process_video`).
+        - If FFmpeg fails or the Movie no longer exists, nothing is stored.
+    """
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        image_data = result.stdout
-        content_file = ContentFile(image_data)
-        instance.image_file.save(thumb_filename, content_file, save=True)
+        movie = Movie.objects.get(pk=instance_id)
+    except Movie.DoesNotExist:
+        return
+
+    output_dir = trickplay_directory(video_path)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.makedirs(output_dir)
+    with ffmpeg_slot():
+        result = subprocess.run(build_trickplay_command(fetch(video_path), output_dir), capture_output=True)
+    if check_convert_status(result.returncode, output_dir) is None:
+        release(video_path, output_dir)
+        return
+
+    vtt_path = os.path.join(output_dir, 'trickplay.vtt')
+    with open(vtt_path, 'w') as vtt:
+        vtt.write(build_trickplay_vtt(float(movie.duration)))
+    publish_tree(output_dir)
+    release(video_path, output_dir)
+    update_movie(instance_id, trickplay_vtt=storage_name(vtt_path))
 
-    except subprocess.CalledProcessError as e:
-        print("FFmpeg error:", e.stderr.decode())
\ No newline at end of file
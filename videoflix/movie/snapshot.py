@@ -0,0 +1,146 @@
+"""
+Materialized snapshot of the catalog response.
+
+Most catalog requests are the plain first request of a client (`/api/movies/`, newest first,
+no filters or cursor). Its response is rendered ahead of time by a Celery task
+(`movie.tasks.render_catalog_snapshot`) whenever the catalog changes, and stored in the
+cache as JSON bytes, pre-compressed with gzip (and brotli, if the optional `brotli`
+package is installed), together with a content hash and the catalog version it was
+rendered from. `MovieView` answers that request with the stored bytes in the encoding the
+client accepts: no ORM query, no serializer, no JSON rendering and no compression in the
+request.
+
+The snapshot contains absolute media URLs, so it is rendered for one public base URL
+(`settings.CATALOG_SNAPSHOT_URL`, empty disables the snapshot) and only served to requests
+for that URL. A snapshot of an outdated catalog version is never served; until the task has
+rendered the new one, the view falls back to the cached response (see `movie.catalog_cache`).
+"""
+import gzip
+import hashlib
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from .api.pagination import MovieCursorPagination
+from .api.serializers import MovieSerializer
+from .catalog_cache import catalog_cache_timeout, catalog_etag, catalog_version, request_catalog_state
+from .models import Movie
+from .storage import is_remote_storage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CATALOG_SNAPSHOT_KEY = 'catalog:snapshot'
+CATALOG_SNAPSHOT_PENDING_KEY = 'catalog:snapshot:pending'
+SNAPSHOT_ENCODINGS = ('br', 'gzip')
+
+def snapshot_request():
+    """
+    Returns a GET request of the catalog at `settings.CATALOG_SNAPSHOT_URL`, used to render
+    the snapshot outside of a request (absolute URLs, pagination links).
+    """
+    base_url = urlsplit(settings.CATALOG_SNAPSHOT_URL)
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.path = http_request.path_info = reverse('movies')
+    http_request.META = {'HTTP_HOST': base_url.netloc, 'HTTP_X_FORWARDED_PROTO': base_url.scheme}
+    return Request(http_request)
+
+def render_catalog():
+    """
+    Renders the default catalog response (first page, newest first) like `MovieView`.
+
+    Returns:
+        tuple: (absolute URL of the response, JSON bytes)
+    """
+    request = snapshot_request()
+    paginator = MovieCursorPagination()
+    page = paginator.paginate_queryset(Movie.objects.all(), request)
+    serializer = MovieSerializer(page, many=True, context={'request': request})
+    data = paginator.get_paginated_response(serializer.data).data
+    return request.build_absolute_uri(), JSONRenderer().render(data)
+
+def build_catalog_snapshot(previous=None):
+    """
+    Renders the catalog and compresses it.
+
+    Parameters:
+        previous (dict, optional): The stored snapshot. If the content hash is unchanged (e.g. a
+            change of a field the catalog does not show), its compressed bytes are reused.
+
+    Returns:
+        dict: 'version' (catalog version it was rendered from), 'url', 'hash' (SHA-256 of the JSON),
+        'identity' (JSON bytes) and one entry with the compressed bytes per encoding ('gzip', 'br').
+    """
+    version = catalog_version()
+    url, body = render_catalog()
+    content_hash = hashlib.sha256(body).hexdigest()
+    if previous and previous['hash'] == content_hash and previous['url'] == url:
+        return dict(previous, version=version)
+
+    snapshot = {'version': version, 'url': url, 'hash': content_hash, 'identity': body, 'gzip': gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+        snapshot['br'] = brotli.compress(body)
+    return snapshot
+
+def store_catalog_snapshot(snapshot):
+    """
+    Stores a snapshot. With a remote media storage it expires with the cached responses,
+    because its signed media URLs expire.
+    """
+    cache.set(CATALOG_SNAPSHOT_KEY, snapshot, timeout=catalog_cache_timeout() if is_remote_storage() else None)
+
+def preferred_encoding(accept_encoding, available):
+    """
+    Picks the content encoding for an Accept-Encoding header.
+
+    Parameters:
+        accept_encoding (str): The header, e.g. 'gzip, deflate, br;q=0.9'.
+        available (iterable): Encodings to choose from, in order of preference on equal quality.
+
+    Returns:
+        str | None: The accepted encoding with the highest quality, None for the uncompressed body.
+    """
+    qualities = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    default = qualities.get('*', 0.0)
+    candidates = [coding for coding in available if qualities.get(coding, default) > 0]
+    return max(candidates, key=lambda coding: qualities.get(coding, default), default=None)
+
+def catalog_snapshot_response(request):
+    """
+    Returns the stored snapshot as response to a catalog request, or None if it cannot be used:
+    snapshot disabled or missing, a request with query parameters or for another host, a
+    non-JSON response format, or a snapshot of an outdated catalog version.
+
+    A compressed response carries a weak ETag (the same validator, see
+    `movie.catalog_cache.catalog_etag`) and varies on Accept-Encoding.
+    """
+    if not settings.CATALOG_SNAPSHOT_URL or request.query_params or request.accepted_renderer.format != 'json':
+        return None
+    snapshot = cache.get(CATALOG_SNAPSHOT_KEY)
+    if snapshot is None or snapshot['version'] != request_catalog_state(request)[0] or snapshot['url'] != request.build_absolute_uri():
+        return None
+
+    encoding = preferred_encoding(request.headers.get('Accept-Encoding', ''), [coding for coding in SNAPSHOT_ENCODINGS if coding in snapshot])
+    response = HttpResponse(snapshot[encoding or 'identity'], content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+        response['ETag'] = f'W/{catalog_etag(request)}'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,226 @@
+"""
+Access to the media storage for the video pipeline.
+
+The media files live in Django's default storage: the local MEDIA_ROOT, or with
+`MEDIA_STORAGE = 's3'` an S3 compatible bucket (AWS S3, MinIO, ...). FFmpeg needs
+local files, so the pipeline keeps working on paths below MEDIA_ROOT:
+
+- Local storage: MEDIA_ROOT is the storage, all helpers are no-ops.
+- Remote storage: MEDIA_ROOT is a scratch directory of the worker. A task downloads its
+  inputs (`fetch`), encodes, uploads its outputs under the same name (`publish`) and
+  removes its scratch copies (`release`). Tasks of one movie can therefore run on
+  different nodes without a shared volume.
+
+Tasks of one movie that run on the same node share the scratch copy of a file (e.g. the source,
+used by the conversions, the thumbnail and the seek previews at the same time). A task holds a
+shared `flock` on '<path>.lock' from `fetch` to `release`, and `release` only deletes the copy
+if no other task holds it; the last one deletes it. Downloads go to a unique
+temporary file that is renamed into place, so concurrent downloads never mix.
+"""
+import fcntl
+import fnmatch
+import os
+import shutil
+import tempfile
+import threading
+from urllib.parse import quote
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+MANIFEST_EXTENSIONS = ('.m3u8', '.vtt')
+
+# Shared locks on the scratch copies in use, by (thread, local path): each task holds its own.
+_held = {}
+_held_lock = threading.Lock()
+
+def is_remote_storage():
+    """
+    Returns True if the media storage is not the local filesystem (e.g. S3).
+    """
+    return not isinstance(default_storage, FileSystemStorage)
+
+def local_path(name):
+    """
+    Returns the local path (below MEDIA_ROOT) of a media file name.
+    """
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+def storage_name(path):
+    """
+    Returns the media file name (storage key) of a local path below MEDIA_ROOT.
+    """
+    return os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+
+def media_exists(path):
+    """
+    Returns True if the media file exists locally or in the storage.
+    """
+    return os.path.exists(path) or (is_remote_storage() and default_storage.exists(storage_name(path)))
+
+def scratch_lock_path(path):
+    """
+    Returns the lock file of a scratch copy: '<path>.lock'.
+    """
+    return f'{path}.lock'
+
+def lock_scratch(path, operation):
+    """
+    Opens and locks the lock file of a scratch copy. The last holder removes the lock file
+    together with the copy, so a lock taken on a file that was removed meanwhile is retried.
+    """
+    lock_path = scratch_lock_path(path)
+    while True:
+        lock = open(lock_path, 'a')
+        try:
+            fcntl.flock(lock, operation)
+            if os.path.samestat(os.fstat(lock.fileno()), os.stat(lock_path)):
+                return lock
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            lock.close()
+            raise
+        lock.close()
+
+def hold(path):
+    """
+    Takes a shared lock on the scratch copy of a file for the running task (once, however often
+    the file is fetched), so other tasks do not delete it until `release`.
+    """
+    key = (threading.get_ident(), path)
+    with _held_lock:
+        if key in _held:
+            return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock = lock_scratch(path, fcntl.LOCK_SH)
+    with _held_lock:
+        _held[key] = lock
+
+def fetch(path):
+    """
+    Makes sure a media file is available at its local path and returns the path.
+    With a remote storage the scratch copy is held until `release` (see the module documentation)
+    and a missing file is downloaded in chunks (never loaded into memory at once) to a unique
+    temporary file, which is renamed into place when complete and removed if the download fails.
+    """
+    if not is_remote_storage():
+        return path
+    hold(path)
+    if os.path.exists(path):
+        return path
+    directory, filename = os.path.split(path)
+    download = tempfile.NamedTemporaryFile(dir=directory, prefix=f'{filename}.', suffix='.download', delete=False)
+    try:
+        with default_storage.open(storage_name(path), 'rb') as source, download:
+            shutil.copyfileobj(source, download, DOWNLOAD_CHUNK_SIZE)
+        os.replace(download.name, path)
+    except BaseException:
+        if os.path.exists(download.name):
+            os.remove(download.name)
+        release(path)
+        raise
+    return path
+
+def publish(path):
+    """
+    Uploads a local output to the remote storage under its name below MEDIA_ROOT, replacing an
+    existing file of that name. Returns the name (for the FileField).
+    """
+    name = storage_name(path)
+    if is_remote_storage():
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        with open(path, 'rb') as file:
+            default_storage.save(name, File(file))
+    return name
+
+def publish_tree(directory):
+    """
+    Uploads every file below a local output directory (HLS, thumbnails, seek previews).
+    """
+    if not is_remote_storage():
+        return
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            publish(os.path.join(dirpath, filename))
+
+def drop_holds(directory):
+    """
+    Releases the locks on the scratch copies below a directory that is removed.
+    """
+    prefix = os.path.join(directory, '')
+    with _held_lock:
+        locks = [_held.pop(key) for key in list(_held) if key[1].startswith(prefix)]
+    for lock in locks:
+        lock.close()
+
+def release_file(path):
+    """
+    Drops the lock of the running task on the scratch copy of a file and deletes the copy (and
+    its lock file) unless another task still holds it.
+    """
+    with _held_lock:
+        lock = _held.pop((threading.get_ident(), path), None)
+    if lock is not None:
+        lock.close()
+    try:
+        lock = lock_scratch(path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return
+    with lock:
+        if os.path.exists(path):
+            os.remove(path)
+        os.remove(scratch_lock_path(path))
+
+def release(*paths):
+    """
+    Removes the scratch copies of files or directories once a task is done with them. A file
+    that another task of this node still holds (see `fetch`) is left to the last one.
+    Does nothing with local storage, where the paths are the stored media.
+    """
+    if not is_remote_storage():
+        return
+    for path in paths:
+        if not path:
+            continue
+        if os.path.isdir(path):
+            drop_holds(path)
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            release_file(path)
+
+def list_media(directory, pattern):
+    """
+    Returns the sorted local paths of the media files in a directory that match a glob pattern,
+    listed in the storage. The files are not downloaded.
+    """
+    if is_remote_storage():
+        try:
+            _, filenames = default_storage.listdir(storage_name(directory))
+        except FileNotFoundError:
+            filenames = []
+    else:
+        filenames = os.listdir(directory) if os.path.isdir(directory) else []
+    return sorted(os.path.join(directory, filename) for filename in filenames if fnmatch.fnmatch(filename, pattern))
+
+def delete_tree(directory):
+    """
+    Deletes a media directory from the storage and its local copy.
+    """
+    if is_remote_storage():
+        for path in list_media(directory, '*'):
+            default_storage.delete(storage_name(path))
+        drop_holds(directory)
+    shutil.rmtree(directory, ignore_errors=True)
+
+def manifest_url(name):
+    """
+    Returns the URL of an HLS playlist or WebVTT index.
+
+    These text files reference their segments and sprites by relative paths, which cannot carry
+    the signature of a remote storage URL. They are always delivered through the media view
+    (`movie.views.serve_media`), which signs the referenced files for a remote storage.
+    """
+    return f'{settings.MEDIA_URL}{quote(name)}' if name else None
@@ -0,0 +1,75 @@
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .cleanup import delete_orphaned_media, find_orphaned_media, format_bytes
+from .snapshot import CATALOG_SNAPSHOT_KEY, CATALOG_SNAPSHOT_PENDING_KEY, build_catalog_snapshot, store_catalog_snapshot
+
+SNAPSHOT_DELAY = 2
+SNAPSHOT_PENDING_TIMEOUT = 60
+
+@shared_task
+def collect_orphaned_media(delete=None):
+    """
+    Scheduled Celery task (see `beat_schedule` in videoflix.celery) that finds media files
+    no movie refers to anymore and deletes them.
+
+    Parameters:
+    - delete (bool):
+    Delete the orphaned files. Defaults to `settings.MEDIA_GC_DELETE`, otherwise the
+    task only reports them (dry run).
+
+    Returns:
+    - dict: Bytes used and reclaimable per media directory and the freed bytes. It is
+      stored in the result backend, so the growth of the media volume can be followed
+      in the admin (Celery results).
+    """
+    if delete is None:
+        delete = settings.MEDIA_GC_DELETE
+    report = find_orphaned_media()
+    freed = delete_orphaned_media(report) if delete else 0
+    reclaimable = sum(usage['reclaimable'] for usage in report.values())
+    print(f'Media cleanup: {format_bytes(reclaimable)} reclaimable, {format_bytes(freed)} freed.')
+    return {
+        'deleted': delete,
+        'freed': freed,
+        'directories': {
+            root: {'used': usage['used'], 'reclaimable': usage['reclaimable'], 'files': len(usage['files'])}
+            for root, usage in report.items()
+        },
+    }
+
+@shared_task
+def render_catalog_snapshot():
+    """
+    Renders the catalog snapshot (see `movie.snapshot`) and stores it in the cache.
+
+    The pending marker is removed first, so a change of the catalog during the rendering
+    queues the next run. The snapshot records the catalog version it was rendered from;
+    if the catalog changed in the meantime, it is simply not served.
+
+    Returns:
+    - dict: The catalog version, content hash and size of the snapshot.
+    """
+    cache.delete(CATALOG_SNAPSHOT_PENDING_KEY)
+    snapshot = build_catalog_snapshot(cache.get(CATALOG_SNAPSHOT_KEY))
+    store_catalog_snapshot(snapshot)
+    return {'version': snapshot['version'], 'hash': snapshot['hash'], 'bytes': len(snapshot['identity'])}
+
+def queue_catalog_snapshot():
+    """
+    Queues `render_catalog_snapshot` after SNAPSHOT_DELAY seconds, unless a run is already
+    pending. A burst of changes (e.g. a movie going through the pipeline) renders the
+    snapshot once. The marker expires after SNAPSHOT_PENDING_TIMEOUT seconds, in case the
+    queued task is lost.
+    """
+    if cache.add(CATALOG_SNAPSHOT_PENDING_KEY, True, timeout=SNAPSHOT_PENDING_TIMEOUT):
+        render_catalog_snapshot.apply_async(countdown=SNAPSHOT_DELAY)
+
+def schedule_catalog_snapshot():
+    """
+    Queues the rendering of the catalog snapshot once the current transaction commits,
+    if the snapshot is enabled (`settings.CATALOG_SNAPSHOT_URL`).
+    """
+    if settings.CATALOG_SNAPSHOT_URL:
+        transaction.on_commit(queue_catalog_snapshot)
@@ -5,15 +5,54 @@ from rest_framework.authtoken.models import Token
 from unittest.mock import patch
 from rest_framework import status
 
+import fcntl
+import glob
+import gzip
+import hashlib
+import numpy as np
 import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
 
 from userprofile.models import CustomUser
-from movie.models import Movie, MovieConvertables, MovieProgress
+from movie.models import MediaInfo, Movie, MovieConvertables, MovieProgress, TranscodeCacheEntry, TranscodeJob, Upload
 
 from django.db.models.signals import post_save
-from movie.signals import movie_post_save
+from movie.signals import commit_renditions, concat_chunks, finalize_ingest, generate_thumbnail, ingest_movie, movie_post_save, save_renditions, transcode_renditions
+from movie.api.serializers import MovieConvertablesSerializer, MovieSerializer
+from movie.transcode_cache import hash_file, store_in_cache
+from videoflix.celery import app as celery_app
+from movie.poster import build_candidates_command, parse_frame_times, score_frames, select_poster_position
+from movie.jobs import parse_speed, progress_percent, run_ffmpeg, start_jobs
+from movie.governor import ffmpeg_slot, rendition_threads
+from movie.cleanup import find_orphaned_media
+from movie.tasks import collect_orphaned_media, render_catalog_snapshot
+from movie.snapshot import preferred_encoding
+from movie.catalog_cache import catalog_version
+from movie.storage import fetch, local_path, publish, release
+from movie.signals import convert_all_renditions, generate_trickplay, update_movie
+from movie.outputs import InvalidOutputError, commit_output, validate_output
+from movie.uploads import finalize_upload
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.cache import cache
+from movie.transcode import (
+    RENDITIONS, audio_path, build_audio_command, build_concat_command, build_hls_command, build_ladder, build_master_playlist,
+    build_multi_output_command, build_split_command, build_thumbnail_command, build_trickplay_command, build_trickplay_vtt, chunk_directory,
+    encode_parameters, get_rendition, parse_probe, partial_path, rendition_path, thumbnail_widths, video_encoder_settings,
+)
 from unittest.mock import patch
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 class MovieViewTest(APITestCase):
@@ -33,7 +72,7 @@ class MovieViewTest(APITestCase):
 
     - test_get_movies_authenticated():  
     Sends a GET request to the movie list endpoint with valid token authentication.  
-    Asserts that the response status code is 200 (OK), the response contains one movie, and the movie title matches the test data.
+    Asserts that the response status code is 200 (OK), the first page contains one movie, and the movie title matches the test data.
 
     - test_get_movies_unauthenticated():  
     Sends a GET request without authentication.  
@@ -66,8 +105,10 @@ class MovieViewTest(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Testfilm')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Testfilm')
+        self.assertIsNone(response.data['results'][0]['hls_playlist'])
+        self.assertIsNone(response.data['next'])
 
     def test_get_movies_unauthenticated(self):
         response = self.client.get(self.url)
@@ -374,58 +415,1923 @@ class MovieProgressSingleViewTest(APITestCase):
         response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, 401)
 
+SOURCE_1080P = {'duration': 123.4, 'width': 1920, 'height': 1080, 'bitrate': 8000000, 'fps': 25.0, 'has_audio': True}
+VALID_OUTPUT_PROBE = {
+    'streams': [{'codec_type': 'video', 'codec_name': 'h264', 'width': 640, 'height': 360}, {'codec_type': 'audio', 'codec_name': 'aac'}],
+    'format': {'duration': '12.0'},
+}
+SOURCE_480P = {'duration': 60.0, 'width': 854, 'height': 480, 'bitrate': 1500000, 'fps': 25.0, 'has_audio': True}
+
 class MoviePostSaveSignalTest(TestCase):
     """
-    Unit test for the Movie post-save signal handling using Django's TestCase and unittest.mock.patch.
+    Unit test for the Movie save signals and the ingest pipeline using Django's TestCase and unittest.mock.patch.
 
-    This test verifies that saving a Movie instance triggers:
-    - The retrieval of video duration via the `get_duration` function.
-    - Creation of a related MovieConvertables instance.
-    - Asynchronous conversion tasks for multiple video resolutions are queued.
+    This test verifies that saving a Movie instance with a new video file:
+    - Does not probe or convert anything in the saving request.
+    - Queues the `ingest_movie` task only when the transaction commits.
+    And that the ingest step:
+    - Stores the probed duration and source MediaInfo and creates the related MovieConvertables instance.
+    - Queues conversions, thumbnail and seek previews as header of one chord with `finalize_ingest` as callback.
 
     Key features:
     - Uses patch decorators to mock:
-    - `get_duration` function returning a fixed duration ('123.4').
-    - Celery tasks: `convert120p.delay`, `convert360p.delay`, `convert720p.delay`, and `convert1080p.delay`.
-    - Creates a Movie instance with a mocked video file.
-    - Checks that the Movie's duration is correctly set from the mocked `get_duration`.
-    - Asserts that a corresponding MovieConvertables object is created.
-    - Verifies each video conversion task is called exactly once with correct arguments.
+    - `probe_video` function returning a fixed 1080p source with a duration of 123.4 seconds.
+    - Celery's `chord` in `movie.signals`, to inspect the queued signatures.
+    - Uses `captureOnCommitCallbacks` to run the on-commit callbacks of the test transaction.
+    - Patches `invalidate_catalog` in `movie.signals`, so only the callbacks of the ingest are captured.
 
     Test methods:
-    - test_movie_post_save_triggers_conversion():  
-    Main test method that exercises the post-save signal logic and asserts all expected side effects.
+    - test_save_queues_ingest_on_commit(): Asserts that nothing is probed on save and the ingest is queued on commit.
+    - test_unchanged_video_is_not_reprocessed(): Asserts that saving other fields queues nothing.
+    - test_new_video_file_is_reprocessed(): Asserts that replacing the video file resets the status and queues the ingest.
+    - test_movie_without_video_is_not_pending(): Asserts that a movie without video (or whose video is removed)
+    is marked no_video and nothing is queued.
+    - test_ingest_per_rendition(): Asserts one conversion task per resolution with ascending priority.
+    - test_ingest_single_pass(): Asserts one single pass task, thumbnail, seek previews and the callback.
+    - test_ingest_fast_start(): Asserts the separate high priority task for the lowest resolution.
+    - test_audio_is_encoded_before_conversions(): Asserts that `encode_audio` runs first with the highest priority
+    and queues the conversions, while thumbnail and seek previews do not wait for it, and that a source without
+    audio queues the conversions directly.
+    - test_cached_ladder_skips_audio(): Asserts that no audio is encoded if every resolution is in the transcode cache.
+    - test_source_is_hashed_once(): Asserts that the ingest hashes the source once and passes the hash to every
+    conversion task, which then restores cached resolutions without hashing the source again.
+    - test_ingest_never_upscales(): Asserts that a 480p source is not converted to 720p or 1080p.
+    - test_failed_probe_marks_movie_failed(): Asserts the failed status and that no chord is queued.
+    - test_finalize_marks_movie_ready(): Asserts packaging and the ready status in the chord callback.
 
     Notes:
     - Ensures that the signal integration properly handles asynchronous task dispatch and model updates.
     - Provides confidence that video processing workflow is triggered after movie creation.
     """
+    def setUp(self):
+        catalog_patcher = patch('movie.signals.invalidate_catalog')
+        catalog_patcher.start()
+        self.addCleanup(catalog_patcher.stop)
 
-    @patch('movie.signals.get_duration', return_value='123.4')
-    @patch('movie.signals.convert120p.delay')
-    @patch('movie.signals.convert360p.delay')
-    @patch('movie.signals.convert720p.delay')
-    @patch('movie.signals.convert1080p.delay')
-    def test_movie_post_save_triggers_conversion(
-        self, mock_1080, mock_720, mock_360, mock_120, mock_get_duration
-    ):
+    def create_movie(self, title='Signal Test Movie'):
+        video_file = SimpleUploadedFile("test.mp4", b"00", content_type="video/mp4")
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        movie = Movie.objects.create(title=title, description='Signal test desc', genre='ACTION', video_file=video_file)
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        return movie
+
+    def run_ingest(self, movie, source):
+        with patch('movie.signals.probe_video', return_value=source), patch('movie.signals.chord') as mock_chord:
+            ingest_movie(movie.pk)
+        self.queued_header = mock_chord.call_args.args[0]
+        header = []
+        for signature in self.queued_header:
+            if signature.task == 'movie.signals.encode_audio':
+                header.extend(signature.args[1])
+            else:
+                header.append(signature)
+        header = [(signature.task, signature.args, signature.options.get('priority')) for signature in header]
+        return header, mock_chord.call_args.args[1]
+
+    @patch('movie.signals.probe_video')
+    @patch('movie.signals.ingest_movie.apply_async')
+    def test_save_queues_ingest_on_commit(self, mock_ingest, mock_probe):
         video_file = SimpleUploadedFile("test.mp4", b"00", content_type="video/mp4")
 
-        movie = Movie.objects.create(
-            title='Signal Test Movie',
-            description='Signal test desc',
-            genre='ACTION',
-            video_file=video_file
-        )
+        with self.captureOnCommitCallbacks() as callbacks:
+            movie = Movie.objects.create(
+                title='Signal Test Movie',
+                description='Signal test desc',
+                genre='ACTION',
+                video_file=video_file
+            )
+            mock_ingest.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        mock_ingest.assert_called_once_with((movie.pk,), priority=0)
+        mock_probe.assert_not_called()
+        self.assertEqual(Movie.objects.get(pk=movie.pk).status, Movie.PENDING)
+
+    @patch('movie.signals.ingest_movie.apply_async')
+    def test_unchanged_video_is_not_reprocessed(self, mock_ingest):
+        movie = self.create_movie()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            movie.title = 'Renamed'
+            movie.save()
+
+        self.assertEqual(callbacks, [])
+        mock_ingest.assert_not_called()
+
+    @patch('movie.signals.ingest_movie.apply_async')
+    def test_new_video_file_is_reprocessed(self, mock_ingest):
+        movie = self.create_movie()
+        Movie.objects.filter(pk=movie.pk).update(status=Movie.READY)
+        movie.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.video_file = SimpleUploadedFile("new.mp4", b"01", content_type="video/mp4")
+            movie.save()
+
+        mock_ingest.assert_called_once_with((movie.pk,), priority=0)
+        self.assertEqual(Movie.objects.get(pk=movie.pk).status, Movie.PENDING)
+
+    @patch('movie.signals.ingest_movie.apply_async')
+    def test_movie_without_video_is_not_pending(self, mock_ingest):
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = Movie.objects.create(title='No Video', description='Signal test desc', genre='ACTION')
+        self.assertEqual(Movie.objects.get(pk=movie.pk).status, Movie.NO_VIDEO)
+
+        movie = self.create_movie('Removed Video')
+        Movie.objects.filter(pk=movie.pk).update(status=Movie.READY)
+        movie.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.video_file = None
+            movie.save()
+
+        self.assertEqual(Movie.objects.get(pk=movie.pk).status, Movie.NO_VIDEO)
+        mock_ingest.assert_not_called()
+
+    @override_settings(VIDEO_TRANSCODE_MODE='per_rendition')
+    def test_ingest_per_rendition(self):
+        movie = self.create_movie()
+
+        header, callback = self.run_ingest(movie, SOURCE_1080P)
 
         movie.refresh_from_db()
         self.assertEqual(float(movie.duration), float('123.4'))
+        self.assertEqual(movie.status, Movie.PROCESSING)
         self.assertTrue(MovieConvertables.objects.filter(movie=movie).exists())
 
         path = movie.video_file.path
         convertables_id = MovieConvertables.objects.get(movie=movie).id
+        self.assertEqual(header[:4], [
+            ('movie.signals.convert120p', (path, convertables_id), 1),
+            ('movie.signals.convert360p', (path, convertables_id), 3),
+            ('movie.signals.convert720p', (path, convertables_id), 5),
+            ('movie.signals.convert1080p', (path, convertables_id), 7),
+        ])
+
+    @override_settings(VIDEO_TRANSCODE_MODE='single_pass', VIDEO_FAST_START=False)
+    def test_ingest_single_pass(self):
+        movie = self.create_movie('Single Pass Movie')
+
+        header, callback = self.run_ingest(movie, SOURCE_1080P)
+
+        path = movie.video_file.path
+        convertables_id = MovieConvertables.objects.get(movie=movie).id
+        self.assertEqual(header, [
+            ('movie.signals.convert_all_renditions', (path, convertables_id, ['120p', '360p', '720p', '1080p']), 1),
+            ('movie.signals.generate_thumbnail', (path, movie.pk), None),
+            ('movie.signals.generate_trickplay', (path, movie.pk), None),
+        ])
+        self.assertEqual(callback.task, 'movie.signals.finalize_ingest')
+        self.assertEqual(callback.args, (movie.pk, convertables_id))
+        self.assertEqual(MediaInfo.objects.get(movie=movie, rendition=MediaInfo.SOURCE).height, 1080)
+
+    @override_settings(VIDEO_TRANSCODE_MODE='single_pass', VIDEO_FAST_START=True)
+    def test_ingest_fast_start(self):
+        movie = self.create_movie('Fast Start')
+
+        header, callback = self.run_ingest(movie, SOURCE_1080P)
+
+        path = movie.video_file.path
+        convertables_id = MovieConvertables.objects.get(movie=movie).id
+        self.assertEqual(header[0], ('movie.signals.convert_all_renditions', (path, convertables_id, ['120p']), 1))
+        self.assertEqual(header[1], ('movie.signals.convert_all_renditions', (path, convertables_id, ['360p', '720p', '1080p']), 3))
+
+    @override_settings(VIDEO_TRANSCODE_MODE='single_pass', VIDEO_FAST_START=False)
+    def test_audio_is_encoded_before_conversions(self):
+        movie = self.create_movie('Audio Movie')
+
+        self.run_ingest(movie, SOURCE_1080P)
+        audio_task, thumbnail_task, trickplay_task = self.queued_header
+        self.assertEqual(audio_task.task, 'movie.signals.encode_audio')
+        self.assertEqual(audio_task.args[0], movie.video_file.path)
+        self.assertEqual(audio_task.options['priority'], 0)
+        self.assertEqual([conversion.task for conversion in audio_task.args[1]], ['movie.signals.convert_all_renditions'])
+        self.assertEqual((thumbnail_task.task, trickplay_task.task), ('movie.signals.generate_thumbnail', 'movie.signals.generate_trickplay'))
+
+        self.run_ingest(movie, dict(SOURCE_1080P, has_audio=False))
+        self.assertEqual(self.queued_header[0].task, 'movie.signals.convert_all_renditions')
+
+    @override_settings(VIDEO_TRANSCODE_MODE='single_pass', VIDEO_FAST_START=False)
+    def test_cached_ladder_skips_audio(self):
+        movie = self.create_movie('Cached Movie')
+        for rendition in RENDITIONS[:2]:
+            store_in_cache('hash', rendition, movie.video_file.path)
+
+        with patch('movie.signals.hash_file', return_value='hash'):
+            self.run_ingest(movie, SOURCE_480P)
+        self.assertNotIn('movie.signals.encode_audio', [signature.task for signature in self.queued_header])
+        self.assertEqual(self.queued_header[0].args[2], ['120p', '360p'])
+
+        store_in_cache('other', RENDITIONS[0], movie.video_file.path)
+        with patch('movie.signals.hash_file', return_value='other'):
+            self.run_ingest(movie, SOURCE_480P)
+        self.assertEqual(self.queued_header[0].task, 'movie.signals.encode_audio')
+
+    @override_settings(VIDEO_TRANSCODE_MODE='per_rendition')
+    def test_source_is_hashed_once(self):
+        movie = self.create_movie('Hashed Movie')
+        store_in_cache('hash', RENDITIONS[0], movie.video_file.path)
+
+        with patch('movie.signals.hash_file', return_value='hash') as mock_hash:
+            self.run_ingest(movie, SOURCE_480P)
+        mock_hash.assert_called_once_with(movie.video_file.path)
+        conversions = self.queued_header[0].args[1]
+        self.assertEqual([conversion.kwargs for conversion in conversions], [{'source_hash': 'hash'}] * 2)
+
+        convertables_id = MovieConvertables.objects.get(movie=movie).id
+        with patch('movie.signals.hash_file') as mock_hash, patch('movie.signals.run_ffmpeg') as mock_ffmpeg:
+            transcode_renditions(movie.video_file.path, convertables_id, RENDITIONS[:1], source_hash='hash')
+        mock_hash.assert_not_called()
+        mock_ffmpeg.assert_not_called()
+        self.assertTrue(MovieConvertables.objects.get(pk=convertables_id).video_120p)
+
+    @override_settings(VIDEO_TRANSCODE_MODE='per_rendition')
+    def test_ingest_never_upscales(self):
+        movie = self.create_movie('Small Movie')
+
+        header, callback = self.run_ingest(movie, SOURCE_480P)
+
+        tasks = [task for task, args, priority in header]
+        self.assertIn('movie.signals.convert120p', tasks)
+        self.assertIn('movie.signals.convert360p', tasks)
+        self.assertNotIn('movie.signals.convert720p', tasks)
+        self.assertNotIn('movie.signals.convert1080p', tasks)
+
+    def test_failed_probe_marks_movie_failed(self):
+        movie = self.create_movie('Broken Movie')
+
+        with patch('movie.signals.probe_video', side_effect=subprocess.CalledProcessError(1, 'ffprobe')), \
+                patch('movie.signals.chord') as mock_chord:
+            ingest_movie(movie.pk)
+
+        mock_chord.assert_not_called()
+        self.assertEqual(Movie.objects.get(pk=movie.pk).status, Movie.FAILED)
+
+    @patch('movie.signals.package_hls')
+    def test_finalize_marks_movie_ready(self, mock_package):
+        movie = self.create_movie('Finished Movie')
+        convertables = MovieConvertables.objects.create(movie=movie)
+
+        finalize_ingest(movie.pk, convertables.id)
+        self.assertEqual(Movie.objects.get(pk=movie.pk).status, Movie.FAILED)
+        mock_package.assert_not_called()
+
+        MovieConvertables.objects.filter(pk=convertables.id).update(video_360p='uploads/videos/test_360p.mp4')
+        finalize_ingest(movie.pk, convertables.id)
+        mock_package.assert_called_once_with(convertables.id)
+        self.assertEqual(Movie.objects.get(pk=movie.pk).status, Movie.READY)
+
+class ChunkedTranscodeTest(TestCase):
+    """
+    Test suite for the chunked (split/encode/concat) transcode mode.
+
+    Test methods:
+    - test_long_video_is_chunked(): Asserts that a long video is queued as `transcode_chunked`.
+    - test_short_video_falls_back_to_single_pass(): Asserts the single pass fallback for short videos.
+    - test_split_and_concat_commands(): Asserts stream copy splitting and lossless joining with the source audio.
+    - test_concat_chunks_joins_and_stores_renditions(): Runs the chord callback with a fake FFmpeg and asserts
+    the concat list order, the stored fields, the finished jobs and the removed working directory
+    (packaging is left to `finalize_ingest`).
+    """
+    def create_movie(self, title):
+        video_file = SimpleUploadedFile("long.mp4", b"00", content_type="video/mp4")
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        movie = Movie.objects.create(title=title, description='Chunked test', genre='ACTION', video_file=video_file)
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        return movie
+
+    def queued_tasks(self, movie, source):
+        with patch('movie.signals.probe_video', return_value=dict(source, has_audio=False)), patch('movie.signals.chord') as mock_chord:
+            ingest_movie(movie.pk)
+        return [(signature.task, signature.args, signature.options.get('priority')) for signature in mock_chord.call_args.args[0]]
+
+    @override_settings(VIDEO_TRANSCODE_MODE='chunked', VIDEO_CHUNKED_MIN_DURATION=600)
+    def test_long_video_is_chunked(self):
+        movie = self.create_movie('Long Movie')
+
+        tasks = self.queued_tasks(movie, dict(SOURCE_1080P, duration=3600.0))
+
+        convertables_id = MovieConvertables.objects.get(movie=movie).id
+        self.assertEqual(tasks[0], ('movie.signals.transcode_chunked', (movie.video_file.path, convertables_id, ['120p', '360p', '720p', '1080p']), 1))
+        self.assertNotIn('movie.signals.convert_all_renditions', [task for task, args, priority in tasks])
+
+    @override_settings(VIDEO_TRANSCODE_MODE='chunked', VIDEO_CHUNKED_MIN_DURATION=600, VIDEO_FAST_START=False)
+    def test_short_video_falls_back_to_single_pass(self):
+        movie = self.create_movie('Short Movie')
+
+        tasks = [task for task, args, priority in self.queued_tasks(movie, SOURCE_1080P)]
+
+        self.assertNotIn('movie.signals.transcode_chunked', tasks)
+        self.assertIn('movie.signals.convert_all_renditions', tasks)
+
+    def test_split_and_concat_commands(self):
+        split = build_split_command('/media/movie.mp4', '/media/chunks/chunk_%05d.mkv', 120)
+        self.assertEqual(split[split.index('-c') + 1], 'copy')
+        self.assertEqual(split[split.index('-segment_time') + 1], '120')
+
+        concat = build_concat_command('/media/chunks/720p.txt', '/media/movie.mp4', '/media/movie_720p.mp4')
+        self.assertEqual(concat[concat.index('-c:v') + 1], 'copy')
+        self.assertIn('1:a?', concat)
+
+        concat = build_concat_command('/media/chunks/720p.txt', '/media/movie.mp4', '/media/movie_720p.mp4', '/media/movie_audio.m4a')
+        self.assertIn('/media/movie_audio.m4a', concat)
+        self.assertEqual(concat[concat.index('-c:a') + 1], 'copy')
+
+    def test_concat_chunks_joins_and_stores_renditions(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root):
+            source = os.path.join(media_root, 'uploads', 'videos', 'long.mp4')
+            work_dir = chunk_directory(source)
+            os.makedirs(work_dir)
+            os.makedirs(os.path.dirname(source))
+            for index in range(2):
+                open(os.path.join(work_dir, f'chunk_{index:05d}.mkv'), 'wb').close()
+            post_save.disconnect(receiver=movie_post_save, sender=Movie)
+            movie = Movie.objects.create(title='Chunks', description='Chunked test', genre='ACTION')
+            post_save.connect(receiver=movie_post_save, sender=Movie)
+            convertables = MovieConvertables.objects.create(movie=movie)
+            job_ids = start_jobs(movie.pk, ['120p'])
+            concat_lists = []
+
+            def fake_ffmpeg(command, duration=0.0, job_ids=(), short=False):
+                with open(command[command.index('concat') + 4]) as concat_list:
+                    concat_lists.append(concat_list.read())
+                open(command[-1], 'wb').close()
+                return 0
+
+            with patch('movie.signals.run_ffmpeg', side_effect=fake_ffmpeg), patch('movie.signals.package_hls') as mock_package, \
+                    patch('movie.outputs.probe_file', return_value=VALID_OUTPUT_PROBE):
+                concat_chunks([{'returncode': 0, 'cpu_seconds': 2.0}, {'returncode': 0, 'cpu_seconds': 4.0}],
+                              source, convertables.id, ['120p'], ['120p'], 'hash', job_ids)
+
+            self.assertIn('chunk_00000_120p.mp4', concat_lists[0].splitlines()[0])
+            self.assertIn('chunk_00001_120p.mp4', concat_lists[0].splitlines()[1])
+            convertables.refresh_from_db()
+            self.assertEqual(convertables.video_120p.name, 'uploads/videos/long_120p.mp4')
+            job = TranscodeJob.objects.get(pk=job_ids[0])
+            self.assertEqual(job.status, TranscodeJob.FINISHED)
+            self.assertEqual(job.cpu_seconds, 6.0)
+            self.assertFalse(os.path.exists(work_dir))
+            mock_package.assert_not_called()
+
+class MultiOutputCommandTest(TestCase):
+    """
+    Unit tests for the FFmpeg command used by the single pass transcode.
+
+    Test methods:
+    - test_split_graph_has_one_branch_per_rendition():
+    Asserts that the source is read once and split into one scaled branch per rendition.
+
+    - test_every_rendition_gets_its_own_output():
+    Asserts that every rendition is mapped to its own temporary output file next to the source.
+
+    - test_shared_audio_is_copied():
+    Asserts that the shared audio track is read once and copied into every output without encoding.
+    """
+    def test_split_graph_has_one_branch_per_rendition(self):
+        command = build_multi_output_command('/media/uploads/videos/movie.mp4', RENDITIONS)
+
+        self.assertEqual(command.count('-i'), 1)
+        graph = command[command.index('-filter_complex') + 1]
+        self.assertTrue(graph.startswith('[0:v]split=4[v0][v1][v2][v3]'))
+        self.assertIn("[v0]scale='if(gte(iw,ih),-2,96)':'if(gte(iw,ih),96,-2)'[out0]", graph)
+        self.assertIn("[v3]scale='if(gte(iw,ih),-2,1080)':'if(gte(iw,ih),1080,-2)'[out3]", graph)
+
+    def test_every_rendition_gets_its_own_output(self):
+        renditions = [get_rendition('360p'), get_rendition('1080p')]
+        command = build_multi_output_command('/media/uploads/videos/movie.mp4', renditions)
+
+        self.assertEqual(command.count('-map'), 4)
+        self.assertIn('/media/uploads/videos/movie_360p.partial.mp4', command)
+        self.assertIn('/media/uploads/videos/movie_1080p.partial.mp4', command)
+        self.assertNotIn('/media/uploads/videos/movie_720p.partial.mp4', command)
+        self.assertNotIn('/media/uploads/videos/movie_360p.mp4', command)
+
+    def test_shared_audio_is_copied(self):
+        command = build_multi_output_command('/media/uploads/videos/movie.mp4', RENDITIONS, audio_file='/media/uploads/videos/movie_audio.m4a')
+
+        self.assertEqual(command.count('-i'), 2)
+        self.assertEqual(command.count('1:a:0'), len(RENDITIONS))
+        self.assertNotIn('aac', command)
+        self.assertEqual(build_audio_command('/media/movie.mp4', audio_path('/media/movie.mp4'))[-1], '/media/movie_audio.m4a')
+
+    def test_encodes_use_aligned_keyframes(self):
+        command = build_multi_output_command('/media/uploads/videos/movie.mp4', RENDITIONS)
+
+        self.assertEqual(command.count('-force_key_frames'), len(RENDITIONS))
+        self.assertEqual(command.count('-sc_threshold'), len(RENDITIONS))
+
+class MasterPlaylistTest(TestCase):
+    """
+    Unit test for the HLS master playlist builder.
+
+    Test methods:
+    - test_variants_sorted_by_bandwidth():
+    Asserts that the playlist header is written and the variants are listed
+    with bandwidth and resolution in ascending bandwidth order.
+    """
+    def test_variants_sorted_by_bandwidth(self):
+        playlist = build_master_playlist([
+            {'uri': '720p/index.m3u8', 'bandwidth': 2500000, 'width': 1280, 'height': 720},
+            {'uri': '120p/index.m3u8', 'bandwidth': 150000, 'width': 128, 'height': 96},
+        ])
+        lines = playlist.splitlines()
+
+        self.assertEqual(lines[0], '#EXTM3U')
+        self.assertEqual(lines[2], '#EXT-X-STREAM-INF:BANDWIDTH=150000,RESOLUTION=128x96')
+        self.assertEqual(lines[3], '120p/index.m3u8')
+        self.assertEqual(lines[5], '720p/index.m3u8')
+
+class ThumbnailVariantsTest(TestCase):
+    """
+    Test suite for the responsive thumbnail variants.
+
+    Test methods:
+    - test_single_decode_command(): Asserts one input, one split branch per width and one output per width and format.
+    - test_widths_never_upscale(): Asserts that widths above the source are dropped.
+    - test_task_stores_variants(): Runs the task with a mocked FFmpeg and asserts `image_variants`, `image_file`
+    and the srcset strings of the serializer.
+    - test_avif_fallback(): Asserts that only WebP variants are stored if the AVIF encode fails.
+    """
+    def setUp(self):
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movie = Movie.objects.create(title='Thumbs', description='Thumbnail test', genre='ACTION')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        MediaInfo.objects.create(movie=self.movie, rendition=MediaInfo.SOURCE, width=854, height=480)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_single_decode_command(self):
+        command = build_thumbnail_command('/media/movie.mp4', '/media/thumbs', [160, 320], ['webp', 'avif'])
+
+        self.assertEqual(command.count('-i'), 1)
+        graph = command[command.index('-filter_complex') + 1]
+        self.assertTrue(graph.startswith('[0:v]split=2[s0][s1]'))
+        self.assertIn('[s1]scale=320:-2,split=2[t1webp][t1avif]', graph)
+        self.assertEqual(command.count('-frames:v'), 4)
+        self.assertIn('/media/thumbs/thumb_320.avif', command)
+
+    def test_widths_never_upscale(self):
+        self.assertEqual(thumbnail_widths(854), [160, 320, 640])
+        self.assertEqual(thumbnail_widths(100), [160])
+        self.assertEqual(thumbnail_widths(), [160, 320, 640, 1280])
+
+    def test_task_stores_variants(self):
+        with override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_MODE='fixed'), \
+                patch('movie.signals.subprocess.run', return_value=subprocess.CompletedProcess([], 0)) as mock_run:
+            generate_thumbnail('/media/uploads/videos/movie.mp4', self.movie.pk)
+
+        mock_run.assert_called_once()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.image_file.name, 'uploads/thumbnails/movie/thumb_640.webp')
+        self.assertEqual([variant['width'] for variant in self.movie.image_variants['avif']], [160, 320, 640])
+        srcset = MovieSerializer(self.movie).data['image_srcset']
+        self.assertEqual(srcset['webp'].split(', ')[0], '/media/uploads/thumbnails/movie/thumb_160.webp 160w')
+        self.assertIn('thumb_640.avif 640w', srcset['avif'])
+
+    def test_avif_fallback(self):
+        results = [subprocess.CompletedProcess([], 1, stderr=b'Unknown encoder'), subprocess.CompletedProcess([], 0)]
+        with override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_MODE='fixed'), patch('movie.signals.subprocess.run', side_effect=results):
+            generate_thumbnail('/media/uploads/videos/movie.mp4', self.movie.pk)
+
+        self.movie.refresh_from_db()
+        self.assertEqual(list(self.movie.image_variants), ['webp'])
+
+class PosterFrameTest(TestCase):
+    """
+    Test suite for the smart poster frame selection.
+
+    Test methods:
+    - test_candidates_command(): Asserts keyframe-only decoding of the window, candidates spread over it with a
+    step of window / 32, raw grayscale output and showinfo.
+    - test_score_prefers_detailed_frames(): Asserts that a textured frame beats a flat gray and a black frame.
+    - test_select_poster_position(): Feeds three raw frames with their showinfo log and asserts the timestamp
+    of the best frame.
+    - test_fallback_on_ffmpeg_error(): Asserts the 1 second default if FFmpeg fails.
+    - test_smart_thumbnail_uses_position(): Asserts that the thumbnail is taken at the selected position.
+    """
+    def frames(self):
+        rng = np.random.default_rng(0)
+        black = np.zeros((90, 160), dtype=np.uint8)
+        gray = np.full((90, 160), 128, dtype=np.uint8)
+        textured = rng.integers(20, 235, size=(90, 160), dtype=np.uint8)
+        return np.stack([black, gray, textured])
+
+    def test_candidates_command(self):
+        command = build_candidates_command('/media/movie.mp4', 120)
+
+        self.assertEqual(command[command.index('-skip_frame') + 1], 'nokey')
+        self.assertEqual(command[command.index('-t') + 1], '120')
+        self.assertIn('showinfo', command[command.index('-vf') + 1])
+        self.assertTrue(command[command.index('-vf') + 1].startswith("select='isnan(prev_selected_t)+gte(t-prev_selected_t,3.75)',"))
+        self.assertEqual(command[-3:], ['-f', 'rawvideo', 'pipe:1'])
+
+    def test_score_prefers_detailed_frames(self):
+        scores = score_frames(self.frames())
+        self.assertEqual(int(np.argmax(scores)), 2)
+        self.assertLess(scores[0], scores[1])
+
+    def test_select_poster_position(self):
+        log = ''.join(f'[Parsed_showinfo_2 @ 0x1] n:{index} pts:{index} pts_time:{time}\n' for index, time in enumerate([0, 4.2, 8.4]))
+        result = subprocess.CompletedProcess([], 0, stdout=self.frames().tobytes(), stderr=log.encode())
+        self.assertEqual(parse_frame_times(log), [0.0, 4.2, 8.4])
+
+        with patch('movie.poster.subprocess.run', return_value=result) as mock_run:
+            self.assertEqual(select_poster_position('/media/movie.mp4', 600.0), 8.4)
+        self.assertIn('180', mock_run.call_args.args[0])
+
+    def test_fallback_on_ffmpeg_error(self):
+        with patch('movie.poster.subprocess.run', return_value=subprocess.CompletedProcess([], 1, stdout=b'', stderr=b'error')):
+            self.assertEqual(select_poster_position('/media/movie.mp4', 600.0), 1.0)
+
+    def test_smart_thumbnail_uses_position(self):
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        movie = Movie.objects.create(title='Poster', description='Poster test', genre='ACTION', duration=600.0)
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        with override_settings(MEDIA_ROOT=media_root, THUMBNAIL_MODE='smart'), \
+                patch('movie.signals.select_poster_position', return_value=42.5) as mock_select, \
+                patch('movie.signals.subprocess.run', return_value=subprocess.CompletedProcess([], 0)) as mock_run:
+            generate_thumbnail('/media/uploads/videos/movie.mp4', movie.pk)
+
+        mock_select.assert_called_once_with('/media/uploads/videos/movie.mp4', 600.0)
+        command = mock_run.call_args.args[0]
+        self.assertEqual(command[command.index('-ss') + 1], '42.500')
+
+class TrickplayTest(TestCase):
+    """
+    Unit test for the seek preview (trickplay) sprite command and WebVTT index.
+
+    Test methods:
+    - test_single_decode_tiling_command(): Asserts that sampling, scaling and tiling happen in one filter chain.
+    - test_vtt_maps_intervals_to_tiles(): Asserts cue times and `#xywh` fragments, including the wrap to
+    the next row, the next sprite sheet and the shortened last cue.
+    """
+    def test_single_decode_tiling_command(self):
+        command = build_trickplay_command('/media/uploads/videos/movie.mp4', '/media/uploads/trickplay/movie')
+
+        self.assertEqual(command.count('-i'), 1)
+        self.assertEqual(
+            command[command.index('-vf') + 1],
+            'fps=1/10,scale=160:90:force_original_aspect_ratio=decrease,pad=160:90:(ow-iw)/2:(oh-ih)/2,tile=10x10',
+        )
+        self.assertEqual(command[-1], '/media/uploads/trickplay/movie/sprite_%03d.jpg')
+
+    def test_vtt_maps_intervals_to_tiles(self):
+        lines = build_trickplay_vtt(1005.0).splitlines()
+
+        self.assertEqual(lines[0], 'WEBVTT')
+        self.assertEqual(lines[2], '00:00:00.000 --> 00:00:10.000')
+        self.assertEqual(lines[3], 'sprite_001.jpg#xywh=0,0,160,90')
+        self.assertEqual(lines[6], 'sprite_001.jpg#xywh=160,0,160,90')
+        self.assertEqual(lines[10 * 3 + 3], 'sprite_001.jpg#xywh=0,90,160,90')
+        self.assertEqual(lines[100 * 3 + 3], 'sprite_002.jpg#xywh=0,0,160,90')
+        self.assertEqual(lines[-2], '00:16:40.000 --> 00:16:45.000')
+
+class ServeMediaViewTest(TestCase):
+    """
+    Test suite for the media delivery view (`serve_media`).
+
+    Key features:
+    - Writes a 100 byte test file into a temporary MEDIA_ROOT below 'uploads/videos/'.
+
+    Test methods:
+    - test_full_file(): Asserts 200, the full body and the Accept-Ranges / Content-Length headers.
+    - test_range_request(): Asserts 206 with the requested slice and a matching Content-Range.
+    - test_suffix_range_request(): Asserts that `bytes=-10` returns the last 10 bytes.
+    - test_unsatisfiable_range(): Asserts 416 with `Content-Range: bytes */<size>`.
+    - test_not_modified(): Asserts 304 for a request with the current ETag.
+    - test_path_outside_prefixes(): Asserts 404 for files outside the delivery prefixes, also when the path
+    starts with a delivery prefix and leaves it with '..', and that a path is normalized before it is served.
+    - test_accel_redirect(): Asserts that the nginx backend only sets X-Accel-Redirect and sends no body.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'videos'))
+        self.content = bytes(range(100))
+        with open(os.path.join(self.media_root, 'uploads', 'videos', 'clip.mp4'), 'wb') as file:
+            file.write(self.content)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SENDFILE_BACKEND='')
+        self.settings_override.enable()
+        self.url = reverse('media', kwargs={'path': 'uploads/videos/clip.mp4'})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_full_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_suffix_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[90:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=200-300')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_path_outside_prefixes(self):
+        response = self.client.get(reverse('media', kwargs={'path': '../settings.py'}))
+        self.assertEqual(response.status_code, 404)
+
+        os.makedirs(os.path.join(self.media_root, 'uploads', 'chunks'))
+        with open(os.path.join(self.media_root, 'uploads', 'chunks', 'chunk.mkv'), 'wb') as file:
+            file.write(b'chunk')
+        response = self.client.get(reverse('media', kwargs={'path': 'uploads/videos/../chunks/chunk.mkv'}))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('media', kwargs={'path': 'uploads/videos/./clip.mp4'}))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/uploads/videos/clip.mp4')
+        self.assertEqual(response.content, b'')
+
+class TranscodeCacheTest(TestCase):
+    """
+    Test suite for the content addressed transcode cache.
+
+    Key features:
+    - Uses a temporary MEDIA_ROOT with two uploads of identical content under different names.
+    - Patches `run_ffmpeg` in `movie.signals` to simulate FFmpeg writing the outputs and
+      the output probe to accept them.
+
+    Test methods:
+    - test_hash_file(): Asserts that the streamed hash matches the SHA-256 of the content.
+    - test_identical_source_is_linked_from_cache():
+    Converts the first upload, then the second one and asserts that FFmpeg only ran once and
+    the second MovieConvertables instance points to an output with the same content.
+    - test_same_name_different_content_is_converted():
+    Asserts that an existing output file of a different source does not skip the conversion.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.video_dir = os.path.join(self.media_root, 'uploads', 'videos')
+        os.makedirs(self.video_dir)
+
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movie = Movie.objects.create(title='Cache', description='Cache test', genre='ACTION')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        probe_patcher = patch('movie.outputs.probe_file', return_value=VALID_OUTPUT_PROBE)
+        probe_patcher.start()
+        self.addCleanup(probe_patcher.stop)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def write_source(self, name, content):
+        path = os.path.join(self.video_dir, name)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def fake_ffmpeg(self, command, duration=0.0, job_ids=(), short=False):
+        with open(command[command.index('-i') + 1], 'rb') as source:
+            content = source.read()
+        for argument in command:
+            if argument.endswith('p.partial.mp4'):
+                with open(argument, 'wb') as file:
+                    file.write(b'encoded ' + content)
+        return 0
+
+    def test_hash_file(self):
+        path = self.write_source('hash.mp4', b'x' * 3000000)
+        self.assertEqual(hash_file(path), hashlib.sha256(b'x' * 3000000).hexdigest())
+
+    def test_identical_source_is_linked_from_cache(self):
+        first = self.write_source('first.mp4', b'same content')
+        second = self.write_source('second.mp4', b'same content')
+        first_convertables = MovieConvertables.objects.create(movie=self.movie)
+        second_convertables = MovieConvertables.objects.create(movie=self.movie)
+
+        with patch('movie.signals.run_ffmpeg', side_effect=self.fake_ffmpeg) as mock_run:
+            transcode_renditions(first, first_convertables.id, RENDITIONS)
+            transcode_renditions(second, second_convertables.id, RENDITIONS)
+
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(TranscodeCacheEntry.objects.count(), len(RENDITIONS))
+        self.assertEqual(TranscodeJob.objects.filter(status=TranscodeJob.CACHED).count(), len(RENDITIONS))
+        second_convertables.refresh_from_db()
+        self.assertEqual(second_convertables.video_720p.name, 'uploads/videos/second_720p.mp4')
+        with open(os.path.join(self.video_dir, 'second_720p.mp4'), 'rb') as file:
+            self.assertEqual(file.read(), b'encoded same content')
+
+    def test_same_name_different_content_is_converted(self):
+        source = self.write_source('movie.mp4', b'new content')
+        with open(os.path.join(self.video_dir, 'movie_360p.mp4'), 'wb') as file:
+            file.write(b'stale output of another upload')
+        convertables = MovieConvertables.objects.create(movie=self.movie)
+
+        with patch('movie.signals.run_ffmpeg', side_effect=self.fake_ffmpeg) as mock_run:
+            transcode_renditions(source, convertables.id, [get_rendition('360p')])
+
+        mock_run.assert_called_once()
+        with open(os.path.join(self.video_dir, 'movie_360p.mp4'), 'rb') as file:
+            self.assertEqual(file.read(), b'encoded new content')
+
+class SourceLadderTest(TestCase):
+    """
+    Unit tests for the source probe parsing and the source aware resolution ladder.
+
+    Test methods:
+    - test_parse_probe(): Asserts that size, duration, bitrate, fps and audio presence are extracted.
+    - test_ladder_skips_resolutions_above_source(): Asserts that a 480p source only gets 120p and 360p.
+    - test_ladder_keeps_lowest_resolution(): Asserts that a tiny source still gets the lowest resolution.
+    - test_ladder_uses_short_side(): Asserts that portrait and non 16:9 sources are compared by their short side,
+    so a 1080x1920 or 1440x1080 source gets 1080p and nothing is upscaled.
+    - test_available_renditions(): Asserts that the API lists only converted resolutions.
+    """
+    def test_parse_probe(self):
+        source = parse_probe({
+            'streams': [
+                {'codec_type': 'video', 'width': 1280, 'height': 720, 'duration': '10.5', 'avg_frame_rate': '30000/1001'},
+                {'codec_type': 'audio'},
+            ],
+            'format': {'bit_rate': '2500000', 'duration': '10.6'},
+        })
+        self.assertEqual(source['width'], 1280)
+        self.assertEqual(source['height'], 720)
+        self.assertEqual(source['duration'], 10.5)
+        self.assertEqual(source['bitrate'], 2500000)
+        self.assertAlmostEqual(source['fps'], 29.97, places=2)
+        self.assertTrue(source['has_audio'])
+
+    def test_ladder_skips_resolutions_above_source(self):
+        self.assertEqual([rendition['name'] for rendition in build_ladder(SOURCE_480P)], ['120p', '360p'])
+
+    def test_ladder_keeps_lowest_resolution(self):
+        self.assertEqual([rendition['name'] for rendition in build_ladder({'width': 96, 'height': 72})], ['120p'])
+
+    def test_ladder_uses_short_side(self):
+        for width, height, expected in [
+            (1080, 1920, ['120p', '360p', '720p', '1080p']),
+            (1440, 1080, ['120p', '360p', '720p', '1080p']),
+            (480, 854, ['120p', '360p']),
+            (1920, 800, ['120p', '360p', '720p']),
+        ]:
+            ladder = build_ladder({'width': width, 'height': height})
+            self.assertEqual([rendition['name'] for rendition in ladder], expected, f'{width}x{height}')
+
+    def test_available_renditions(self):
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        movie = Movie.objects.create(title='Ladder', description='Ladder test', genre='ACTION')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        convertables = MovieConvertables.objects.create(movie=movie, video_120p='uploads/videos/a_120p.mp4', video_360p='uploads/videos/a_360p.mp4')
+
+        data = MovieConvertablesSerializer(convertables).data
+        self.assertEqual(data['available_renditions'], ['120p', '360p'])
+
+class MediaInfoTest(TestCase):
+    """
+    Test suite for the persisted media properties (MediaInfo).
+
+    Test methods:
+    - test_parse_probe_media_properties(): Asserts that container, codecs, audio layout and file size are extracted.
+    - test_renditions_are_probed_once(): Commits and saves two resolutions with a mocked ffprobe (`movie.outputs.probe_file`)
+    and asserts one probe and one MediaInfo entry per resolution, nested with its bitrate in the convertables API data.
+    - test_failed_probe_keeps_rendition(): Asserts that a failing probe does not prevent storing the resolution.
+    """
+    def setUp(self):
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movie = Movie.objects.create(title='Media Info', description='Probe test', genre='ACTION')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        self.convertables = MovieConvertables.objects.create(movie=self.movie)
+
+    def test_parse_probe_media_properties(self):
+        info = parse_probe({
+            'streams': [
+                {'codec_type': 'video', 'codec_name': 'h264', 'width': 640, 'height': 360, 'avg_frame_rate': '25/1'},
+                {'codec_type': 'audio', 'codec_name': 'aac', 'channels': 2, 'channel_layout': 'stereo'},
+            ],
+            'format': {'format_name': 'mov,mp4,m4a,3gp,3g2,mj2', 'bit_rate': '800000', 'duration': '60.0', 'size': '6000000'},
+        })
+        self.assertEqual(info['container'], 'mov,mp4,m4a,3gp,3g2,mj2')
+        self.assertEqual(info['video_codec'], 'h264')
+        self.assertEqual(info['audio_codec'], 'aac')
+        self.assertEqual(info['audio_channels'], 2)
+        self.assertEqual(info['audio_layout'], 'stereo')
+        self.assertEqual(info['size'], 6000000)
+
+    def test_renditions_are_probed_once(self):
+        def probe(path):
+            height = 360 if path.endswith('_360p.partial.mp4') else 96
+            video = {'codec_type': 'video', 'codec_name': 'h264', 'width': height * 4 // 3, 'height': height, 'avg_frame_rate': '25/1'}
+            return {'streams': [video], 'format': {'duration': '60.0', 'bit_rate': str(height * 2000)}}
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        source = os.path.join(media_root, 'uploads', 'videos', 'movie.mp4')
+        os.makedirs(os.path.dirname(source))
+        renditions = [get_rendition('120p'), get_rendition('360p')]
+        for rendition in renditions:
+            with open(partial_path(rendition_path(source, rendition['name'])), 'wb') as file:
+                file.write(b'encoded')
+
+        probed = {}
+        with override_settings(MEDIA_ROOT=media_root), patch('movie.outputs.probe_file', side_effect=probe) as mock_probe, \
+                patch('movie.signals.probe_file', new=mock_probe):
+            self.assertEqual(commit_renditions(source, renditions, True, 60.0, probed=probed), [])
+            save_renditions(self.convertables, source, renditions, probed)
+
+        self.assertEqual(mock_probe.call_count, 2)
+        self.assertEqual(MediaInfo.objects.get(movie=self.movie, rendition='360p').bitrate, 720000)
+        data = MovieConvertablesSerializer(self.convertables).data
+        self.assertEqual([(entry['rendition'], entry['bitrate']) for entry in data['media_info']], [('120p', 192000), ('360p', 720000)])
+
+    def test_failed_probe_keeps_rendition(self):
+        with patch('movie.signals.probe_video', side_effect=subprocess.CalledProcessError(1, 'ffprobe')):
+            fields = save_renditions(self.convertables, '/media/uploads/videos/movie.mp4', [get_rendition('720p')])
+
+        self.assertEqual(fields, ['video_720p'])
+        self.assertFalse(MediaInfo.objects.filter(movie=self.movie).exists())
+
+class FakeFFmpegProcess:
+    def __init__(self, output, returncode=0):
+        self.stdout = iter(output.splitlines(keepends=True))
+        self.returncode = returncode
+
+    def wait(self):
+        return self.returncode
+
+class TranscodeJobTest(APITestCase):
+    """
+    Test suite for the transcode job tracking and its API endpoint.
+
+    Test methods:
+    - test_parse_progress_values(): Asserts parsing of FFmpeg speed values and the percentage done.
+    - test_run_ffmpeg_updates_jobs(): Runs a fake FFmpeg process with `-progress` output and asserts
+    that the job is finished with progress 100 and the last reported speed.
+    - test_failed_run_marks_jobs_failed(): Asserts that a non-zero exit code marks the job as failed.
+    - test_get_jobs(): Asserts that the endpoint lists the jobs of a movie for authenticated users.
+    - test_get_jobs_unknown_movie(): Asserts 404 for an unknown movie.
+    - test_get_jobs_unauthenticated(): Asserts 401 without token.
+    """
+    PROGRESS_OUTPUT = "frame=100\nout_time_us=5000000\nspeed=2.50x\nprogress=continue\nframe=200\nout_time_us=10000000\nspeed=2.75x\nprogress=end\n"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username='user', email='user@test.com', password='test123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
 
-        mock_120.assert_called_once_with(path, convertables_id)
-        mock_360.assert_called_once_with(path, convertables_id)
-        mock_720.assert_called_once_with(path, convertables_id)
-        mock_1080.assert_called_once_with(path, convertables_id)
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movie = Movie.objects.create(title='Jobs', description='Jobs test', genre='ACTION', duration=10.0)
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        self.url = reverse('movie-transcode-jobs', kwargs={'pk': self.movie.pk})
+
+    def test_parse_progress_values(self):
+        self.assertEqual(parse_speed('2.35x'), 2.35)
+        self.assertIsNone(parse_speed('N/A'))
+        self.assertEqual(progress_percent({'out_time_us': '2500000'}, 10.0), 25.0)
+        self.assertEqual(progress_percent({'out_time_us': '2500000'}, 0), 0.0)
+
+    def test_run_ffmpeg_updates_jobs(self):
+        job_ids = start_jobs(self.movie.pk, ['720p'])
+        with patch('movie.jobs.subprocess.Popen', return_value=FakeFFmpegProcess(self.PROGRESS_OUTPUT)) as mock_popen:
+            returncode = run_ffmpeg(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], 10.0, job_ids)
+
+        self.assertEqual(returncode, 0)
+        self.assertEqual(mock_popen.call_args[0][0][:4], ['ffmpeg', '-progress', 'pipe:1', '-nostats'])
+        job = TranscodeJob.objects.get(pk=job_ids[0])
+        self.assertEqual(job.status, TranscodeJob.FINISHED)
+        self.assertEqual(job.progress, 100.0)
+        self.assertEqual(job.speed, 2.75)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_run_marks_jobs_failed(self):
+        job_ids = start_jobs(self.movie.pk, ['120p', '360p'])
+        with patch('movie.jobs.subprocess.Popen', return_value=FakeFFmpegProcess('', returncode=1)):
+            run_ffmpeg(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], 10.0, job_ids)
+
+        self.assertEqual(TranscodeJob.objects.filter(status=TranscodeJob.FAILED).count(), 2)
+
+    def test_get_jobs(self):
+        start_jobs(self.movie.pk, ['120p', '360p'])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([job['rendition'] for job in response.data], ['120p', '360p'])
+        self.assertEqual(response.data[0]['status'], TranscodeJob.RUNNING)
+
+    def test_get_jobs_unknown_movie(self):
+        response = self.client.get(reverse('movie-transcode-jobs', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_jobs_unauthenticated(self):
+        self.client.credentials()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+class ResumableUploadTest(APITestCase):
+    """
+    Test suite for the resumable upload API.
+
+    Key features:
+    - Uses a temporary MEDIA_ROOT and a staff user with token authentication.
+    - Patches the `ingest_movie` task and runs the on-commit callbacks with `captureOnCommitCallbacks`.
+
+    Test methods:
+    - test_upload_in_chunks(): Creates an upload, sends it in two chunks and asserts the offsets, the
+    file attached to the movie and the queued ingest.
+    - test_head_returns_offset(): Asserts the Upload-Offset and Upload-Length headers.
+    - test_offset_mismatch(): Asserts 409 for a chunk that does not start at the current offset.
+    - test_concurrent_chunk_conflicts(): Asserts 409 for a chunk while another request is writing to the upload.
+    - test_failed_finalize_is_retried(): Asserts that a failing database update keeps the partial file and
+    that an empty PATCH at the final offset attaches the video.
+    - test_chunk_exceeds_length(): Asserts 413 for a chunk larger than the rest of the upload.
+    - test_expired_upload_gone(): Asserts 410 for a chunk of an upload whose partial file was collected.
+    - test_wrong_content_type(): Asserts 415 for a chunk without application/offset+octet-stream.
+    - test_non_staff_forbidden(): Asserts 403 for users without staff status.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, VIDEO_UPLOAD_TEMP_DIR=os.path.join(self.media_root, 'uploads', 'partial'),
+        )
+        self.settings_override.enable()
+
+        self.user = CustomUser.objects.create_user(username='admin', email='admin@test.com', password='test123', is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.movie = Movie.objects.create(title='Upload', description='Upload test', genre='ACTION')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def create_upload(self, length=10):
+        response = self.client.post(reverse('uploads'), {'movie': self.movie.pk, 'filename': 'big.mp4', 'length': length}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def send_chunk(self, url, offset, data, content_type='application/offset+octet-stream'):
+        return self.client.generic('PATCH', url, data, content_type=content_type, HTTP_UPLOAD_OFFSET=str(offset))
+
+    @patch('movie.signals.ingest_movie.apply_async')
+    def test_upload_in_chunks(self, mock_ingest):
+        response = self.create_upload()
+        url = response['Location']
+        self.assertEqual(response['Upload-Offset'], '0')
+
+        response = self.send_chunk(url, 0, b'01234')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response['Upload-Offset'], '5')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.send_chunk(url, 5, b'56789')
+        self.assertEqual(response['Upload-Offset'], '10')
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.video_file.name, 'uploads/videos/big.mp4')
+        with open(self.movie.video_file.path, 'rb') as file:
+            self.assertEqual(file.read(), b'0123456789')
+        self.assertIsNotNone(Upload.objects.get().completed_at)
+        mock_ingest.assert_called_once_with((self.movie.pk,), priority=0)
+
+    def test_head_returns_offset(self):
+        url = self.create_upload()['Location']
+        self.send_chunk(url, 0, b'012')
+
+        response = self.client.head(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Upload-Offset'], '3')
+        self.assertEqual(response['Upload-Length'], '10')
+
+    def test_offset_mismatch(self):
+        url = self.create_upload()['Location']
+
+        response = self.send_chunk(url, 4, b'456')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response['Upload-Offset'], '0')
+
+    def test_concurrent_chunk_conflicts(self):
+        url = self.create_upload()['Location']
+        upload = Upload.objects.get()
+
+        with open(upload.part_path, 'r+b') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            response = self.send_chunk(url, 0, b'012')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Upload.objects.get().offset, 0)
+        self.assertEqual(self.send_chunk(url, 0, b'012')['Upload-Offset'], '3')
+
+    @patch('movie.signals.ingest_movie.apply_async')
+    def test_failed_finalize_is_retried(self, mock_ingest):
+        url = self.create_upload(length=4)['Location']
+        upload = Upload.objects.get()
+
+        with patch('movie.uploads.now', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                self.send_chunk(url, 0, b'0123')
+        upload.refresh_from_db()
+        self.assertEqual((upload.offset, upload.completed_at), (4, None))
+        self.assertTrue(os.path.exists(upload.part_path))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'uploads', 'videos')), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.send_chunk(url, 4, b'')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.movie.refresh_from_db()
+        with open(self.movie.video_file.path, 'rb') as file:
+            self.assertEqual(file.read(), b'0123')
+        self.assertIsNotNone(Upload.objects.get().completed_at)
+        self.assertFalse(os.path.exists(upload.part_path))
+        mock_ingest.assert_called_once_with((self.movie.pk,), priority=0)
+
+    def test_chunk_exceeds_length(self):
+        url = self.create_upload(length=4)['Location']
+        response = self.send_chunk(url, 0, b'0123456')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_expired_upload_gone(self):
+        url = self.create_upload()['Location']
+        os.remove(Upload.objects.get().part_path)
+
+        response = self.send_chunk(url, 0, b'012')
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_wrong_content_type(self):
+        url = self.create_upload()['Location']
+        response = self.send_chunk(url, 0, b'012', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_non_staff_forbidden(self):
+        user = CustomUser.objects.create_user(username='user', email='user@test.com', password='test123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        response = self.client.post(reverse('uploads'), {'movie': self.movie.pk, 'filename': 'big.mp4', 'length': 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class TaskRoutingTest(TestCase):
+    """
+    Unit test for the Celery queue routing of the video pipeline and the emails.
+
+    Test methods:
+    - test_routes(): Asserts that emails, thumbnails and conversions end up in separate queues.
+    """
+    def test_routes(self):
+        router = celery_app.amqp.router
+        self.assertEqual(router.route({}, 'userprofile.tasks.send_verification_email_to_user')['queue'].name, 'mail')
+        self.assertEqual(router.route({}, 'movie.signals.generate_thumbnail')['queue'].name, 'thumbnails')
+        self.assertEqual(router.route({}, 'movie.signals.generate_trickplay')['queue'].name, 'thumbnails')
+        self.assertEqual(router.route({}, 'movie.signals.convert_all_renditions')['queue'].name, 'transcode')
+
+class EncoderSettingsTest(TestCase):
+    """
+    Test suite for the configurable encoder settings and the encoder benchmark command.
+
+    Test methods:
+    - test_rendition_override(): Asserts that VIDEO_RENDITION_ENCODERS overrides VIDEO_ENCODER per resolution
+    and that the FFmpeg command and the transcode cache parameters follow the settings.
+    - test_benchmark_command(): Runs `benchmark_encoders` with a fake FFmpeg and asserts one JSON result
+    per resolution, preset and CRF value, encoded with the keyframe options and thread counts of the pipeline.
+    """
+    @override_settings(
+        VIDEO_ENCODER={'codec': 'libx264', 'preset': 'veryfast', 'crf': 24},
+        VIDEO_RENDITION_ENCODERS={'1080p': {'preset': 'slow', 'crf': 21}},
+    )
+    def test_rendition_override(self):
+        self.assertEqual(video_encoder_settings(get_rendition('360p')), {'codec': 'libx264', 'preset': 'veryfast', 'crf': 24})
+        self.assertEqual(video_encoder_settings(get_rendition('1080p')), {'codec': 'libx264', 'preset': 'slow', 'crf': 21})
+
+        command = build_multi_output_command('/media/movie.mp4', [get_rendition('1080p')])
+        self.assertEqual(command[command.index('-preset') + 1], 'slow')
+        self.assertEqual(encode_parameters(get_rendition('1080p'))['video'][:6], ['-c:v', 'libx264', '-preset', 'slow', '-crf', '21'])
+
+    @override_settings(FFMPEG_THREADS=3, FFMPEG_RENDITION_THREADS={})
+    def test_benchmark_command(self):
+        commands = []
+
+        def fake_ffmpeg(command, **kwargs):
+            commands.append(command)
+            with open(command[-1], 'wb') as file:
+                file.write(b'x' * 1000)
+            return subprocess.CompletedProcess(command, 0)
+
+        json_path = os.path.join(tempfile.mkdtemp(), 'results.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(json_path))
+        with patch('movie.management.commands.benchmark_encoders.subprocess.run', side_effect=fake_ffmpeg):
+            call_command('benchmark_encoders', renditions='120p,360p', presets='veryfast,medium', crf='23',
+                         duration=2, json_path=json_path, stdout=io.StringIO())
+
+        with open(json_path) as file:
+            results = json.load(file)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['rendition'], '120p')
+        self.assertEqual(results[0]['size_bytes'], 1000)
+        self.assertEqual(results[0]['bitrate_kbps'], 4.0)
+        encode = commands[1]
+        self.assertEqual(encode[encode.index('-i') - 1], '3')
+        self.assertEqual(encode[-3:-1], ['-threads', '3'])
+        self.assertEqual(encode[encode.index('-sc_threshold') + 1], '0')
+        self.assertIn('-force_key_frames', encode)
+
+
+class FFmpegGovernorTest(TestCase):
+    """
+    Test suite for the host-wide FFmpeg slots and the thread budget of FFmpeg processes.
+
+    Test methods:
+    - test_slots_are_exclusive():
+    Asserts that a held slot is skipped and that a slot can be taken again after release.
+
+    - test_waits_for_a_free_slot():
+    Asserts that a process waits (polls) while all slots of the host are taken.
+
+    - test_threads_follow_pixel_count():
+    Asserts that the process budget is shared by pixel count and that configured values win.
+
+    - test_command_threads():
+    Asserts that the single pass command sets decoder threads and encoder threads per output.
+
+    - test_short_jobs_have_own_slots_and_threads():
+    Asserts that a short job gets a slot while all encode slots are taken, and that the short job
+    commands (audio, split, concat, thumbnail, HLS, poster) set FFMPEG_SHORT_THREADS.
+    """
+    def setUp(self):
+        self.lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.lock_dir, ignore_errors=True)
+
+    def test_slots_are_exclusive(self):
+        with override_settings(FFMPEG_LOCK_DIR=self.lock_dir, FFMPEG_MAX_CONCURRENT=2):
+            with ffmpeg_slot() as first:
+                with ffmpeg_slot() as second:
+                    self.assertEqual((first, second), (0, 1))
+            with ffmpeg_slot() as again:
+                self.assertEqual(again, 0)
+
+    def test_waits_for_a_free_slot(self):
+        with override_settings(FFMPEG_LOCK_DIR=self.lock_dir, FFMPEG_MAX_CONCURRENT=1):
+            held = ffmpeg_slot()
+            held.__enter__()
+            with patch('movie.governor.time.sleep', side_effect=lambda seconds: held.__exit__(None, None, None)) as sleep:
+                with ffmpeg_slot() as slot:
+                    self.assertEqual(slot, 0)
+            sleep.assert_called_once()
+
+    @override_settings(FFMPEG_THREADS=8, FFMPEG_RENDITION_THREADS={'120p': 2})
+    def test_threads_follow_pixel_count(self):
+        threads = rendition_threads([get_rendition('120p'), get_rendition('720p'), get_rendition('1080p')])
+
+        self.assertEqual(threads['120p'], 2)
+        self.assertEqual(threads['720p'], 2)
+        self.assertEqual(threads['1080p'], 6)
+
+    @override_settings(FFMPEG_THREADS=4, FFMPEG_RENDITION_THREADS={})
+    def test_command_threads(self):
+        command = build_multi_output_command('/media/movie.mp4', [get_rendition('360p'), get_rendition('1080p')])
+
+        self.assertEqual(command[command.index('-i') - 2:command.index('-i')], ['-threads', '4'])
+        output_threads = [command[index + 1] for index, arg in enumerate(command) if arg == '-threads'][1:]
+        self.assertEqual(output_threads, ['1', '4'])
+
+    @override_settings(FFMPEG_SHORT_MAX_CONCURRENT=1, FFMPEG_SHORT_THREADS=2)
+    def test_short_jobs_have_own_slots_and_threads(self):
+        with override_settings(FFMPEG_LOCK_DIR=self.lock_dir, FFMPEG_MAX_CONCURRENT=1):
+            with ffmpeg_slot(), patch('movie.governor.time.sleep', side_effect=AssertionError('short job waited')):
+                with ffmpeg_slot(short=True) as slot:
+                    self.assertEqual(slot, 0)
+
+        commands = [
+            build_audio_command('/media/movie.mp4', '/media/movie_audio.m4a'),
+            build_split_command('/media/movie.mp4', '/media/chunk_%05d.mkv', 60),
+            build_concat_command('/media/list.txt', '/media/movie.mp4', '/media/movie_360p.mp4'),
+            build_thumbnail_command('/media/movie.mp4', '/media/thumbs', [320], ['webp']),
+            build_hls_command('/media/movie_360p.mp4', '/media/hls'),
+            build_candidates_command('/media/movie.mp4'),
+        ]
+        for command in commands:
+            self.assertEqual(command[command.index('-threads') + 1], '2', command)
+
+class MediaCleanupTest(TestCase):
+    """
+    Test suite for the media garbage collector (`cleanup_media` command and nightly task).
+
+    Setup:
+    - A temporary MEDIA_ROOT with a ready movie (source, 360p, HLS, thumbnails), a movie that is
+      still processing and the leftovers of a replaced video (old source, resolution, HLS, thumbnail).
+    - All files are dated two days back, except one recent orphan inside the grace period.
+
+    Test methods:
+    - test_report_finds_orphans(): Asserts that exactly the unreferenced, old files are reported with their size.
+    - test_dry_run_keeps_files(): Asserts that the command without `--delete` only reports.
+    - test_delete_removes_orphans(): Asserts that `--delete` removes the orphans and their emptied directories.
+    - test_scheduled_task(): Asserts that the task only deletes with MEDIA_GC_DELETE and is scheduled by beat.
+    - test_deleted_movie_with_cached_renditions(): Asserts that the resolutions of a deleted movie are reclaimed
+    although the transcode cache refers to them, and that their cache entries are dropped with the files.
+    - test_abandoned_upload_part_file(): Asserts that the partial files of expired and completed uploads are
+    reclaimed while the one of an unfinished, recent upload is kept.
+    """
+    ORPHANS = [
+        'uploads/videos/old.mp4',
+        'uploads/videos/old_360p.mp4',
+        'uploads/videos/ready_audio.m4a',
+        'uploads/hls/old/master.m3u8',
+        'uploads/hls/old/360p/index.m3u8',
+        'uploads/thumbnails/old.jpg',
+    ]
+    KEPT = [
+        'uploads/videos/ready.mp4',
+        'uploads/videos/ready_360p.mp4',
+        'uploads/hls/ready/master.m3u8',
+        'uploads/hls/ready/360p/segment_000.ts',
+        'uploads/thumbnails/ready/thumb_1280.webp',
+        'uploads/thumbnails/ready/thumb_160.webp',
+        'uploads/videos/busy.mp4',
+        'uploads/videos/busy_720p.mp4',
+        'uploads/trickplay/busy/sprite_001.jpg',
+    ]
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, MEDIA_GC_GRACE_HOURS=24, VIDEO_UPLOAD_EXPIRE_HOURS=72,
+            VIDEO_UPLOAD_TEMP_DIR=os.path.join(self.media_root, 'uploads', 'partial'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        two_days_ago = time.time() - 2 * 24 * 3600
+        for path in self.ORPHANS + self.KEPT + ['uploads/videos/recent.mp4']:
+            full_path = os.path.join(self.media_root, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as file:
+                file.write(b'x' * 100)
+            if path != 'uploads/videos/recent.mp4':
+                os.utime(full_path, (two_days_ago, two_days_ago))
+
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        ready = Movie.objects.create(
+            title='Ready', description='desc', status=Movie.READY,
+            video_file='uploads/videos/ready.mp4',
+            hls_playlist='uploads/hls/ready/master.m3u8',
+            image_file='uploads/thumbnails/ready/thumb_1280.webp',
+        )
+        Movie.objects.create(title='Busy', description='desc', status=Movie.PROCESSING, video_file='uploads/videos/busy.mp4')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        MovieConvertables.objects.create(movie=ready, video_360p='uploads/videos/ready_360p.mp4')
+
+    def test_report_finds_orphans(self):
+        report = find_orphaned_media()
+
+        orphans = sorted(path for usage in report.values() for path, _ in usage['files'])
+        self.assertEqual(orphans, sorted(self.ORPHANS))
+        self.assertEqual(report['uploads/videos']['reclaimable'], 300)
+        self.assertEqual(report['uploads/videos']['used'], 800)
+
+    def test_dry_run_keeps_files(self):
+        out = io.StringIO()
+        call_command('cleanup_media', stdout=out)
+
+        self.assertIn('Dry run: 600 B reclaimable', out.getvalue())
+        for path in self.ORPHANS:
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, path)))
+
+    def test_delete_removes_orphans(self):
+        call_command('cleanup_media', delete=True, stdout=io.StringIO())
+
+        for path in self.ORPHANS:
+            self.assertFalse(os.path.exists(os.path.join(self.media_root, path)))
+        for path in self.KEPT + ['uploads/videos/recent.mp4']:
+            self.assertTrue(os.path.exists(os.path.join(self.media_root, path)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'uploads/hls/old')))
+        self.assertTrue(os.path.isdir(os.path.join(self.media_root, 'uploads/hls')))
+
+    def test_scheduled_task(self):
+        with override_settings(MEDIA_GC_DELETE=False):
+            result = collect_orphaned_media()
+        self.assertEqual(result['freed'], 0)
+        self.assertEqual(result['directories']['uploads/hls']['files'], 2)
+
+        with override_settings(MEDIA_GC_DELETE=True):
+            result = collect_orphaned_media()
+        self.assertEqual(result['freed'], 600)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'uploads/videos/old.mp4')))
+
+        schedule = celery_app.conf.beat_schedule['collect-orphaned-media']
+        self.assertEqual(schedule['task'], collect_orphaned_media.name)
+
+    def test_deleted_movie_with_cached_renditions(self):
+        ready = Movie.objects.get(title='Ready')
+        TranscodeCacheEntry.objects.create(cache_key='a' * 64, source_hash='b' * 64, rendition='360p', file='uploads/videos/ready_360p.mp4')
+        self.assertNotIn('uploads/videos/ready_360p.mp4', [path for path, _ in find_orphaned_media()['uploads/videos']['files']])
+
+        ready.delete()
+        orphans = [path for path, _ in find_orphaned_media()['uploads/videos']['files']]
+        self.assertIn('uploads/videos/ready.mp4', orphans)
+        self.assertIn('uploads/videos/ready_360p.mp4', orphans)
+
+        call_command('cleanup_media', delete=True, stdout=io.StringIO())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'uploads/videos/ready_360p.mp4')))
+        self.assertFalse(TranscodeCacheEntry.objects.exists())
+
+    def test_abandoned_upload_part_file(self):
+        movie = Movie.objects.get(title='Ready')
+        active = Upload.objects.create(movie=movie, filename='active.mp4', length=100, created_at=timezone.now() - timedelta(days=2))
+        abandoned = Upload.objects.create(movie=movie, filename='abandoned.mp4', length=100, created_at=timezone.now() - timedelta(days=4))
+        completed = Upload.objects.create(movie=movie, filename='done.mp4', length=100, offset=100, completed_at=timezone.now())
+        two_days_ago = time.time() - 2 * 24 * 3600
+        for upload in (active, abandoned, completed):
+            os.makedirs(os.path.dirname(upload.part_path), exist_ok=True)
+            with open(upload.part_path, 'wb') as part:
+                part.write(b'x' * 100)
+            os.utime(upload.part_path, (two_days_ago, two_days_ago))
+
+        report = find_orphaned_media()['uploads/partial']
+        self.assertEqual(sorted(path for path, _ in report['files']), sorted(f'uploads/partial/{upload.id}.part' for upload in (abandoned, completed)))
+        self.assertEqual(report['used'], 300)
+
+        call_command('cleanup_media', delete=True, stdout=io.StringIO())
+        self.assertTrue(os.path.exists(active.part_path))
+        self.assertFalse(os.path.exists(abandoned.part_path) or os.path.exists(completed.part_path))
+
+REMOTE_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage', 'OPTIONS': {'base_url': 'https://bucket.test/'}},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+class RemoteStorageTest(TestCase):
+    """
+    Test suite for the pipeline and the media delivery with a remote media storage.
+
+    Django's InMemoryStorage stands in for an S3 bucket: like S3 it has no local `path`,
+    so MEDIA_ROOT (a temporary directory) is only the scratch directory of the worker.
+
+    Test methods:
+    - test_fetch_publish_release(): Asserts the download of an input, the upload of an output
+    and the removal of both scratch copies.
+    - test_concurrent_tasks_share_scratch_copy(): Asserts that two tasks fetching and releasing the same
+    source at the same time both read the complete file and that only the last release deletes it.
+    - test_failed_download_leaves_no_partial_file(): Asserts that a failing download removes its temporary file.
+    - test_task_uploads_outputs(): Asserts that the seek preview task downloads the video, uploads
+    sprites and index and leaves no scratch files.
+    - test_upload_is_stored_remotely(): Asserts that a completed resumable upload is saved to the storage.
+    - test_playlist_references_are_signed(): Asserts that playlists and indexes are rewritten to storage URLs.
+    - test_media_redirects_to_storage(): Asserts the redirect for segments and the private cache lifetime.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, STORAGES=REMOTE_STORAGES, MEDIA_URL_EXPIRE=600, MEDIA_CACHE_MAX_AGE=86400,
+            VIDEO_UPLOAD_TEMP_DIR=os.path.join(self.media_root, 'uploads', 'partial'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_fetch_publish_release(self):
+        default_storage.save('uploads/videos/movie.mp4', ContentFile(b'source'))
+        source = fetch(local_path('uploads/videos/movie.mp4'))
+        with open(source, 'rb') as file:
+            self.assertEqual(file.read(), b'source')
+
+        output = local_path('uploads/videos/movie_360p.mp4')
+        with open(output, 'wb') as file:
+            file.write(b'360p')
+        self.assertEqual(publish(output), 'uploads/videos/movie_360p.mp4')
+        with default_storage.open('uploads/videos/movie_360p.mp4') as file:
+            self.assertEqual(file.read(), b'360p')
+
+        release(source, output)
+        self.assertFalse(os.path.exists(source) or os.path.exists(output))
+        self.assertTrue(default_storage.exists('uploads/videos/movie.mp4'))
+
+    def test_concurrent_tasks_share_scratch_copy(self):
+        content = os.urandom(3 * 1024 * 1024)
+        default_storage.save('uploads/videos/shared.mp4', ContentFile(content))
+        path = local_path('uploads/videos/shared.mp4')
+        fetched, done, finished = threading.Barrier(2), threading.Barrier(2), []
+
+        def task(leave_last):
+            source = fetch(path)
+            fetched.wait()
+            with open(source, 'rb') as file:
+                self.assertEqual(file.read(), content)
+            if leave_last:
+                done.wait()
+            release(source)
+            if not leave_last:
+                self.assertTrue(os.path.exists(path))
+                done.wait()
+            finished.append(leave_last)
+
+        threads = [threading.Thread(target=task, args=(leave_last,)) for leave_last in (False, True)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(finished), [False, True])
+        self.assertEqual([files for _, _, files in os.walk(self.media_root) if files], [])
+
+    def test_failed_download_leaves_no_partial_file(self):
+        default_storage.save('uploads/videos/broken.mp4', ContentFile(b'source'))
+        path = local_path('uploads/videos/broken.mp4')
+
+        with patch('movie.storage.shutil.copyfileobj', side_effect=OSError('connection reset')):
+            with self.assertRaises(OSError):
+                fetch(path)
+
+        self.assertEqual(os.listdir(os.path.dirname(path)), [])
+        self.assertEqual(fetch(path), path)
+        release(path)
+
+    def test_task_uploads_outputs(self):
+        default_storage.save('uploads/videos/remote.mp4', ContentFile(b'source'))
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        movie = Movie.objects.create(title='Remote', description='desc', duration=25.0, video_file='uploads/videos/remote.mp4')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+
+        def fake_ffmpeg(command, **kwargs):
+            self.assertTrue(os.path.exists(command[command.index('-i') + 1]))
+            with open(command[-1].replace('%03d', '001'), 'wb') as file:
+                file.write(b'sprite')
+            return subprocess.CompletedProcess(command, 0)
+
+        with patch('movie.signals.subprocess.run', side_effect=fake_ffmpeg):
+            generate_trickplay(local_path('uploads/videos/remote.mp4'), movie.pk)
+
+        self.assertEqual(Movie.objects.get(pk=movie.pk).trickplay_vtt.name, 'uploads/trickplay/remote/trickplay.vtt')
+        self.assertTrue(default_storage.exists('uploads/trickplay/remote/sprite_001.jpg'))
+        self.assertTrue(default_storage.exists('uploads/trickplay/remote/trickplay.vtt'))
+        self.assertEqual([files for _, _, files in os.walk(self.media_root) if files], [])
+
+    @patch('movie.signals.ingest_movie.apply_async')
+    def test_upload_is_stored_remotely(self, mock_ingest):
+        movie = Movie.objects.create(title='Upload', description='desc')
+        upload = Upload.objects.create(movie=movie, filename='big.mp4', length=4, offset=4)
+        os.makedirs(os.path.dirname(upload.part_path))
+        with open(upload.part_path, 'wb') as part:
+            part.write(b'data')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            finalize_upload(upload)
+
+        movie.refresh_from_db()
+        self.assertTrue(movie.video_file.name.startswith('uploads/videos/big'))
+        with default_storage.open(movie.video_file.name) as file:
+            self.assertEqual(file.read(), b'data')
+        self.assertFalse(os.path.exists(upload.part_path))
+
+    def test_playlist_references_are_signed(self):
+        default_storage.save('uploads/hls/movie/master.m3u8', ContentFile(b'#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\n360p/index.m3u8\n'))
+        default_storage.save('uploads/hls/movie/360p/index.m3u8', ContentFile(b'#EXTM3U\n#EXTINF:4.0,\nseg_00000.ts\n#EXT-X-ENDLIST\n'))
+        default_storage.save('uploads/trickplay/movie/trickplay.vtt', ContentFile(b'WEBVTT\n\n00:00:00.000 --> 00:00:10.000\nsprite_001.jpg#xywh=0,0,160,90\n'))
+
+        master = self.client.get('/media/uploads/hls/movie/master.m3u8')
+        self.assertEqual(master.status_code, 200)
+        self.assertIn('\n360p/index.m3u8\n', master.content.decode())
+
+        playlist = self.client.get('/media/uploads/hls/movie/360p/index.m3u8').content.decode().splitlines()
+        self.assertEqual(playlist[2], 'https://bucket.test/uploads/hls/movie/360p/seg_00000.ts')
+        self.assertEqual(playlist[3], '#EXT-X-ENDLIST')
+
+        vtt = self.client.get('/media/uploads/trickplay/movie/trickplay.vtt')
+        self.assertEqual(vtt['Content-Type'], 'text/vtt')
+        self.assertIn('https://bucket.test/uploads/trickplay/movie/sprite_001.jpg#xywh=0,0,160,90', vtt.content.decode())
+
+    def test_media_redirects_to_storage(self):
+        response = self.client.get('/media/uploads/hls/movie/360p/seg_00000.ts')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://bucket.test/uploads/hls/movie/360p/seg_00000.ts')
+        self.assertEqual(response['Cache-Control'], 'private, max-age=300')
+        self.assertEqual(self.client.get('/media/uploads/hls/../../secret.ts').status_code, 404)
+        self.assertEqual(self.client.get('/media/uploads/hls/missing/master.m3u8').status_code, 404)
+
+class AtomicOutputTest(TestCase):
+    """
+    Test suite for the atomic, validated writes of FFmpeg outputs.
+
+    Key features:
+    - Uses a temporary MEDIA_ROOT and patches the output probe (`movie.outputs.probe_file`).
+
+    Test methods:
+    - test_validate_output(): Asserts the duration tolerance, the required audio stream and a missing file.
+    - test_invalid_output_is_removed(): Asserts that an invalid temporary file is deleted and never renamed
+    into place, while a valid one replaces the final path.
+    - test_failed_rendition_is_retried_alone(): Rejects the 720p output of the first attempt and asserts that the
+    task is retried, only 720p is converted again and every resolution ends up stored.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.video_dir = os.path.join(self.media_root, 'uploads', 'videos')
+        os.makedirs(self.video_dir)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def write(self, name, content=b'data'):
+        path = os.path.join(self.video_dir, name)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def test_validate_output(self):
+        path = self.write('movie_360p.partial.mp4')
+        with patch('movie.outputs.probe_file', return_value=VALID_OUTPUT_PROBE):
+            self.assertEqual(validate_output(path, duration=12.5, audio=True)['duration'], 12.0)
+            with self.assertRaises(InvalidOutputError):
+                validate_output(path, duration=60.0)
+        silent = {'streams': VALID_OUTPUT_PROBE['streams'][:1], 'format': {'duration': '12.0'}}
+        with patch('movie.outputs.probe_file', return_value=silent):
+            with self.assertRaises(InvalidOutputError):
+                validate_output(path, audio=True)
+        with self.assertRaises(InvalidOutputError):
+            validate_output(os.path.join(self.video_dir, 'missing.partial.mp4'))
+
+    def test_invalid_output_is_removed(self):
+        output = os.path.join(self.video_dir, 'movie_360p.mp4')
+        partial = self.write('movie_360p.partial.mp4', b'truncated')
+        with patch('movie.outputs.probe_file', side_effect=subprocess.CalledProcessError(1, 'ffprobe')):
+            with self.assertRaises(InvalidOutputError):
+                commit_output(output)
+        self.assertFalse(os.path.exists(partial))
+        self.assertFalse(os.path.exists(output))
+
+        self.write('movie_360p.partial.mp4', b'complete')
+        with patch('movie.outputs.probe_file', return_value=VALID_OUTPUT_PROBE):
+            commit_output(output)
+        self.assertFalse(os.path.exists(partial))
+        with open(output, 'rb') as file:
+            self.assertEqual(file.read(), b'complete')
+
+    def test_failed_rendition_is_retried_alone(self):
+        source = self.write('movie.mp4', b'source')
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        movie = Movie.objects.create(title='Atomic', description='Atomic test', genre='ACTION')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        convertables = MovieConvertables.objects.create(movie=movie)
+        commands = []
+        rejected = []
+
+        def fake_ffmpeg(command, duration=0.0, job_ids=(), short=False):
+            commands.append(command)
+            for argument in command:
+                if argument.endswith('.partial.mp4'):
+                    with open(argument, 'wb') as file:
+                        file.write(b'encoded')
+            return 0
+
+        def fake_probe(path):
+            if path.endswith('_720p.partial.mp4') and not rejected:
+                rejected.append(path)
+                raise subprocess.CalledProcessError(1, 'ffprobe')
+            return VALID_OUTPUT_PROBE
+
+        with patch('movie.signals.run_ffmpeg', side_effect=fake_ffmpeg), patch('movie.outputs.probe_file', side_effect=fake_probe):
+            convert_all_renditions.apply(args=(source, convertables.id))
+
+        self.assertEqual(len(commands), 2)
+        self.assertIn(os.path.join(self.video_dir, 'movie_720p.partial.mp4'), commands[1])
+        self.assertNotIn(os.path.join(self.video_dir, 'movie_360p.partial.mp4'), commands[1])
+        convertables.refresh_from_db()
+        for rendition in RENDITIONS:
+            self.assertEqual(getattr(convertables, rendition['field']).name, f"uploads/videos/movie_{rendition['name']}.mp4")
+        self.assertEqual(TranscodeJob.objects.filter(rendition='720p', status=TranscodeJob.FAILED).count(), 1)
+        self.assertEqual(glob.glob(os.path.join(self.video_dir, '*.partial.mp4')), [])
+
+class MovieCatalogPaginationTest(APITestCase):
+    """
+    Test suite for the cursor pagination and filters of the movie list endpoint.
+
+    Key features:
+    - Creates seven movies, several of them with the same creation time and ranking, so the
+      pages must be keyed on the id as well.
+
+    Test methods:
+    - test_pages_cover_catalog_once(): Follows the `next` links and asserts every movie appears exactly once,
+    newest first, and that a `previous` link returns the page before.
+    - test_ordering_by_ranking(): Asserts the ranking ordering with ties across pages.
+    - test_filters(): Asserts the genre and rating filters (single and comma separated values).
+    - test_invalid_parameters(): Asserts 400 for unknown filters and orderings and 404 for a broken cursor.
+    """
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='pager', email='pager@test.com', password='secure123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        self.url = reverse('movies')
+        base = timezone.now()
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movies = [
+            Movie.objects.create(
+                title=f'Movie {index}', description='Paging', genre='DRAMA' if index % 2 else 'ACTION', image_file=f'uploads/thumbnails/{index}.jpg',
+                rating=16 if index < 3 else 6, ranking=1.0 if index % 3 else 4.5,
+                created_at=base - timedelta(minutes=index // 3),
+            )
+            for index in range(7)
+        ]
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+
+    def collect(self, params):
+        titles = []
+        response = self.client.get(self.url, params)
+        pages = [response]
+        while True:
+            self.assertEqual(response.status_code, 200)
+            titles += [movie['title'] for movie in response.data['results']]
+            if response.data['next'] is None:
+                return titles, pages
+            response = self.client.get(response.data['next'])
+            pages.append(response)
+
+    def test_pages_cover_catalog_once(self):
+        titles, pages = self.collect({'page_size': 3})
+
+        expected = sorted(self.movies, key=lambda movie: (movie.created_at, movie.id), reverse=True)
+        self.assertEqual(titles, [movie.title for movie in expected])
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0].data['previous'])
+        previous = self.client.get(pages[1].data['previous'])
+        self.assertEqual(previous.data['results'], pages[0].data['results'])
+        self.assertIsNone(previous.data['previous'])
+
+    def test_ordering_by_ranking(self):
+        titles, pages = self.collect({'page_size': 2, 'ordering': '-ranking'})
+
+        expected = sorted(self.movies, key=lambda movie: (movie.ranking, movie.created_at, movie.id), reverse=True)
+        self.assertEqual(titles, [movie.title for movie in expected])
+
+    def test_filters(self):
+        titles, pages = self.collect({'genre': 'DRAMA'})
+        self.assertEqual(sorted(titles), ['Movie 1', 'Movie 3', 'Movie 5'])
+
+        titles, pages = self.collect({'genre': 'ACTION,DRAMA', 'rating': '16'})
+        self.assertEqual(sorted(titles), ['Movie 0', 'Movie 1', 'Movie 2'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'genre': 'WESTERN'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'rating': '21'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'ordering': 'title'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'page_size': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'broken'}).status_code, 404)
+
+class CatalogCacheTest(APITestCase):
+    """
+    Test suite for the versioned cache of the catalog responses.
+
+    Test methods:
+    - test_second_request_is_served_from_cache(): Asserts that a repeated request only runs the token query.
+    - test_save_outdates_cache(): Asserts that saving or deleting a movie shows up in the next response.
+    - test_pipeline_update_outdates_cache(): Asserts that `update_movie` (a queryset update without model
+    signals) shows up in the next response.
+    - test_convertables_are_cached(): Asserts the caching and invalidation of the convertables list.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='cached', email='cached@test.com', password='secure123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        self.url = reverse('movies')
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movie = Movie.objects.create(title='Cached', description='Cache test', genre='ACTION', image_file='uploads/thumbnails/cached.jpg')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+
+    def titles(self):
+        return [movie['title'] for movie in self.client.get(self.url).data['results']]
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(first.data, second.data)
+
+    def test_save_outdates_cache(self):
+        self.assertEqual(self.titles(), ['Cached'])
+        self.movie.title = 'Renamed'
+        self.movie.save(update_fields=['title'])
+        self.assertEqual(self.titles(), ['Renamed'])
+        self.movie.delete()
+        self.assertEqual(self.titles(), [])
+
+    def test_pipeline_update_outdates_cache(self):
+        self.assertEqual(self.client.get(self.url).data['results'][0]['status'], Movie.NO_VIDEO)
+        update_movie(self.movie.pk, status=Movie.READY)
+        self.assertEqual(self.client.get(self.url).data['results'][0]['status'], Movie.READY)
+
+    def test_convertables_are_cached(self):
+        url = reverse('movies-convert')
+        self.assertEqual(self.client.get(url).data, [])
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        MovieConvertables.objects.create(movie=self.movie)
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+class ConditionalCatalogTest(APITestCase):
+    """
+    Test suite for the conditional GET (ETag / Last-Modified) of the catalog responses.
+
+    Test methods:
+    - test_validators_are_sent(): Asserts the ETag, Last-Modified and Cache-Control headers.
+    - test_matching_etag_returns_not_modified(): Asserts 304 without a body and without catalog queries,
+    for the movie and the convertables list.
+    - test_change_returns_new_etag(): Asserts that a saved movie changes the ETag, so the old one gets a full response.
+    - test_authentication_comes_first(): Asserts 401 for an unauthenticated request with a valid ETag.
+    - test_remote_storage_validators_follow_signing_epoch(): Asserts that with a remote media storage the ETag
+    changes with the signing epoch, so a copy with expired signed URLs gets a full response.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='etag', email='etag@test.com', password='secure123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        self.url = reverse('movies')
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movie = Movie.objects.create(title='Tagged', description='ETag test', genre='ACTION', image_file='uploads/thumbnails/tagged.jpg')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+
+    def test_validators_are_sent(self):
+        response = self.client.get(self.url)
+
+        self.assertRegex(response['ETag'], r'^"catalog-\d+"$')
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_matching_etag_returns_not_modified(self):
+        for url in (self.url, reverse('movies-convert')):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+
+    def test_change_returns_new_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.movie.title = 'Retagged'
+        self.movie.save(update_fields=['title'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['title'], 'Retagged')
+
+    def test_authentication_comes_first(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 401)
+
+    @override_settings(MEDIA_URL_EXPIRE=3600)
+    def test_remote_storage_validators_follow_signing_epoch(self):
+        start = 1000 * 1800
+        with patch('movie.catalog_cache.is_remote_storage', return_value=True), patch('movie.catalog_cache.time.time', return_value=start):
+            response = self.client.get(self.url)
+            etag = response['ETag']
+            self.assertEqual(etag, f'"catalog-{catalog_version()}-1000"')
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        with patch('movie.catalog_cache.is_remote_storage', return_value=True), patch('movie.catalog_cache.time.time', return_value=start + 1800):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['ETag'], f'"catalog-{catalog_version()}-1001"')
+
+class HomeViewTest(APITestCase):
+    """
+    Test suite for the home screen endpoint.
+
+    Test methods:
+    - test_movies_embed_convertables_and_own_progress(): Asserts the nested resolutions, media info and the
+    progress of the requesting user (not of other users, None for unwatched movies).
+    - test_query_count_is_constant(): Asserts the same number of queries for two and for six movies.
+    """
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='home', email='home@test.com', password='secure123')
+        self.other = CustomUser.objects.create_user(username='other', email='other@test.com', password='secure123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        self.url = reverse('home')
+
+    def create_movies(self, count):
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        movies = []
+        for index in range(count):
+            movie = Movie.objects.create(title=f'Home {index}', description='Home test', genre='ACTION', image_file=f'uploads/thumbnails/home{index}.jpg')
+            MovieConvertables.objects.create(movie=movie, video_360p=f'uploads/videos/home{index}_360p.mp4')
+            MediaInfo.objects.create(movie=movie, rendition='360p', width=640, height=360)
+            MovieProgress.objects.create(movie=movie, user=self.other, time=99)
+            movies.append(movie)
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+        return movies
+
+    def test_movies_embed_convertables_and_own_progress(self):
+        watched, unwatched = self.create_movies(2)
+        MovieProgress.objects.create(movie=watched, user=self.user, time=42)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        movies = {movie['title']: movie for movie in response.data['results']}
+        self.assertEqual(movies['Home 0']['progress']['time'], '42.00')
+        self.assertIsNone(movies['Home 1']['progress'])
+        convertables = movies['Home 0']['movie_convertables'][0]
+        self.assertEqual(convertables['available_renditions'], ['360p'])
+        self.assertEqual(convertables['media_info'][0]['height'], 360)
+
+    def test_query_count_is_constant(self):
+        self.create_movies(2)
+        with CaptureQueriesContext(connection) as two_movies:
+            self.client.get(self.url)
+        self.create_movies(4)
+        with CaptureQueriesContext(connection) as six_movies:
+            response = self.client.get(self.url)
+
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(len(two_movies), len(six_movies))
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+@override_settings(CATALOG_SNAPSHOT_URL='http://testserver')
+class CatalogSnapshotTest(APITestCase):
+    """
+    Test suite for the materialized catalog snapshot.
+
+    Test methods:
+    - test_preferred_encoding(): Asserts the choice of the content encoding from Accept-Encoding.
+    - test_snapshot_is_served_without_queries(): Renders the snapshot and asserts that the plain catalog
+    request gets its gzip bytes (only the token query runs) with the same JSON as the regular response.
+    - test_outdated_snapshot_is_not_served(): Asserts the fallback after a change and for requests with parameters.
+    - test_changes_queue_one_render(): Asserts that several changes in a row queue the rendering once.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='snap', email='snap@test.com', password='secure123')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.user).key)
+        self.url = reverse('movies')
+        post_save.disconnect(receiver=movie_post_save, sender=Movie)
+        self.movie = Movie.objects.create(title='Snapshot', description='Snapshot test', genre='ACTION', image_file='uploads/thumbnails/snap.jpg')
+        post_save.connect(receiver=movie_post_save, sender=Movie)
+
+    def test_preferred_encoding(self):
+        self.assertEqual(preferred_encoding('gzip, deflate, br', ['br', 'gzip']), 'br')
+        self.assertEqual(preferred_encoding('gzip, deflate, br', ['gzip']), 'gzip')
+        self.assertEqual(preferred_encoding('br;q=0.5, gzip', ['br', 'gzip']), 'gzip')
+        self.assertEqual(preferred_encoding('gzip;q=0', ['gzip']), None)
+        self.assertEqual(preferred_encoding('', ['br', 'gzip']), None)
+
+    def test_snapshot_is_served_without_queries(self):
+        expected = self.client.get(self.url, HTTP_ACCEPT='application/json').json()
+        render_catalog_snapshot()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)), expected)
+
+        response = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(json.loads(response.content), expected)
+
+    def test_outdated_snapshot_is_not_served(self):
+        render_catalog_snapshot()
+        self.assertEqual(self.client.get(self.url, {'genre': 'ACTION'}, HTTP_ACCEPT_ENCODING='gzip').get('Content-Encoding'), None)
+
+        update_movie(self.movie.pk, title='Changed')
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response.data['results'][0]['title'], 'Changed')
+
+    @patch('movie.tasks.render_catalog_snapshot.apply_async')
+    def test_changes_queue_one_render(self, mock_render):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.movie.title = 'First'
+            self.movie.save(update_fields=['title'])
+            update_movie(self.movie.pk, status=Movie.READY)
+        mock_render.assert_called_once()
+
+        render_catalog_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            update_movie(self.movie.pk, status=Movie.FAILED)
+        self.assertEqual(mock_render.call_count, 2)
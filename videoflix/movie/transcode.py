@@ -0,0 +1,463 @@
+"""
+Helpers for building the FFmpeg commands used by the video conversion pipeline.
+
+The rendition ladder is defined once in `RENDITIONS` and shared by the single
+rendition tasks and the multi-output (single pass) transcode.
+"""
+import os
+from django.conf import settings
+from .governor import process_threads, rendition_threads, short_job_threads
+
+RENDITIONS = [
+    {'name': '120p', 'field': 'video_120p', 'width': 128, 'height': 96},
+    {'name': '360p', 'field': 'video_360p', 'width': 640, 'height': 360},
+    {'name': '720p', 'field': 'video_720p', 'width': 1280, 'height': 720},
+    {'name': '1080p', 'field': 'video_1080p', 'width': 1920, 'height': 1080},
+]
+
+HLS_SEGMENT_SECONDS = 4
+
+# Forces a keyframe at every segment boundary and disables scene cut keyframes,
+# so all renditions share the same GOP structure and can be cut into aligned HLS segments.
+KEYFRAME_ARGS = [
+    '-force_key_frames', f'expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})',
+    '-sc_threshold', '0',
+]
+
+AUDIO_CODEC_ARGS = ['-c:a', 'aac', '-strict', '-2']
+
+# Seek previews: one frame every TRICKPLAY_INTERVAL seconds, tiled into sprite sheets.
+TRICKPLAY_INTERVAL = 10
+TRICKPLAY_WIDTH = 160
+TRICKPLAY_HEIGHT = 90
+TRICKPLAY_COLUMNS = 10
+TRICKPLAY_ROWS = 10
+
+# Thumbnails: widths of the responsive variants and the encoder arguments per image format.
+THUMBNAIL_WIDTHS = [160, 320, 640, 1280]
+THUMBNAIL_FORMATS = {
+    'webp': ['-c:v', 'libwebp', '-quality', '80'],
+    'avif': ['-c:v', 'libaom-av1', '-still-picture', '1', '-crf', '32', '-cpu-used', '6'],
+}
+
+def parse_frame_rate(value):
+    """
+    Converts an FFprobe frame rate like '30000/1001' or '25' into a float (0.0 if unknown).
+    """
+    try:
+        numerator, _, denominator = str(value).partition('/')
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+def parse_probe(probe):
+    """
+    Extracts the media properties from FFprobe JSON output (`-show_streams -show_format`).
+
+    Returns:
+        dict: duration (float, seconds), width and height (int, pixels), bitrate (int, bits per second),
+        fps (float), has_audio (bool), container (format name, e.g. 'mov,mp4,m4a,3gp,3g2,mj2'),
+        video_codec and audio_codec (codec names, '' without audio), audio_channels (int),
+        audio_layout (e.g. 'stereo') and size (int, bytes).
+
+    Raises:
+        ValueError: If the probe output contains no video stream.
+    """
+    streams = probe.get('streams', [])
+    video = next((stream for stream in streams if stream.get('codec_type') == 'video'), None)
+    if video is None:
+        raise ValueError('no video stream found')
+    audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), {})
+    container = probe.get('format', {})
+    return {
+        'duration': float(video.get('duration') or container.get('duration') or 0.0),
+        'width': int(video.get('width') or 0),
+        'height': int(video.get('height') or 0),
+        'bitrate': int(container.get('bit_rate') or video.get('bit_rate') or 0),
+        'fps': parse_frame_rate(video.get('avg_frame_rate') or video.get('r_frame_rate')),
+        'has_audio': bool(audio),
+        'container': container.get('format_name', ''),
+        'video_codec': video.get('codec_name', ''),
+        'audio_codec': audio.get('codec_name', ''),
+        'audio_channels': int(audio.get('channels') or 0),
+        'audio_layout': audio.get('channel_layout', ''),
+        'size': int(container.get('size') or 0),
+    }
+
+def build_ladder(source):
+    """
+    Returns the ladder entries worth encoding for a probed source.
+
+    The height of a resolution is the short side of its video (see `scale_filter`), so a
+    portrait 1080x1920 source gets a 1080x1920 '1080p' and a 1440x1080 source a 1440x1080
+    one. Resolutions whose short side exceeds the short side of the source are dropped,
+    so a video is never upscaled. The lowest resolution is always kept, even for sources
+    smaller than it, so every movie has at least one playable version.
+
+    Parameters:
+        source (dict): Source properties as returned by `parse_probe`.
+    """
+    short_side = min(source['width'], source['height'])
+    ladder = [rendition for rendition in RENDITIONS if rendition['height'] <= short_side]
+    return ladder or RENDITIONS[:1]
+
+def get_rendition(name):
+    """
+    Returns the ladder entry for the given rendition name (e.g. '720p').
+
+    Raises:
+        KeyError: If the rendition is not part of the ladder.
+    """
+    for rendition in RENDITIONS:
+        if rendition['name'] == name:
+            return rendition
+    raise KeyError(name)
+
+def rendition_path(file_path, name):
+    """
+    Builds the output path of a rendition by appending '_<name>.mp4'
+    to the source path without its extension.
+    """
+    return os.path.splitext(file_path)[0] + f'_{name}.mp4'
+
+def partial_path(path):
+    """
+    Returns the temporary name FFmpeg writes an output to, e.g. 'movie_720p.partial.mp4'.
+    The extension is kept, so FFmpeg still picks the muxer from the file name.
+    """
+    root, extension = os.path.splitext(path)
+    return f'{root}.partial{extension}'
+
+def video_encoder_settings(rendition):
+    """
+    Returns the video encoder settings (codec, preset, crf) of a rendition:
+    `settings.VIDEO_ENCODER`, updated with the entry of the rendition in
+    `settings.VIDEO_RENDITION_ENCODERS` (e.g. {'1080p': {'preset': 'slow'}}).
+    """
+    encoder = dict(settings.VIDEO_ENCODER)
+    encoder.update(settings.VIDEO_RENDITION_ENCODERS.get(rendition['name'], {}))
+    return encoder
+
+def video_codec_args(encoder):
+    """
+    Converts video encoder settings into FFmpeg options, e.g. ['-c:v', 'libx264', '-preset', 'medium', '-crf', '23'].
+    """
+    return ['-c:v', encoder['codec'], '-preset', encoder['preset'], '-crf', str(encoder['crf'])]
+
+def rendition_video_args(rendition, threads, encoder=None):
+    """
+    Returns the video output options of a rendition: codec, preset and CRF (`video_encoder_settings`
+    unless `encoder` is given), the aligned keyframes (KEYFRAME_ARGS) and the encoder thread count.
+    Shared by the transcode and the encoder benchmark, so both encode the same way.
+    """
+    return [*video_codec_args(encoder or video_encoder_settings(rendition)), *KEYFRAME_ARGS, '-threads', str(threads)]
+
+def scale_filter(rendition):
+    """
+    Returns the scale filter of a rendition. Its height becomes the short side of the video and
+    the long side follows the aspect ratio of the source, rounded to an even size (`-2`), e.g.
+    360p: 1920x1080 -> 640x360, 1080x1920 -> 360x640, 1440x1080 -> 480x360. Portrait and
+    non 16:9 sources are therefore never distorted to the nominal size of the rendition.
+    """
+    short_side = rendition['height']
+    return f"scale='if(gte(iw,ih),-2,{short_side})':'if(gte(iw,ih),{short_side},-2)'"
+
+def encode_parameters(rendition):
+    """
+    Returns everything that determines the encoded output of a rendition: its size
+    and the video, keyframe and audio options. Used as part of the transcode cache key.
+    """
+    return {
+        'width': rendition['width'],
+        'height': rendition['height'],
+        'scale': scale_filter(rendition),
+        'video': video_codec_args(video_encoder_settings(rendition)) + KEYFRAME_ARGS,
+        'audio': AUDIO_CODEC_ARGS,
+    }
+
+def build_multi_output_command(file_path, renditions, audio=True, audio_file=None):
+    """
+    Builds an FFmpeg command that decodes the source once and writes every
+    given rendition in the same pass.
+
+    The decoded video is fanned out with a `split` filter, each branch is scaled
+    to the size of its rendition (see `scale_filter`) and mapped to its own MP4 output together with
+    the (optional) audio. The outputs are written to their temporary names (`partial_path`)
+    and only renamed into place once validated (see `movie.outputs`). Decoder and encoders get explicit thread counts from the
+    budget of the host (see `movie.governor`).
+
+    Parameters:
+        file_path (str): Absolute path to the source video.
+        renditions (list): Ladder entries to encode.
+        audio (bool): Whether the outputs get audio. Chunks of the chunked transcode
+            are encoded without audio, the audio is added when the chunks are joined.
+        audio_file (str, optional): Shared audio track of the source (see `build_audio_command`).
+            It is copied into every output without re-encoding. Without it the audio stream
+            of the source is encoded for every output.
+
+    Returns:
+        list: The command as argument list, suitable for subprocess without a shell.
+    """
+    count = len(renditions)
+    split_labels = ''.join(f'[v{index}]' for index in range(count))
+    filters = [f'[0:v]split={count}{split_labels}']
+    for index, rendition in enumerate(renditions):
+        filters.append(f"[v{index}]{scale_filter(rendition)}[out{index}]")
+
+    threads = rendition_threads(renditions)
+    command = ['ffmpeg', '-y', '-threads', str(process_threads()), '-i', file_path]
+    if audio and audio_file:
+        command += ['-i', audio_file]
+        audio_args = ['-map', '1:a:0', '-c:a', 'copy']
+    elif audio:
+        audio_args = ['-map', '0:a?', *AUDIO_CODEC_ARGS]
+    else:
+        audio_args = ['-an']
+    command += ['-filter_complex', ';'.join(filters)]
+    for index, rendition in enumerate(renditions):
+        command += ['-map', f'[out{index}]', *rendition_video_args(rendition, threads[rendition['name']])]
+        command += audio_args
+        command.append(partial_path(rendition_path(file_path, rendition['name'])))
+    return command
+
+def audio_path(file_path):
+    """
+    Returns the path of the shared audio track of a source: '<source name>_audio.m4a'.
+    """
+    return os.path.splitext(file_path)[0] + '_audio.m4a'
+
+def build_audio_command(file_path, output_path):
+    """
+    Builds an FFmpeg command that encodes the first audio stream of the source once to AAC
+    (without video). The result is copied into every rendition, so the audio is identical
+    in all resolutions and is not encoded again per resolution.
+    """
+    return [
+        'ffmpeg', '-y',
+        '-threads', str(short_job_threads()),
+        '-i', file_path,
+        '-vn', '-map', '0:a:0',
+        *AUDIO_CODEC_ARGS,
+        output_path,
+    ]
+
+def build_split_command(file_path, output_pattern, segment_seconds):
+    """
+    Builds an FFmpeg command that cuts the video stream of a source into chunks of
+    about `segment_seconds` without re-encoding. With stream copy the segment muxer can
+    only cut at keyframes, so every chunk starts with a keyframe and can be encoded on its own.
+
+    Parameters:
+        file_path (str): Absolute path to the source video.
+        output_pattern (str): Output path with a counter, e.g. '/tmp/chunks/movie_%05d.mkv'.
+        segment_seconds (int): Target length of a chunk in seconds.
+    """
+    return [
+        'ffmpeg', '-y',
+        '-threads', str(short_job_threads()),
+        '-i', file_path,
+        '-map', '0:v:0',
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_time', str(segment_seconds),
+        '-reset_timestamps', '1',
+        output_pattern,
+    ]
+
+def build_concat_command(list_path, source_path, output_path, audio_file=None):
+    """
+    Builds an FFmpeg command that joins encoded chunks losslessly (`-c:v copy`, concat demuxer)
+    and adds the audio in one piece, so there are no gaps at the chunk boundaries.
+
+    Parameters:
+        list_path (str): Concat list file with one `file '<path>'` line per chunk, in order.
+        source_path (str): Absolute path to the original video (audio source).
+        output_path (str): Path of the joined rendition.
+        audio_file (str, optional): Shared audio track of the source, copied without re-encoding.
+            Without it the audio of the source is encoded.
+    """
+    if audio_file:
+        audio_input, audio_args = audio_file, ['-map', '1:a:0', '-c:a', 'copy']
+    else:
+        audio_input, audio_args = source_path, ['-map', '1:a?', *AUDIO_CODEC_ARGS]
+    return [
+        'ffmpeg', '-y',
+        '-threads', str(short_job_threads()),
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-i', audio_input,
+        '-map', '0:v', *audio_args,
+        '-c:v', 'copy',
+        '-shortest',
+        output_path,
+    ]
+
+def chunk_directory(file_path):
+    """
+    Returns the working directory of the chunked transcode of a source video:
+    MEDIA_ROOT/uploads/chunks/<source name>/. It lives on the shared media volume,
+    so the chunks can be encoded by workers on every node.
+    """
+    filename_base = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', 'chunks', filename_base)
+
+def thumbnail_directory(file_path):
+    """
+    Returns the directory of the thumbnail variants of a source video:
+    MEDIA_ROOT/uploads/thumbnails/<source name>/.
+    """
+    filename_base = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', 'thumbnails', filename_base)
+
+def thumbnail_widths(source_width=0):
+    """
+    Returns the thumbnail widths for a source: widths above the source width are dropped
+    (no upscaling), the smallest width is always kept. All widths if the source width is unknown.
+    """
+    if not source_width:
+        return list(THUMBNAIL_WIDTHS)
+    return [width for width in THUMBNAIL_WIDTHS if width <= source_width] or THUMBNAIL_WIDTHS[:1]
+
+def thumbnail_path(output_dir, width, image_format):
+    return os.path.join(output_dir, f'thumb_{width}.{image_format}')
+
+def build_thumbnail_command(file_path, output_dir, widths, formats, position=1.0):
+    """
+    Builds an FFmpeg command that decodes a single frame at `position` (seconds) and writes it
+    in every width and image format ('thumb_<width>.<format>' in `output_dir`).
+
+    The frame is fanned out with `split` filters, so it is decoded once for all variants.
+    The height follows the aspect ratio of the source.
+
+    Parameters:
+        file_path (str): Absolute path to the source video.
+        output_dir (str): Directory of the variants.
+        widths (list): Widths in pixels.
+        formats (list): Image formats, keys of THUMBNAIL_FORMATS (e.g. ['webp', 'avif']).
+        position (float): Position of the frame in seconds.
+    """
+    filters = [f"[0:v]split={len(widths)}{''.join(f'[s{index}]' for index in range(len(widths)))}"]
+    outputs = []
+    for index, width in enumerate(widths):
+        labels = [f'[t{index}{image_format}]' for image_format in formats]
+        filters.append(f"[s{index}]scale={width}:-2,split={len(formats)}{''.join(labels)}")
+        for label, image_format in zip(labels, formats):
+            outputs += ['-map', label, '-frames:v', '1', *THUMBNAIL_FORMATS[image_format],
+                        thumbnail_path(output_dir, width, image_format)]
+    return [
+        'ffmpeg', '-y',
+        '-threads', str(short_job_threads()),
+        '-ss', f'{position:.3f}',
+        '-i', file_path,
+        '-filter_complex', ';'.join(filters),
+        '-filter_complex_threads', str(short_job_threads()),
+        *outputs,
+    ]
+
+def trickplay_directory(file_path):
+    """
+    Returns the directory of the seek preview sprites of a source video:
+    MEDIA_ROOT/uploads/trickplay/<source name>/.
+    """
+    filename_base = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', 'trickplay', filename_base)
+
+def build_trickplay_command(file_path, output_dir, interval=TRICKPLAY_INTERVAL):
+    """
+    Builds an FFmpeg command that extracts one frame every `interval` seconds in a single
+    decode, scales it to TRICKPLAY_WIDTH x TRICKPLAY_HEIGHT (letterboxed) and tiles the
+    frames into JPEG sprite sheets of TRICKPLAY_COLUMNS x TRICKPLAY_ROWS
+    ('sprite_001.jpg', 'sprite_002.jpg', ...).
+    """
+    width, height = TRICKPLAY_WIDTH, TRICKPLAY_HEIGHT
+    filters = ','.join([
+        f'fps=1/{interval}',
+        f'scale={width}:{height}:force_original_aspect_ratio=decrease',
+        f'pad={width}:{height}:(ow-iw)/2:(oh-ih)/2',
+        f'tile={TRICKPLAY_COLUMNS}x{TRICKPLAY_ROWS}',
+    ])
+    return [
+        'ffmpeg', '-y',
+        '-threads', str(process_threads()),
+        '-i', file_path,
+        '-an',
+        '-vf', filters,
+        '-q:v', '5',
+        os.path.join(output_dir, 'sprite_%03d.jpg'),
+    ]
+
+def format_vtt_timestamp(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f'{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}'
+
+def build_trickplay_vtt(duration, interval=TRICKPLAY_INTERVAL):
+    """
+    Builds a WebVTT index that maps every `interval` of the video to its tile in the
+    sprite sheets written by `build_trickplay_command`, using media fragments
+    (e.g. 'sprite_001.jpg#xywh=160,0,160,90'). The sprite paths are relative to the VTT file.
+
+    Parameters:
+        duration (float): Duration of the video in seconds.
+        interval (int): Seconds between two preview frames.
+    """
+    tiles_per_sheet = TRICKPLAY_COLUMNS * TRICKPLAY_ROWS
+    lines = ['WEBVTT', '']
+    index = 0
+    while index * interval < duration:
+        start = index * interval
+        end = min(start + interval, duration)
+        sheet, position = divmod(index, tiles_per_sheet)
+        x = (position % TRICKPLAY_COLUMNS) * TRICKPLAY_WIDTH
+        y = (position // TRICKPLAY_COLUMNS) * TRICKPLAY_HEIGHT
+        lines.append(f'{format_vtt_timestamp(start)} --> {format_vtt_timestamp(end)}')
+        lines.append(f'sprite_{sheet + 1:03d}.jpg#xywh={x},{y},{TRICKPLAY_WIDTH},{TRICKPLAY_HEIGHT}')
+        lines.append('')
+        index += 1
+    return '\n'.join(lines)
+
+def hls_directory(file_path):
+    """
+    Returns the directory that holds the HLS packaging of a source video:
+    MEDIA_ROOT/uploads/hls/<source name>/.
+    """
+    filename_base = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', 'hls', filename_base)
+
+def build_hls_command(rendition_file, output_dir):
+    """
+    Builds an FFmpeg command that remuxes an encoded rendition into a VOD HLS
+    playlist with MPEG-TS segments, without re-encoding (`-c copy`).
+
+    The rendition is expected to be encoded with `KEYFRAME_ARGS`, so the segments of
+    all renditions start at the same timestamps.
+    """
+    return [
+        'ffmpeg', '-y',
+        '-threads', str(short_job_threads()),
+        '-i', rendition_file,
+        '-c', 'copy',
+        '-f', 'hls',
+        '-hls_time', str(HLS_SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(output_dir, 'seg_%05d.ts'),
+        os.path.join(output_dir, 'index.m3u8'),
+    ]
+
+def build_master_playlist(variants):
+    """
+    Builds the content of an HLS master playlist.
+
+    Parameters:
+        variants (list): Dicts with the keys 'uri' (playlist path relative to the master
+            playlist), 'bandwidth' (peak bits per second), 'width' and 'height'.
+
+    Returns:
+        str: The master playlist, variants ordered by ascending bandwidth.
+    """
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for variant in sorted(variants, key=lambda variant: variant['bandwidth']):
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={variant['bandwidth']},RESOLUTION={variant['width']}x{variant['height']}"
+        )
+        lines.append(variant['uri'])
+    return '\n'.join(lines) + '\n'
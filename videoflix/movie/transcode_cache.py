@@ -0,0 +1,91 @@
+"""
+Content addressed cache for converted resolutions.
+
+A cache entry is keyed by the SHA-256 of the source video content combined with the
+encode parameters of a resolution. Uploading the same video again (under any name)
+re-uses the existing output instead of running FFmpeg, while a different video with
+a file name that is already known is converted as usual.
+"""
+import hashlib
+import json
+import os
+import shutil
+from .models import TranscodeCacheEntry
+from .storage import fetch, local_path, media_exists, release, storage_name
+from .transcode import encode_parameters
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def hash_file(file_path, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Returns the SHA-256 hex digest of a file, read in chunks so that large
+    videos are never loaded into memory at once.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def rendition_cache_key(source_hash, rendition):
+    """
+    Returns the cache key of a resolution: the SHA-256 of the source hash and
+    the encode parameters (size, codecs and their options) of the resolution.
+    """
+    payload = json.dumps({'source': source_hash, 'encode': encode_parameters(rendition)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def link_or_copy(source, target):
+    """
+    Makes `target` refer to the content of `source`: as hard link if possible,
+    otherwise (e.g. across file systems) as a copy. An existing target is replaced.
+    """
+    if os.path.exists(target):
+        if os.path.samefile(source, target):
+            return
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def is_cached(source_hash, rendition):
+    """
+    Returns whether the transcode cache holds an existing output of the resolution for the source hash.
+    """
+    entry = TranscodeCacheEntry.objects.filter(cache_key=rendition_cache_key(source_hash, rendition)).first()
+    return entry is not None and media_exists(local_path(entry.file.name))
+
+def restore_from_cache(source_hash, rendition, target_path):
+    """
+    Places a cached output of the resolution at `target_path`.
+
+    Returns:
+        bool: True on a cache hit, False if the resolution has to be converted.
+        Entries whose file has been removed from the storage are dropped.
+    """
+    key = rendition_cache_key(source_hash, rendition)
+    entry = TranscodeCacheEntry.objects.filter(cache_key=key).first()
+    if entry is None:
+        return False
+    cached_path = local_path(entry.file.name)
+    if not media_exists(cached_path):
+        entry.delete()
+        return False
+    link_or_copy(fetch(cached_path), target_path)
+    if cached_path != target_path:
+        release(cached_path)
+    return True
+
+def store_in_cache(source_hash, rendition, file_path):
+    """
+    Registers a successfully converted output for the source hash and resolution.
+    """
+    TranscodeCacheEntry.objects.update_or_create(
+        cache_key=rendition_cache_key(source_hash, rendition),
+        defaults={
+            'source_hash': source_hash,
+            'rendition': rendition['name'],
+            'file': storage_name(file_path),
+        },
+    )
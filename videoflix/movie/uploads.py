@@ -0,0 +1,128 @@
+"""
+Resumable uploads of source videos in the style of the tus protocol.
+
+An upload is created with the total size of the video, then the bytes are sent
+in any number of PATCH requests, each starting at the current offset. The chunks
+are streamed from the request to the partial file without being buffered in
+memory and without holding a database lock: a request owns the partial file
+through an exclusive `flock` and moves the offset with a conditional UPDATE.
+When the last byte has arrived, the file is moved to the video upload
+directory and attached to the movie, which queues the ingest pipeline.
+"""
+import fcntl
+import os
+from django.core.files import File
+from django.db import transaction
+from django.utils.timezone import now
+from .models import Movie, Upload
+from .storage import is_remote_storage
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+class UploadConflict(Exception):
+    """
+    Raised when a chunk does not start at the current offset of the upload, the upload is
+    complete, or another request is still writing to it.
+    """
+
+def create_part_file(upload):
+    """
+    Creates the empty partial file of a new upload.
+    """
+    os.makedirs(os.path.dirname(upload.part_path), exist_ok=True)
+    open(upload.part_path, 'wb').close()
+
+def append_chunk(upload, stream, content_length):
+    """
+    Appends the body of a PATCH request to the partial file of an upload.
+
+    The body is copied in blocks of UPLOAD_CHUNK_SIZE starting at `upload.offset`; anything
+    behind the offset (e.g. bytes of an earlier interrupted request) is discarded. If the client
+    disconnects, the bytes received so far are kept and the upload continues from there.
+
+    No database lock or transaction is held while the body is streamed. The request owns the
+    partial file through an exclusive `flock` and stores the new offset with
+    `UPDATE ... WHERE offset = <offset of the request>`, so a concurrent request for the same
+    upload gets an UploadConflict instead of mixing its bytes in.
+
+    Parameters:
+        upload (Upload): The upload, as read by the caller.
+        stream: File-like request body.
+        content_length (int): Number of bytes announced by the request, at most the remaining size.
+
+    Returns:
+        int: The new offset, also set on `upload`.
+
+    Raises:
+        UploadConflict: If another request writes to the upload or the offset has moved on.
+    """
+    expected = upload.offset
+    pending = Upload.objects.filter(pk=upload.pk, offset=expected, completed_at__isnull=True)
+    written = 0
+    with open(upload.part_path, 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict(f'upload {upload.id} is being written by another request')
+        if not pending.exists():
+            raise UploadConflict(f'upload {upload.id} is no longer at offset {expected}')
+        part.seek(expected)
+        part.truncate()
+        try:
+            while written < content_length:
+                block = stream.read(min(UPLOAD_CHUNK_SIZE, content_length - written))
+                if not block:
+                    break
+                part.write(block)
+                written += len(block)
+        except OSError as error:
+            print(f'upload {upload.id} interrupted: {error}')
+        part.flush()
+        if not pending.update(offset=expected + written):
+            raise UploadConflict(f'upload {upload.id} is no longer at offset {expected}')
+    upload.offset = expected + written
+    return upload.offset
+
+def remove_part_file(path):
+    """
+    Removes the partial file of a finalized upload, if it is still there.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+def finalize_upload(upload):
+    """
+    Attaches the complete partial file to the movie as `Movie.video_file`.
+
+    The file is linked into the video upload directory of the movie (without copying); with a
+    remote media storage it is uploaded to the storage instead. The partial file itself is only
+    removed when the database update has committed, and the stored copy is deleted again if the
+    update fails, so a failed finalize can simply be repeated. An upload that is already complete
+    is left as it is. The save detects the new video file, so the ingest pipeline is queued when
+    the transaction commits.
+    """
+    field = Movie._meta.get_field('video_file')
+    with transaction.atomic():
+        completed_at = Upload.objects.select_for_update().values_list('completed_at', flat=True).get(pk=upload.pk)
+        if completed_at:
+            upload.completed_at = completed_at
+            return
+        movie = upload.movie
+        name = field.storage.get_available_name(field.generate_filename(movie, upload.filename))
+        if is_remote_storage():
+            with open(upload.part_path, 'rb') as part:
+                name = field.storage.save(name, File(part))
+        else:
+            target = field.storage.path(name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.link(upload.part_path, target)
+
+        try:
+            movie.video_file.name = name
+            movie.save(update_fields=['video_file'])
+            upload.completed_at = now()
+            upload.save(update_fields=['completed_at'])
+        except BaseException:
+            field.storage.delete(name)
+            raise
+        transaction.on_commit(lambda: remove_part_file(upload.part_path))
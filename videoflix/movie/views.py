@@ -1,3 +1,236 @@
-from django.shortcuts import render
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
 
-# Create your views here.
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+from .storage import MANIFEST_EXTENSIONS, is_remote_storage
+
+MEDIA_DELIVERY_PREFIXES = (
+    'uploads/videos/',
+    'uploads/thumbnails/',
+    'uploads/testfile/',
+    'uploads/hls/',
+    'uploads/trickplay/',
+)
+
+MEDIA_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+    '.mp4': 'video/mp4',
+    '.webp': 'image/webp',
+    '.avif': 'image/avif',
+    '.vtt': 'text/vtt',
+}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def parse_range_header(header, size):
+    """
+    Parses a single byte range of an HTTP `Range` header.
+
+    Supports the forms `bytes=start-end`, `bytes=start-` and the suffix form `bytes=-length`.
+    Multiple ranges are not supported and are treated like an invalid header.
+
+    Parameters:
+        header (str): Value of the Range header.
+        size (int): Size of the requested file in bytes.
+
+    Returns:
+        tuple | None: The inclusive (start, end) byte positions, or None if the header
+        is missing or malformed (the whole file should be sent).
+
+    Raises:
+        ValueError: If the range is syntactically valid but cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+    if start == '':
+        length = int(end)
+        if length == 0:
+            raise ValueError('empty suffix range')
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError('range not satisfiable')
+    return start, min(end, size - 1)
+
+def iter_file_range(file_path, start, length):
+    """
+    Yields `length` bytes of a file starting at `start` in chunks of STREAM_CHUNK_SIZE.
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def _etag(stat):
+    return '"{:x}-{:x}"'.format(stat.st_mtime_ns, stat.st_size)
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+def _range_allowed(request, etag, mtime):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+def signed_manifest(text, directory):
+    """
+    Replaces the relative file references of an HLS playlist or a seek preview index by signed
+    URLs of the remote storage. Media fragments (`#xywh=...`) are kept, references to other
+    playlists stay relative, so they are requested (and signed) through the media view again.
+
+    Parameters:
+        text (str): Content of the playlist or WebVTT index.
+        directory (str): Directory of the file, relative to the storage root.
+    """
+    lines = []
+    for line in text.splitlines():
+        reference = line.strip()
+        if reference and not reference.startswith(('#', 'WEBVTT')) and '-->' not in reference \
+                and not reference.endswith('.m3u8') and '://' not in reference:
+            reference, _, fragment = reference.partition('#')
+            line = default_storage.url(posixpath.normpath(posixpath.join(directory, reference)))
+            if fragment:
+                line += f'#{fragment}'
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+def serve_remote_media(request, path):
+    """
+    Delivers media of a remote storage (see `settings.MEDIA_STORAGE`) without passing the bytes through Django.
+
+    Behavior:
+    - HLS playlists and WebVTT indexes are read from the storage and returned with signed URLs
+      for their segments and sprites (`signed_manifest`).
+    - Every other file is answered with a redirect (302) to a signed URL of the storage that
+      expires after `settings.MEDIA_URL_EXPIRE` seconds, the client then loads (and seeks in)
+      the file directly from the storage.
+    - Both responses may only be cached privately and for less time than the signed URLs are valid.
+    """
+    if posixpath.normpath(path) != path:
+        raise Http404('File not found.')
+    cache_control = f'private, max-age={min(settings.MEDIA_CACHE_MAX_AGE, settings.MEDIA_URL_EXPIRE // 2)}'
+
+    if path.endswith(MANIFEST_EXTENSIONS):
+        if not default_storage.exists(path):
+            raise Http404('File not found.')
+        with default_storage.open(path, 'rb') as manifest:
+            text = manifest.read().decode()
+        content_type = MEDIA_CONTENT_TYPES[os.path.splitext(path)[1]]
+        return HttpResponse(signed_manifest(text, posixpath.dirname(path)), content_type=content_type, headers={'Cache-Control': cache_control})
+
+    response = HttpResponseRedirect(default_storage.url(path))
+    response['Cache-Control'] = cache_control
+    return response
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, path):
+    """
+    Delivers uploaded media (converted videos, HLS playlists and segments, thumbnails, seek
+    preview sprites and the connection test file) with support for seeking and proxy offloading.
+
+    Behavior:
+    - Only files below the prefixes in MEDIA_DELIVERY_PREFIXES are served, anything else is a 404.
+      The path is normalized before the check, so e.g. 'uploads/videos/../chunks/...' does not pass it.
+    - Sends `Accept-Ranges`, `Content-Length`, `Last-Modified`, `ETag` and `Cache-Control` headers
+      and answers conditional requests (If-None-Match / If-Modified-Since) with 304 Not Modified.
+    - If `settings.MEDIA_SENDFILE_BACKEND` is 'nginx' or 'apache', no bytes are read in Python:
+      the response only carries an `X-Accel-Redirect` (nginx) or `X-Sendfile` (apache) header and the
+      front proxy transfers the file, including Range handling.
+    - Otherwise a single `Range: bytes=...` request is answered with 206 Partial Content and the
+      requested slice is streamed in chunks; an unsatisfiable range returns 416. Requests without a
+      Range header get the whole file through Django's FileResponse (uses `wsgi.file_wrapper`).
+    - With a remote media storage (S3, MinIO) the client is sent to a signed URL of the storage
+      instead, see `serve_remote_media`.
+
+    Parameters:
+        request (HttpRequest): GET or HEAD request.
+        path (str): Path of the file relative to MEDIA_ROOT.
+
+    Returns:
+        HttpResponse: 200, 206, 302, 304, 404 or 416 response as described above.
+    """
+    path = posixpath.normpath(path)
+    if path == '..' or path.startswith(('../', '/')) or not path.startswith(MEDIA_DELIVERY_PREFIXES):
+        raise Http404('File not found.')
+    if is_remote_storage():
+        return serve_remote_media(request, path)
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('File not found.')
+    if not os.path.isfile(full_path):
+        raise Http404('File not found.')
+
+    etag = _etag(stat)
+    content_type = MEDIA_CONTENT_TYPES.get(os.path.splitext(full_path)[1].lower())
+    if content_type is None:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Last-Modified': http_date(stat.st_mtime),
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    backend = settings.MEDIA_SENDFILE_BACKEND
+    if backend:
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+        else:
+            response['X-Sendfile'] = full_path
+        return response
+
+    size = stat.st_size
+    try:
+        byte_range = parse_range_header(request.headers.get('Range'), size) if _range_allowed(request, etag, stat.st_mtime) else None
+    except ValueError:
+        response = HttpResponse(status=416, headers=headers)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type, headers=headers)
+        response['Content-Length'] = str(size)
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(iter_file_range(full_path, start, length), status=206, content_type=content_type, headers=headers)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
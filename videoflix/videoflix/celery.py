@@ -1,5 +1,7 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
+from kombu import Queue
 
 """
 Celery application configuration for the Videoflix project.
@@ -9,15 +11,68 @@ It then creates a Celery application instance and configures it using Django's s
 under the CELERY namespace. It also automatically discovers asynchronous task modules
 in all installed Django apps.
 
+Queues and priorities:
+    - 'mail': verification and password reset emails (userprofile.tasks).
+    - 'thumbnails': thumbnail and seek preview (trickplay) generation.
+    - 'transcode': video conversion and HLS packaging.
+    - 'celery': everything else, e.g. the nightly media cleanup (movie.tasks).
+    A long conversion therefore never blocks an email. Within a queue, tasks are ordered
+    by priority (Redis: 0 is the highest, 9 the lowest), so the thumbnail and the lowest
+    resolution of a new movie run before the larger resolutions.
+
+    Conversions run for a long time, so every worker process reserves only one task
+    at a time (prefetch multiplier 1). The conversion tasks are acknowledged late
+    (see `acks_late` in movie.signals), which requires a visibility timeout above the
+    longest conversion, otherwise Redis would hand a running task to a second worker.
+
+Scheduled tasks:
+    `beat_schedule` runs the media garbage collector every night at 03:30. It requires
+    a beat process next to the workers: celery -A videoflix beat --loglevel=info
+
 Usage:
     This module is imported in the __init__.py of the Django project package
     to ensure the Celery app is loaded when Django starts.
 
 Example:
-    To start a worker:
+    To start a worker for all queues:
         celery -A videoflix worker --loglevel=info
+    To start dedicated workers:
+        celery -A videoflix worker -Q mail,celery --loglevel=info
+        celery -A videoflix worker -Q thumbnails,transcode --concurrency=2 --loglevel=info
 """
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "videoflix.settings")
 app = Celery("videoflix")
 app.config_from_object("django.conf:settings", namespace="CELERY")
-app.autodiscover_tasks()
\ No newline at end of file
+
+PRIORITY_HIGHEST = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_LOWEST = 9
+
+app.conf.task_queues = (
+    Queue('celery'),
+    Queue('mail'),
+    Queue('thumbnails'),
+    Queue('transcode'),
+)
+app.conf.task_default_queue = 'celery'
+app.conf.task_default_priority = PRIORITY_DEFAULT
+app.conf.task_routes = {
+    'userprofile.tasks.*': {'queue': 'mail', 'priority': PRIORITY_HIGHEST},
+    'movie.signals.generate_thumbnail': {'queue': 'thumbnails', 'priority': PRIORITY_HIGHEST},
+    'movie.signals.generate_trickplay': {'queue': 'thumbnails'},
+    'movie.signals.*': {'queue': 'transcode'},
+}
+app.conf.broker_transport_options = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(PRIORITY_LOWEST + 1)),
+    'sep': ':',
+    'visibility_timeout': 60 * 60 * 12,
+}
+app.conf.worker_prefetch_multiplier = 1
+app.conf.beat_schedule = {
+    'collect-orphaned-media': {
+        'task': 'movie.tasks.collect_orphaned_media',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+app.autodiscover_tasks()
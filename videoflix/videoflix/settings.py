@@ -12,7 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from dotenv import load_dotenv
+import json
 import os
+import tempfile
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -32,6 +34,13 @@ FRONTEND_BASEURL = os.getenv('FRONTEND_BASEURL')
 
 CACHE_TTL = 60 * 15
 
+# Movies per page of the catalog (`/api/movies/`), clients may ask for up to 100 with `page_size`.
+MOVIE_PAGE_SIZE = int(os.getenv('MOVIE_PAGE_SIZE') or 24)
+
+# Public base URL of the API (e.g. https://api.example.com). The first catalog page is then pre-rendered
+# for this URL after every change and served as stored bytes (`movie.snapshot`), empty disables it.
+CATALOG_SNAPSHOT_URL = os.getenv('CATALOG_SNAPSHOT_URL', default='').rstrip('/')
+
 
 # Application definition
 INSTALLED_APPS = [
@@ -162,6 +171,37 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Media delivery: '' streams files from Django, 'nginx' answers with X-Accel-Redirect
+# (below MEDIA_ACCEL_REDIRECT_PREFIX) and 'apache' with X-Sendfile, so the proxy transfers the bytes.
+MEDIA_SENDFILE_BACKEND = os.getenv('MEDIA_SENDFILE_BACKEND', default='')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', default=60 * 60 * 24))
+# Media storage: 'local' keeps the media in MEDIA_ROOT, 's3' in an S3 compatible bucket (AWS S3, MinIO).
+# With 's3' MEDIA_ROOT is only the scratch directory of the workers, clients load the media with signed
+# URLs that expire after MEDIA_URL_EXPIRE seconds, so the bytes never pass through Django.
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', default='local')
+MEDIA_URL_EXPIRE = int(os.getenv('MEDIA_URL_EXPIRE', default=60 * 60 * 6))
+if MEDIA_STORAGE == 's3':
+    STORAGES = {
+        'default': {
+            'BACKEND': 'storages.backends.s3.S3Storage',
+            'OPTIONS': {
+                'bucket_name': os.getenv('AWS_STORAGE_BUCKET_NAME', default='videoflix'),
+                'endpoint_url': os.getenv('AWS_S3_ENDPOINT_URL') or None,
+                'region_name': os.getenv('AWS_S3_REGION_NAME') or None,
+                'access_key': os.getenv('AWS_ACCESS_KEY_ID'),
+                'secret_key': os.getenv('AWS_SECRET_ACCESS_KEY'),
+                'querystring_auth': True,
+                'querystring_expire': MEDIA_URL_EXPIRE,
+                'file_overwrite': False,
+                'signature_version': 's3v4',
+                'addressing_style': 'path',
+            },
+        },
+        'staticfiles': {
+            'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+        },
+    }
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Default primary key field type
@@ -171,4 +211,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', default='redis://redis:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', default='django-db')
\ No newline at end of file
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', default='django-db')
+
+# Video processing
+# 'single_pass' decodes the source once and writes all resolutions with one FFmpeg process,
+# 'per_rendition' queues one conversion task per resolution,
+# 'chunked' cuts the source into chunks that are encoded in parallel and joined afterwards.
+VIDEO_TRANSCODE_MODE = os.getenv('VIDEO_TRANSCODE_MODE', default='single_pass')
+# Chunked mode: target chunk length and the minimum video duration (seconds) to use it.
+VIDEO_CHUNK_SECONDS = int(os.getenv('VIDEO_CHUNK_SECONDS', default=120))
+VIDEO_CHUNKED_MIN_DURATION = int(os.getenv('VIDEO_CHUNKED_MIN_DURATION', default=600))
+# Video encoder of all resolutions and optional overrides per resolution as JSON,
+# e.g. VIDEO_RENDITION_ENCODERS='{"1080p": {"preset": "slow", "crf": 22}}'.
+# Use `python manage.py benchmark_encoders` to compare presets and CRF values.
+VIDEO_ENCODER = {
+    'codec': os.getenv('VIDEO_CODEC', default='libx264'),
+    'preset': os.getenv('VIDEO_PRESET', default='medium'),
+    'crf': int(os.getenv('VIDEO_CRF', default=23)),
+}
+VIDEO_RENDITION_ENCODERS = json.loads(os.getenv('VIDEO_RENDITION_ENCODERS', default='{}'))
+# Converts the lowest resolution in its own high priority task, so a new movie is playable within minutes.
+VIDEO_FAST_START = os.getenv('VIDEO_FAST_START', default='True') == 'True'
+# Thumbnail frame: 'smart' scores the keyframes of the first minutes and uses the best one,
+# 'fixed' uses the frame at one second.
+THUMBNAIL_MODE = os.getenv('THUMBNAIL_MODE', default='smart')
+# Resumable uploads: maximum size of a source video (bytes), the directory of unfinished uploads and
+# the hours an unfinished upload can be resumed before the media garbage collector removes its data.
+VIDEO_UPLOAD_MAX_SIZE = int(os.getenv('VIDEO_UPLOAD_MAX_SIZE', default=50 * 1024 ** 3))
+VIDEO_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'uploads', 'partial')
+VIDEO_UPLOAD_EXPIRE_HOURS = float(os.getenv('VIDEO_UPLOAD_EXPIRE_HOURS', default=7 * 24))
+# FFmpeg governor: maximum number of FFmpeg processes per host (all workers together) and the
+# threads of each process, by default an equal share of the cores. Optional encoder threads per
+# resolution as JSON, e.g. FFMPEG_RENDITION_THREADS='{"1080p": 4, "120p": 1}'.
+# The slots are lock files in FFMPEG_LOCK_DIR, workers of one host must share this directory.
+FFMPEG_MAX_CONCURRENT = max(int(os.getenv('FFMPEG_MAX_CONCURRENT') or (os.cpu_count() or 1) // 4), 1)
+FFMPEG_THREADS = max(int(os.getenv('FFMPEG_THREADS') or (os.cpu_count() or 1) // FFMPEG_MAX_CONCURRENT), 1)
+FFMPEG_RENDITION_THREADS = json.loads(os.getenv('FFMPEG_RENDITION_THREADS') or '{}')
+FFMPEG_LOCK_DIR = os.getenv('FFMPEG_LOCK_DIR') or os.path.join(tempfile.gettempdir(), 'videoflix-ffmpeg')
+# Short FFmpeg jobs (audio, thumbnail, poster analysis, split, concat, HLS remux) use their own slots and threads,
+# so they do not wait behind long encodes.
+FFMPEG_SHORT_MAX_CONCURRENT = max(int(os.getenv('FFMPEG_SHORT_MAX_CONCURRENT') or 2), 1)
+FFMPEG_SHORT_THREADS = max(int(os.getenv('FFMPEG_SHORT_THREADS') or 1), 1)
+# Media garbage collector (`manage.py cleanup_media`, nightly task): files changed within the grace
+# period are kept; the scheduled task only reports orphaned files unless MEDIA_GC_DELETE is True.
+MEDIA_GC_GRACE_HOURS = float(os.getenv('MEDIA_GC_GRACE_HOURS', default=24))
+MEDIA_GC_DELETE = os.getenv('MEDIA_GC_DELETE', default='False') == 'True'
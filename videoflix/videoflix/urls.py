@@ -15,15 +15,15 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.urls import include
 from django.conf import settings
 from debug_toolbar.toolbar import debug_toolbar_urls
-from django.conf.urls.static import static
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
 
-from movie.api.views import ConnectionTestView, MovieView, MovieConvertablesView, SingleMovieConvertablesView, MovieProgressView, MovieProgressSingleView
+from movie.views import serve_media
+from movie.api.views import ConnectionTestView, HomeView, MovieView, MovieConvertablesView, SingleMovieConvertablesView, MovieProgressView, MovieProgressSingleView, MovieTranscodeJobsView, UploadCreateView, UploadView
 from userprofile.api.views import LoginOrSignupView, LoginView, RegisterView, VerificationView, PasswordResetInquiryView, PasswordReset
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
@@ -39,9 +39,13 @@ urlpatterns = [
 
 
     path('api/movies/', MovieView.as_view(), name='movies'),
+    path('api/home/', HomeView.as_view(), name='home'),
     path('api/connection/', ConnectionTestView.as_view(), name='connection'),
     path('api/movies-convert/', MovieConvertablesView.as_view(), name='movies-convert'),
     path('api/movie-convert/<int:pk>', SingleMovieConvertablesView.as_view(), name='movie-convert'),
+    path('api/movie-transcode-jobs/<int:pk>', MovieTranscodeJobsView.as_view(), name='movie-transcode-jobs'),
+    path('api/uploads/', UploadCreateView.as_view(), name='uploads'),
+    path('api/uploads/<uuid:pk>', UploadView.as_view(), name='upload'),
 
     path('api/movie-progress/', MovieProgressView.as_view(), name='movie-progress'),
     path('api/single-movie-progress/<int:pk>', MovieProgressSingleView.as_view(), name='single-movie-progress'),
@@ -53,6 +57,6 @@ urlpatterns = [
 
 
 ] + debug_toolbar_urls()
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media')]
 urlpatterns += staticfiles_urlpatterns()
 